@@ -0,0 +1,209 @@
+# This file contains providers of tokens for the GitHub API
+import abc
+import asyncio
+import functools
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import aiohttp
+import jwt
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+
+__all__ = [
+    'GHAppTokenProvider',
+    'StaticTokenProvider',
+    'TokenProvider',
+    'get_gh_app_token_provider',
+]
+
+TOKEN_TTL = 600
+# Installation tokens live for an hour, a new one is requested
+# in the background when less than this is left
+DEFAULT_REFRESH_MARGIN = 300
+# Tokens closer to the expiration than this are not handed out at all,
+# callers wait for a fresh one instead
+MIN_TOKEN_VALIDITY = 30
+DEFAULT_INSTALLATION_TOKEN_LIFETIME = 3600
+
+_logger = logging.getLogger(__name__)
+_providers: Dict[Tuple[str, str, str, str], 'GHAppTokenProvider'] = {}
+
+
+@functools.lru_cache(maxsize=16)
+def _load_signing_key(path_to_gh_app_pem: str, modified_at: float):
+    with open(path_to_gh_app_pem, 'rb') as pem_file:
+        return serialization.load_pem_private_key(
+            pem_file.read(),
+            password=None,
+            backend=default_backend()
+        )
+
+
+def load_signing_key(path_to_gh_app_pem: str):
+    # The modification time is a part of the cache key,
+    # so a rotated key file is picked up without restarts
+    modified_at = os.path.getmtime(path_to_gh_app_pem)
+    return _load_signing_key(path_to_gh_app_pem, modified_at)
+
+
+class TokenProvider(abc.ABC):
+    @property
+    @abc.abstractmethod
+    def current_token(self) -> Optional[str]:
+        pass
+
+    @abc.abstractmethod
+    async def get_token(self) -> str:
+        pass
+
+
+class StaticTokenProvider(TokenProvider):
+    def __init__(self, token: str):
+        self.__token = token
+
+    @property
+    def current_token(self) -> Optional[str]:
+        return self.__token
+
+    async def get_token(self) -> str:
+        return self.__token
+
+
+class GHAppTokenProvider(TokenProvider):
+    def __init__(
+        self,
+        path_to_gh_app_pem: str,
+        gh_app_id: str,
+        installation_id: str,
+        algorithm: str = 'RS256',
+        refresh_margin: float = DEFAULT_REFRESH_MARGIN,
+        session: Optional[aiohttp.ClientSession] = None,
+        api_url: str = 'https://api.github.com',
+    ):
+        self.path_to_gh_app_pem = path_to_gh_app_pem
+        self.gh_app_id = gh_app_id
+        self.installation_id = installation_id
+        self.algorithm = algorithm
+        self.refresh_margin = refresh_margin
+        self.session = session
+        self.api_url = api_url
+        self.__token = None
+        self.__expires_at = 0.0
+        self.__refresh_task = None
+        self.__refresh_loop = None
+
+    @property
+    def current_token(self) -> Optional[str]:
+        return self.__token
+
+    @property
+    def expires_at(self) -> float:
+        return self.__expires_at
+
+    def __generate_jwt(self) -> str:
+        signing_key = load_signing_key(self.path_to_gh_app_pem)
+        payload = {
+            'iat': int(time.time()),
+            'exp': int(time.time()) + TOKEN_TTL,
+            'iss': self.gh_app_id,
+        }
+        return jwt.encode(payload, signing_key, algorithm=self.algorithm)
+
+    async def __fetch_token(
+        self,
+        session: Optional[aiohttp.ClientSession] = None,
+    ) -> str:
+        access_url = (
+            f'{self.api_url}/app/installations/'
+            f'{self.installation_id}/access_tokens'
+        )
+        headers = {
+            'Authorization': f'Bearer {self.__generate_jwt()}',
+            'Accept': 'application/vnd.github.v3+json',
+        }
+        session = session or self.session
+        if session is not None and not session.closed:
+            request = session.post(
+                access_url,
+                headers=headers,
+                raise_for_status=True,
+            )
+        else:
+            request = aiohttp.request(
+                'POST',
+                access_url,
+                headers=headers,
+                raise_for_status=True,
+            )
+        async with request as response:
+            resp_json = await response.json()
+        expires_at = resp_json.get('expires_at')
+        if expires_at:
+            self.__expires_at = datetime.fromisoformat(
+                expires_at.replace('Z', '+00:00')
+            ).timestamp()
+        else:
+            self.__expires_at = (
+                time.time() + DEFAULT_INSTALLATION_TOKEN_LIFETIME
+            )
+        self.__token = resp_json['token']
+        return self.__token
+
+    def __on_refresh_done(self, task: asyncio.Task):
+        if self.__refresh_task is task:
+            self.__refresh_task = None
+            self.__refresh_loop = None
+        if not task.cancelled() and task.exception() is not None:
+            _logger.warning(
+                'Cannot refresh GitHub App installation token: %s',
+                task.exception(),
+            )
+
+    def __start_refresh(
+        self,
+        session: Optional[aiohttp.ClientSession] = None,
+    ) -> asyncio.Task:
+        # Single flight: every caller shares the same refresh task
+        loop = asyncio.get_running_loop()
+        if self.__refresh_task is None or self.__refresh_loop is not loop:
+            self.__refresh_task = loop.create_task(
+                self.__fetch_token(session)
+            )
+            self.__refresh_loop = loop
+            self.__refresh_task.add_done_callback(self.__on_refresh_done)
+        return self.__refresh_task
+
+    async def get_token(
+        self,
+        session: Optional[aiohttp.ClientSession] = None,
+    ) -> str:
+        # The session is used by the refresh started by this call only,
+        # providers are shared by callers with different sessions
+        time_left = self.__expires_at - time.time()
+        if self.__token and time_left > self.refresh_margin:
+            return self.__token
+        if self.__token and time_left > MIN_TOKEN_VALIDITY:
+            self.__start_refresh(session)
+            return self.__token
+        return await asyncio.shield(self.__start_refresh(session))
+
+
+def get_gh_app_token_provider(
+    path_to_gh_app_pem: str,
+    gh_app_id: str,
+    installation_id: str,
+    algorithm: str = 'RS256',
+) -> GHAppTokenProvider:
+    key = (path_to_gh_app_pem, str(gh_app_id), str(installation_id), algorithm)
+    if key not in _providers:
+        _providers[key] = GHAppTokenProvider(
+            path_to_gh_app_pem,
+            gh_app_id,
+            installation_id,
+            algorithm=algorithm,
+        )
+    return _providers[key]
@@ -1,70 +1,421 @@
+import asyncio
 import logging
 import time
+from datetime import datetime, timedelta, timezone
 from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
     Dict,
     List,
     Optional,
+    Sequence,
     Tuple,
     Union,
 )
 
 import aiohttp
 import jmespath
-import jwt
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.backends import default_backend
 
+from .auth import (
+    TOKEN_TTL,
+    StaticTokenProvider,
+    TokenProvider,
+    get_gh_app_token_provider,
+)
+from .compact import (
+    CompactContent,
+    CompactProjectItem,
+    parse_compact_content,
+    parse_compact_project_item,
+)
+from .exceptions import GHRateLimitError, GHRequestError
+from .indexes import ProjectItemsIndex
+from .loader import NodeLoader, node_cache_scope
+from .metrics import (
+    ClientMetrics,
+    RequestEvent,
+    describe_error,
+    get_operation_name,
+)
 from .models import *
 from .mutations import *
+from .paging import PageSizer
 from .queries import *
+from .rate_limit import RateLimiter
+from .search import TextSearchIndex
+from .serialization import JSONCodec, get_json_codec
+from .single_flight import SingleFlight
+from .snapshot import (
+    ProjectSnapshot,
+    deserialize_field,
+    deserialize_item,
+    read_snapshot,
+    serialize_field,
+    serialize_item,
+    write_snapshot,
+)
+from .write_queue import DEFAULT_FLUSH_INTERVAL, FieldUpdateQueue
+
+PROJECT_DATA_PATH = jmespath.compile('data.organization.projectV2')
+PROJECT_FIELDS_PATH = jmespath.compile(
+    'data.organization.projectV2.fields.nodes'
+)
+REPOSITORY_ID_PATH = jmespath.compile('data.organization.repository.id')
+SEARCH_NODES_PATH = jmespath.compile('data.search.edges[].node')
+CREATED_ISSUE_PATH = jmespath.compile('data.createIssue.issue')
+CLOSED_ISSUE_STATE_PATH = jmespath.compile('data.closeIssue.issue.state')
+CREATED_PROJECT_ITEM_ID_PATH = jmespath.compile(
+    'data.addProjectV2ItemById.item.id'
+)
 
 FieldsReturnType = Dict[str, Union[BaseField, SingleSelectProjectField]]
-TOKEN_TTL = 600
+CachedProjectItem = Union[ProjectItem, CompactProjectItem]
+RequestObserver = Callable[[RequestEvent], None]
+ContentType = Union[
+    DraftIssueContent,
+    IssueContent,
+    PullRequestContent,
+    CompactContent,
+]
+DEFAULT_API_URL = 'https://api.github.com/graphql'
+DEFAULT_CONNECTION_LIMIT = 20
+DEFAULT_KEEPALIVE_TIMEOUT = 60
+DEFAULT_DNS_CACHE_TTL = 300
+DEFAULT_REQUEST_TIMEOUT = 60
+DEFAULT_CONNECT_TIMEOUT = 10
+TRANSIENT_STATUSES = (500, 502, 503, 504)
+# Errors raised before the request reaches GitHub, only after them
+# mutations are sent again: a 502 or a timeout may come after GitHub
+# has applied the mutation already
+NOT_SENT_ERRORS = tuple(
+    error_type
+    for error_type in (
+        aiohttp.ClientConnectorError,
+        getattr(aiohttp, 'ConnectionTimeoutError', None),
+    )
+    if error_type is not None
+)
+RATE_LIMIT_STATUSES = (403, 429)
+# GitHub counts every mutation against the secondary rate limit separately,
+# so a single document should not carry too many of them
+DEFAULT_MUTATIONS_PER_REQUEST = 50
+DEFAULT_SNAPSHOT_MAX_AGE = 24 * 60 * 60
+# GitHub accepts up to 100 IDs in a single nodes() query
+NODES_BATCH_SIZE = 100
+DEFAULT_ISSUES_PER_REQUEST = 20
+DEFAULT_ISSUE_CREATION_CONCURRENCY = 3
+DEFAULT_PARTITION_CONCURRENCY = 4
+# Items changed while a scan is running may be missed by it, the next
+# incremental sync starts this long before the scan (and covers clock
+# skew between GitHub and us)
+SYNC_SAFETY_MARGIN = timedelta(minutes=10)
+# Only values of these types are parsed from fieldValues and cached
+CACHED_FIELD_VALUE_TYPES = ('text', 'single_select')
+# Data types of the project fields with such values, values of
+# the other fields (assignees, labels, dates, ...) are not fetched
+CACHED_FIELD_DATA_TYPES = ('TEXT', 'TITLE', 'SINGLE_SELECT')
+
+
+def create_client_session(
+    connection_limit: int = DEFAULT_CONNECTION_LIMIT,
+    keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT,
+    dns_cache_ttl: int = DEFAULT_DNS_CACHE_TTL,
+    request_timeout: float = DEFAULT_REQUEST_TIMEOUT,
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+) -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(
+        limit=connection_limit,
+        keepalive_timeout=keepalive_timeout,
+        use_dns_cache=True,
+        ttl_dns_cache=dns_cache_ttl,
+    )
+    timeout = aiohttp.ClientTimeout(
+        total=request_timeout,
+        connect=connect_timeout,
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
 
 
 class BaseGHGraphQLClient:
-    def __init__(self, github_token: str, verbose: bool = False):
-        self.__github_token = github_token
+    def __init__(
+        self,
+        github_token: Union[str, TokenProvider],
+        verbose: bool = False,
+        session: Optional[aiohttp.ClientSession] = None,
+        connection_limit: int = DEFAULT_CONNECTION_LIMIT,
+        keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT,
+        dns_cache_ttl: int = DEFAULT_DNS_CACHE_TTL,
+        request_timeout: float = DEFAULT_REQUEST_TIMEOUT,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        rate_limiter: Optional[RateLimiter] = None,
+        json_codec: Optional[Union[str, JSONCodec]] = None,
+        metrics: Optional[ClientMetrics] = None,
+        api_url: str = DEFAULT_API_URL,
+        coalesce_reads: bool = False,
+    ):
+        if isinstance(github_token, TokenProvider):
+            self.__token_provider = github_token
+        else:
+            self.__token_provider = StaticTokenProvider(github_token)
         self.headers = {
-            'Authorization': f'Bearer {self.__github_token}',
             'Accept': 'application/vnd.github+json',
         }
-        self.__api_url = 'https://api.github.com/graphql'
+        if self.__token_provider.current_token:
+            self.headers['Authorization'] = (
+                f'Bearer {self.__token_provider.current_token}'
+            )
+        self.__api_url = api_url
         logger_level = logging.DEBUG if verbose else logging.INFO
         self.__logger = logging.getLogger(__name__)
         self.__logger.setLevel(logger_level)
+        # Externally provided sessions are shared with other clients,
+        # so they are never closed here
+        self.__session = session
+        self.__owns_session = session is None
+        self.__closed = False
+        self.__session_options = {
+            'connection_limit': connection_limit,
+            'keepalive_timeout': keepalive_timeout,
+            'dns_cache_ttl': dns_cache_ttl,
+            'request_timeout': request_timeout,
+            'connect_timeout': connect_timeout,
+        }
+        self.__rate_limiter = rate_limiter or RateLimiter()
+        # orjson or msgspec when installed, the standard library otherwise
+        self.__json_codec = get_json_codec(json_codec)
+        self.__metrics = metrics or ClientMetrics()
+        # Identical queries sent at the same time share one request
+        self.__coalesce_reads = coalesce_reads
+        self.__reads = SingleFlight()
+
+    @property
+    def metrics(self) -> ClientMetrics:
+        return self.__metrics
+
+    @property
+    def json_codec(self) -> JSONCodec:
+        return self.__json_codec
+
+    @property
+    def rate_limiter(self) -> RateLimiter:
+        return self.__rate_limiter
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # The session is created lazily because aiohttp requires
+        # a running event loop for it
+        if self.__closed:
+            raise RuntimeError('Client is closed')
+        if self.__session is None or self.__session.closed:
+            self.__session = create_client_session(**self.__session_options)
+            self.__owns_session = True
+        return self.__session
+
+    async def close(self):
+        # Requests which nobody waits for anymore are stopped,
+        # otherwise they would keep using the session
+        self.__closed = True
+        await self.__reads.cancel_all()
+        if self.__session is not None and self.__owns_session:
+            await self.__session.close()
+        self.__session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def __send_request(
+        self,
+        payload: dict,
+        observer: Optional[RequestObserver] = None,
+    ) -> Tuple[Optional[dict], Optional[GHRequestError]]:
+        # The token may be rotated by the provider at any moment
+        token = await self.__token_provider.get_token()
+        started_at = time.perf_counter()
+        status = None
+        network_time = 0.0
+        response_bytes = 0
+        decode_time = 0.0
+        resp_json = None
+        error = None
+        try:
+            async with self.__post(payload, token) as response:
+                status = response.status
+                body = await response.read()
+                network_time = time.perf_counter() - started_at
+                response_bytes = len(body)
+                if status not in TRANSIENT_STATUSES:
+                    decode_started_at = time.perf_counter()
+                    resp_json = self.__json_codec.loads(body)
+                    decode_time = time.perf_counter() - decode_started_at
+                error = self.__check_response(response, resp_json)
+        except Exception as exc:
+            network_time = time.perf_counter() - started_at
+            error = exc
+            raise
+        finally:
+            rate_limit = ((resp_json or {}).get('data') or {}).get('rateLimit')
+            event = RequestEvent(
+                operation=get_operation_name(payload['query']),
+                status=status,
+                network_time=network_time,
+                decode_time=decode_time,
+                response_bytes=response_bytes,
+                cost=rate_limit.get('cost') if rate_limit else None,
+                error=describe_error(error) if error is not None else None,
+            )
+            self.__metrics.record_request(event)
+            if observer is not None:
+                observer(event)
+        if error is not None:
+            return None, error
+        return resp_json, None
+
+    def __post(self, payload: dict, token: str):
+        headers = dict(self.headers)
+        headers['Authorization'] = f'Bearer {token}'
+        headers['Content-Type'] = 'application/json'
+        return self.session.post(
+            self.__api_url,
+            data=self.__json_codec.dumps(payload),
+            headers=headers,
+        )
+
+    def __check_response(
+        self,
+        response: aiohttp.ClientResponse,
+        resp_json: Optional[dict],
+    ) -> Optional[GHRequestError]:
+        limiter = self.__rate_limiter
+        limiter.update_from_headers(response.headers)
+        status = response.status
+        if status in TRANSIENT_STATUSES:
+            return GHRequestError(
+                f'GitHub API responded with {status}',
+                status=status,
+            )
+        limiter.update_from_payload(resp_json)
+        message = str(resp_json.get('message', ''))
+        if status in RATE_LIMIT_STATUSES and (
+            'Retry-After' in response.headers
+            or 'secondary rate limit' in message.lower()
+        ):
+            retry_after = response.headers.get('Retry-After')
+            limiter.on_throttled(
+                float(retry_after) if retry_after else None
+            )
+            return GHRateLimitError(
+                f'Secondary rate limit exceeded: {message}',
+                status=status,
+                payload=resp_json,
+            )
+        budget_exhausted = any(
+            error.get('type') == 'RATE_LIMITED'
+            for error in resp_json.get('errors') or []
+        )
+        if status in RATE_LIMIT_STATUSES:
+            remaining = response.headers.get('X-RateLimit-Remaining')
+            budget_exhausted = budget_exhausted or remaining == '0'
+        if budget_exhausted:
+            limiter.on_budget_exhausted()
+            return GHRateLimitError(
+                'Rate limit exceeded',
+                status=status,
+                payload=resp_json,
+            )
+        limiter.on_success()
+        return None
 
     async def make_request(
         self,
         query: str,
         variables: Optional[dict] = None,
+        observer: Optional[RequestObserver] = None,
     ) -> dict:
+        # The observer is called after every attempt of the request
         payload = {'query': query}
         if variables:
             payload['variables'] = variables
-        async with aiohttp.request(
-            'POST',
-            self.__api_url,
-            json=payload,
-            headers=self.headers,
-        ) as response:
-            resp_json = await response.json()
-            return resp_json
+        if not self.__coalesce_reads or query.lstrip().startswith(
+            'mutation'
+        ):
+            return await self.__make_request(payload, observer)
+        key = (query, self.__json_codec.dumps(variables or {}))
+        return await self.__reads.run(
+            key,
+            lambda: self.__make_request(payload, observer),
+            copy=self.__copy_response,
+        )
+
+    def __copy_response(self, response: dict) -> dict:
+        return self.__json_codec.loads(self.__json_codec.dumps(response))
+
+    async def __make_request(
+        self,
+        payload: dict,
+        observer: Optional[RequestObserver] = None,
+    ) -> dict:
+        is_mutation = payload['query'].lstrip().startswith('mutation')
+        attempt = 0
+        while True:
+            async with self.__rate_limiter.slot():
+                try:
+                    resp_json, error = await self.__send_request(
+                        payload,
+                        observer,
+                    )
+                    # Rate limited requests are rejected before running
+                    applied = not isinstance(error, GHRateLimitError)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                    resp_json = None
+                    error = GHRequestError(
+                        f'Request to GitHub failed: {describe_error(exc)}'
+                    )
+                    applied = not isinstance(exc, NOT_SENT_ERRORS)
+            if error is None:
+                return resp_json
+            if attempt >= self.__rate_limiter.max_retries or (
+                is_mutation and applied
+            ):
+                raise error
+            self.__logger.debug(
+                'Retrying request to GitHub after error: %s', error,
+            )
+            # Rate limit pauses are applied by the limiter itself
+            # on the next acquire, this adds a jittered backoff on top
+            await asyncio.sleep(self.__rate_limiter.get_backoff_delay(attempt))
+            attempt += 1
 
     @property
-    def github_token(self) -> str:
-        return self.__github_token
+    def github_token(self) -> Optional[str]:
+        return self.__token_provider.current_token
+
+    @property
+    def token_provider(self) -> TokenProvider:
+        return self.__token_provider
 
 
 class IntegrationsGHGraphQLClient(BaseGHGraphQLClient):
     def __init__(
         self,
-        github_token: str,
+        github_token: Union[str, TokenProvider],
         organization_name: str,
         project_number: int,
         default_repository_name: str,
+        snapshot_path: Optional[str] = None,
+        snapshot_max_age: Optional[float] = DEFAULT_SNAPSHOT_MAX_AGE,
+        compact_cache: bool = False,
+        page_sizer: Optional[PageSizer] = None,
+        write_behind: bool = False,
+        write_flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        write_batch_size: int = DEFAULT_MUTATIONS_PER_REQUEST,
+        **kwargs,
     ):
-        super().__init__(github_token)
+        super().__init__(github_token, **kwargs)
+        self.__logger = logging.getLogger(__name__)
         self.__org_name = organization_name
         self.__project_number = project_number
         self.__project_id = None
@@ -78,6 +429,33 @@ class IntegrationsGHGraphQLClient(BaseGHGraphQLClient):
         self.__issues_cache = {}
         self.__issues_content_cache = {}
         self.__fields_cache = {}
+        self.__last_synced_at = None
+        self.__snapshot_path = snapshot_path
+        self.__snapshot_max_age = snapshot_max_age
+        self.__reconcile_task = None
+        # Compact items take less memory and are built without validation,
+        # full models are available through CompactProjectItem.to_model()
+        self.__compact_cache = compact_cache
+        self.__items_index = ProjectItemsIndex()
+        # Built on the first local search only
+        self.__text_index: Optional[TextSearchIndex] = None
+        self.__node_loader = NodeLoader(self.__fetch_nodes, NODES_BATCH_SIZE)
+        # Node ID -> updated_at of the last applied webhook event
+        self.__event_versions: Dict[str, datetime] = {}
+        # Concurrent reloads share one scan, and only one scan
+        # may rebuild the caches at a time
+        self.__flights = SingleFlight()
+        self.__scan_lock: Optional[asyncio.Lock] = None
+        # Learns the best page size from the scans of the project
+        self.__page_sizer = page_sizer or PageSizer()
+        # With write_behind the field setters only queue the updates,
+        # repeated updates of the same field are sent once in a batch
+        self.__write_behind = write_behind
+        self.__write_queue = FieldUpdateQueue(
+            self.set_fields_batch,
+            max_batch_size=write_batch_size,
+            flush_interval=write_flush_interval,
+        )
 
     @property
     def organization(self) -> str:
@@ -95,147 +473,969 @@ class IntegrationsGHGraphQLClient(BaseGHGraphQLClient):
     def repository_id(self) -> Optional[str]:
         return self.__default_repository_id
 
+    @property
+    def page_sizer(self) -> PageSizer:
+        return self.__page_sizer
+
+    @property
+    def last_synced_at(self) -> Optional[datetime]:
+        return self.__last_synced_at
+
     @staticmethod
     async def generate_token_for_gh_app(
         path_to_gh_app_pem: str,
         gh_app_id: str,
         installation_id: str,
         algorithm='RS256',
+        session: Optional[aiohttp.ClientSession] = None,
     ) -> str:
-        with open(path_to_gh_app_pem, 'rb') as pem_file:
-            signing_key = serialization.load_pem_private_key(
-                pem_file.read(),
-                password=None,
-                backend=default_backend()
-            )
-        payload = {
-            'iat': int(time.time()),
-            'exp': int(time.time()) + TOKEN_TTL,
-            'iss': gh_app_id,
-        }
-        encoded_jwt = jwt.encode(payload, signing_key, algorithm=algorithm)
-        access_url = f'https://api.github.com/app/installations/{installation_id}/access_tokens'
-        async with aiohttp.request(
-            'POST',
-            access_url,
-            headers={
-                'Authorization': f'Bearer {encoded_jwt}',
-                'Accept': 'application/vnd.github.v3+json',
-            },
-            raise_for_status=True,
-        ) as response:
-            resp_json = await response.json()
-            return resp_json['token']
+        # Providers are shared between calls, so the signing key is parsed
+        # once and the installation token is reused until it expires
+        provider = get_gh_app_token_provider(
+            path_to_gh_app_pem,
+            gh_app_id,
+            installation_id,
+            algorithm=algorithm,
+        )
+        return await provider.get_token(session=session)
 
     @staticmethod
     def parse_project_data(response: dict) -> Union[Dict, List]:
-        return jmespath.search('data.organization.projectV2', response)
+        return PROJECT_DATA_PATH.search(response)
 
     async def get_project_fields(
         self, reload: bool = False
     ) -> FieldsReturnType:
         if self.__fields_cache and not reload:
+            self.metrics.record_cache('fields', hit=True)
             return self.__fields_cache
-        self.__fields_cache = {}
-        data_query = 'data.organization.projectV2.fields.nodes'
+        self.metrics.record_cache('fields', hit=False)
+        return await self.__flights.run('fields', self.__load_project_fields)
+
+    async def __load_project_fields(self) -> FieldsReturnType:
         raw_data = await self.make_request(
             QUERY_ORG_PROJECT_FIELDS,
             variables=self.__base_query_variables,
         )
-        project_fields_data = jmespath.search(data_query, raw_data)
+        project_fields_data = PROJECT_FIELDS_PATH.search(raw_data)
+        fields_cache = {}
         for field in project_fields_data:
+            data_type = field.get('dataType')
             if field['__typename'] == 'ProjectV2SingleSelectField':
-                field_obj = SingleSelectProjectField(**field)
+                field_obj = SingleSelectProjectField(
+                    data_type=data_type,
+                    **field,
+                )
             else:
-                field_obj = BaseField(**field)
-            self.__fields_cache[field_obj.name] = field_obj
+                field_obj = BaseField(data_type=data_type, **field)
+            fields_cache[field_obj.name] = field_obj
+        # Readers never see a partially filled cache
+        self.__fields_cache = fields_cache
         return self.__fields_cache
 
-    async def get_project_issues(self, reload: bool = False):
-        def parse_project_items(payload: dict):
-            for item_data in payload['items']['nodes']:
-                content_data = item_data.pop('content', {})
-                if content_data.get('__typename') == 'DraftIssue':
-                    content = DraftIssueContent(**content_data)
-                elif content_data.get('__typename') == 'Issue':
-                    content = IssueContent(**content_data)
-                else:
-                    content = PullRequestContent(**content_data)
-                project_item = ProjectItem(**item_data)
-                project_item.content = content
-                project_item.project_id = self.__project_id
-                project_item.fields = {}
-                # Search for connected repository
-                for field in item_data['fieldValues']['nodes']:
-                    type_name = field.get('__typename')
-                    if type_name == 'ProjectV2ItemFieldRepositoryValue':
-                        project_item.repository_id = field['repository']['id']
-                        continue
+    def __parse_content(self, content_data: dict) -> ContentType:
+        if self.__compact_cache:
+            return parse_compact_content(content_data)
+        if content_data.get('__typename') == 'DraftIssue':
+            content = DraftIssueContent(**content_data)
+        elif content_data.get('__typename') == 'Issue':
+            content = IssueContent(**content_data)
+        else:
+            content = PullRequestContent(**content_data)
+        return content
 
-                    field_name = field["field"]["name"]
-                    filed_value = (
-                        field["name"]
-                        if type_name == "ProjectV2ItemFieldSingleSelectValue"
-                        else field["text"]
-                    )
+    def __parse_project_item(self, item_data: dict) -> CachedProjectItem:
+        started_at = time.perf_counter()
+        project_item = self.__build_project_item(item_data)
+        self.metrics.record_parse(
+            'ProjectItem',
+            time.perf_counter() - started_at,
+        )
+        return project_item
 
-                    project_item.fields[field_name] = {
-                        "name": field_name,
-                        "value": filed_value,
-                        "filed_id": field["field"]["id"],
-                        "value_id": field["id"],
-                    }
-                self.__issues_cache[project_item.id] = project_item
-                self.__issues_content_cache[content.id] = project_item
+    def __build_project_item(self, item_data: dict) -> CachedProjectItem:
+        if self.__compact_cache:
+            return parse_compact_project_item(item_data, self.__project_id)
+        content = self.__parse_content(item_data.pop('content', {}))
+        project_item = ProjectItem(
+            updated_at=item_data.get('updatedAt'),
+            **item_data,
+        )
+        project_item.content = content
+        project_item.project_id = self.__project_id
+        project_item.fields = {}
+        # Search for connected repository
+        for field in item_data['fieldValues']['nodes']:
+            type_name = field.get('__typename')
+            if type_name == 'ProjectV2ItemFieldRepositoryValue':
+                project_item.repository_id = field['repository']['id']
+                continue
+            if 'field' not in field:
+                # Values of the field types which are not requested
+                continue
 
-        if self.__issues_cache and not reload:
-            return self.__issues_cache
+            field_name = field["field"]["name"]
+            filed_value = (
+                field["name"]
+                if type_name == "ProjectV2ItemFieldSingleSelectValue"
+                else field["text"]
+            )
 
+            project_item.fields[field_name] = {
+                "name": field_name,
+                "value": filed_value,
+                "filed_id": field["field"]["id"],
+                "value_id": field["id"],
+            }
+        return project_item
+
+    def __cache_project_item(self, project_item: CachedProjectItem):
+        previous_item = self.__issues_cache.get(project_item.id)
+        if previous_item is not None and previous_item.content:
+            self.__issues_content_cache.pop(previous_item.content.id, None)
+            if self.__text_index is not None:
+                self.__text_index.remove(previous_item.content.id)
+        self.__issues_cache[project_item.id] = project_item
+        self.__issues_content_cache[project_item.content.id] = project_item
+        self.__items_index.add(project_item)
+        if self.__text_index is not None:
+            self.__index_item_text(project_item)
+
+    def __replace_project_items(self, project_items: List[CachedProjectItem]):
         self.__issues_cache = {}
-        query = generate_project_issues_query()
-        raw_data = await self.make_request(
-            query,
-            variables=self.__base_query_variables,
-        )
-        project_data = self.parse_project_data(raw_data)
-        self.__project_id = project_data['id']
-        page_info = project_data['items']['pageInfo']
-        parse_project_items(project_data)
-        while page_info['hasNextPage']:
-            cursor = page_info['endCursor']
-            query = generate_project_issues_query(next_cursor=cursor)
+        self.__issues_content_cache = {}
+        self.__items_index.clear()
+        self.__text_index = None
+        self.__last_synced_at = None
+        for project_item in project_items:
+            self.__cache_project_item(project_item)
+
+    @staticmethod
+    def __collect_field_values(item_data: dict, fields_count: int):
+        # Values fetched by name come as field_<index> aliases,
+        # they are brought to the layout of the full query
+        field_values = [
+            item_data.pop(f'field_{index}', None)
+            for index in range(fields_count)
+        ]
+        item_data['fieldValues'] = {
+            'nodes': [value for value in field_values if value],
+        }
+
+    async def __load_project_items(
+        self,
+        items_query: Optional[str] = None,
+        page_size: Optional[int] = None,
+        projection: Optional[ProjectItemsProjection] = None,
+    ):
+        # Without an explicit page size it is adapted to the observed
+        # response times, sizes and errors
+        if page_size is not None and not 1 <= page_size <= 100:
+            raise ValueError(f'Incorrect page size: {page_size}')
+        projection = projection or ProjectItemsProjection()
+        field_names = projection.field_names or []
+        query = QUERY_ORG_PROJECT_ISSUES
+        variables = dict(self.__base_query_variables)
+        field_values_size = None
+        if field_names:
+            query = generate_project_issues_query_for_fields(field_names)
+        elif projection.with_field_values:
+            # An item has a value per field at most
+            field_values_size = min(100, len(self.__fields_cache) or 100)
+            variables['field_values_first'] = field_values_size
+        page_sizer = self.__page_sizer if page_size is None else None
+        if page_sizer is not None:
+            page_size = page_sizer.get_page_size(field_values_size)
+        variables['first'] = page_size
+        variables['after'] = None
+        variables['items_query'] = items_query
+        variables['with_body'] = projection.with_bodies
+        variables['with_field_values'] = projection.with_field_values
+        events = []
+
+        def observe(event: RequestEvent):
+            if event.error is not None and page_sizer is not None:
+                page_sizer.observe(event, 0)
+                # Retries send the same variables, so they
+                # request a smaller page already
+                variables['first'] = page_sizer.get_page_size(
+                    field_values_size,
+                )
+            events.append(event)
+
+        while True:
+            events.clear()
             raw_data = await self.make_request(
                 query,
-                variables=self.__base_query_variables,
+                variables=variables,
+                observer=observe,
             )
             project_data = self.parse_project_data(raw_data)
+            self.__project_id = project_data['id']
             page_info = project_data['items']['pageInfo']
-            parse_project_items(project_data)
+            items = project_data['items']['nodes']
+            if field_names or not projection.with_field_values:
+                for item_data in items:
+                    self.__collect_field_values(item_data, len(field_names))
+            if page_sizer is not None and events:
+                page_sizer.observe(
+                    events[-1],
+                    len(items),
+                    variables['first'],
+                )
+                variables['first'] = page_sizer.get_page_size(
+                    field_values_size,
+                )
+            yield items
+            if not page_info['hasNextPage']:
+                break
+            variables['after'] = page_info['endCursor']
+
+    async def iter_project_items(
+        self,
+        predicate: Optional[Callable[[CachedProjectItem], bool]] = None,
+        limit: Optional[int] = None,
+        items_query: Optional[str] = None,
+        page_size: Optional[int] = None,
+        projection: Optional[ProjectItemsProjection] = None,
+    ) -> AsyncIterator[CachedProjectItem]:
+        # Items are yielded as soon as their page arrives and are not
+        # stored in the caches, so only one page is kept in memory.
+        # Next pages are requested only when the caller asks for more.
+        found = 0
+        pages = self.__load_project_items(
+            items_query,
+            page_size=page_size,
+            projection=projection,
+        )
+        try:
+            async for items in pages:
+                for item_data in items:
+                    project_item = self.__parse_project_item(item_data)
+                    if predicate is not None and not predicate(project_item):
+                        continue
+                    yield project_item
+                    found += 1
+                    if limit is not None and found >= limit:
+                        return
+        finally:
+            await pages.aclose()
+
+    @staticmethod
+    def __merge_projected_item(
+        project_item: CachedProjectItem,
+        previous_item: Optional[CachedProjectItem],
+        projection: ProjectItemsProjection,
+    ):
+        # Parts which were not requested are taken from the cached item
+        if previous_item is None or previous_item.content is None:
+            return
+        if (
+            not projection.with_bodies
+            and previous_item.content.id == project_item.content.id
+            and previous_item.updated_at == project_item.updated_at
+        ):
+            project_item.content.body = previous_item.content.body
+        if projection.with_field_values and not projection.field_names:
+            return
+        requested_fields = set(projection.field_names or [])
+        if not projection.with_field_values:
+            requested_fields = set()
+        if project_item.repository_id is None:
+            project_item.repository_id = previous_item.repository_id
+        for field_name, field in (previous_item.fields or {}).items():
+            if field_name in requested_fields:
+                continue
+            project_item.set_field_value(
+                field_name,
+                field['value'],
+                field['filed_id'],
+                field['value_id'],
+            )
+
+    async def __sync_project_issues(
+        self,
+        projection: Optional[ProjectItemsProjection] = None,
+    ) -> Tuple[int, int]:
+        # ProjectV2 items cannot be ordered by the update time, so the
+        # watermark is applied as an "updated:" filter on GitHub side.
+        # The filter works with dates only, so items which are cached
+        # in the same or a newer version already are skipped.
+        watermark = self.__last_synced_at
+        items_query = f'updated:>={watermark.strftime("%Y-%m-%d")}'
+        pages_count = 0
+        items_count = 0
+        pages = self.__load_project_items(items_query, projection=projection)
+        async for items in pages:
+            pages_count += 1
+            for item_data in items:
+                project_item = self.__parse_project_item(item_data)
+                cached_item = self.__issues_cache.get(project_item.id)
+                if (
+                    cached_item is not None
+                    and cached_item.updated_at
+                    and project_item.updated_at
+                    and cached_item.updated_at >= project_item.updated_at
+                ):
+                    continue
+                if projection is not None and not projection.is_full:
+                    self.__merge_projected_item(
+                        project_item,
+                        cached_item,
+                        projection,
+                    )
+                self.__cache_project_item(project_item)
+                items_count += 1
+        return pages_count, items_count
+
+    async def get_project_issues(
+        self,
+        reload: bool = False,
+        incremental: bool = False,
+        projection: Optional[ProjectItemsProjection] = None,
+        partition_by: Optional[str] = None,
+        partitions: Optional[Sequence[str]] = None,
+        max_concurrent_partitions: int = DEFAULT_PARTITION_CONCURRENCY,
+    ):
+        # With a partial projection the parts which were not requested
+        # are kept from the cache, missing bodies are loaded on demand
+        # with get_content_body()/fetch_bodies().
+        # A full scan can be split into slices which are paged through
+        # concurrently: by options of a single select field
+        # (partition_by='Status') or by items(query:) filters which
+        # together cover the whole board (e.g. ['is:open', 'is:closed']).
+        if partition_by and partitions:
+            raise ValueError('Use either partition_by or partitions')
+        if max_concurrent_partitions < 1:
+            raise ValueError('Concurrency should be positive')
+        if self.__issues_cache and not reload:
+            self.metrics.record_cache('issues', hit=True)
+            return self.__issues_cache
+        self.metrics.record_cache('issues', hit=False)
+        projection_key = None
+        if projection is not None:
+            projection_key = (
+                projection.with_bodies,
+                projection.with_field_values,
+                tuple(projection.field_names or ()),
+            )
+        return await self.__flights.run(
+            ('issues', incremental, projection_key),
+            lambda: self.__reload_project_issues(
+                incremental,
+                projection,
+                partition_by,
+                partitions,
+                max_concurrent_partitions,
+            ),
+        )
+
+    def __get_scan_lock(self) -> asyncio.Lock:
+        # Not made in __init__: clients are often created at import time,
+        # and before Python 3.10 the lock would be bound to the default
+        # loop instead of the one running the scans
+        if self.__scan_lock is None:
+            self.__scan_lock = asyncio.Lock()
+        return self.__scan_lock
+
+    async def __reload_project_issues(self, incremental: bool, *args):
+        async with self.__get_scan_lock():
+            return await self.__scan_project_issues(incremental, *args)
+
+    async def __get_partitions(self, field_name: str) -> List[str]:
+        # Options are reloaded, otherwise items with an option added
+        # after the fields were cached would not get into any slice
+        fields = await self.get_project_fields(reload=True)
+        field = fields.get(field_name)
+        if not isinstance(field, SingleSelectProjectField):
+            raise ValueError(
+                f'Cannot partition by {field_name}: '
+                'it is not a single select field'
+            )
+        partitions = [
+            generate_items_filter(field.name, option.name)
+            for option in field.options
+        ]
+        partitions.append(generate_items_filter(field.name))
+        return partitions
+
+    async def __load_partitions(
+        self,
+        partitions: Sequence[str],
+        projection: Optional[ProjectItemsProjection],
+        max_concurrency: int,
+        process_page: Callable[[List[dict]], None],
+    ):
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def load_partition(items_query: str):
+            async with semaphore:
+                pages = self.__load_project_items(
+                    items_query,
+                    projection=projection,
+                )
+                async for items in pages:
+                    process_page(items)
+
+        tasks = [
+            asyncio.ensure_future(load_partition(items_query))
+            for items_query in dict.fromkeys(partitions)
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def __scan_project_issues(
+        self,
+        incremental: bool,
+        projection: Optional[ProjectItemsProjection],
+        partition_by: Optional[str],
+        partitions: Optional[Sequence[str]],
+        max_concurrent_partitions: int,
+    ):
+        # Incremental sync only merges changed items, it cannot notice
+        # items removed from the project, so a full reload is still
+        # needed from time to time
+        started_at = time.perf_counter()
+        # The watermark is the start of the scan, not the newest item
+        # seen: items on the first pages may change before it ends
+        synced_at = datetime.now(timezone.utc) - SYNC_SAFETY_MARGIN
+        if incremental and self.__issues_cache and self.__last_synced_at:
+            pages, items_count = await self.__sync_project_issues(projection)
+            self.__last_synced_at = synced_at
+            self.metrics.record_scan(
+                'incremental',
+                pages,
+                items_count,
+                time.perf_counter() - started_at,
+            )
+            return self.__issues_cache
+
+        previous_cache = self.__issues_cache
+        # Slices may overlap, items are deduplicated by their IDs
+        project_items: Dict[str, CachedProjectItem] = {}
+        pages_count = 0
+
+        def process_page(items: List[dict]):
+            nonlocal pages_count
+            pages_count += 1
+            for item_data in items:
+                project_item = self.__parse_project_item(item_data)
+                if projection is not None and not projection.is_full:
+                    self.__merge_projected_item(
+                        project_item,
+                        previous_cache.get(project_item.id),
+                        projection,
+                    )
+                project_items[project_item.id] = project_item
+
+        if partition_by:
+            partitions = await self.__get_partitions(partition_by)
+        if partitions:
+            await self.__load_partitions(
+                partitions,
+                projection,
+                max_concurrent_partitions,
+                process_page,
+            )
+        else:
+            pages = self.__load_project_items(projection=projection)
+            async for items in pages:
+                process_page(items)
+        # The caches are swapped at once after the scan, readers keep
+        # using the previous ones until then
+        self.__replace_project_items(list(project_items.values()))
+        self.__last_synced_at = synced_at
+        self.metrics.record_scan(
+            'partitioned' if partitions else 'full',
+            pages_count,
+            len(self.__issues_cache),
+            time.perf_counter() - started_at,
+        )
         return self.__issues_cache
 
+    async def fetch_bodies(self, content_ids: List[str]) -> Dict[str, str]:
+        bodies = {}
+        content_ids = list(dict.fromkeys(content_ids))
+        for start in range(0, len(content_ids), NODES_BATCH_SIZE):
+            response = await self.make_request(
+                QUERY_NODES_BODIES,
+                variables={
+                    'ids': content_ids[start:start + NODES_BATCH_SIZE],
+                },
+            )
+            for node in (response.get('data') or {}).get('nodes') or []:
+                if not node or 'body' not in node:
+                    continue
+                bodies[node['id']] = node['body']
+                project_item = self.__issues_content_cache.get(node['id'])
+                if project_item is None:
+                    continue
+                project_item.content.body = node['body']
+                if self.__text_index is not None:
+                    self.__index_item_text(project_item)
+        return bodies
+
+    async def get_content_body(self, content_id: str) -> Optional[str]:
+        project_item = self.__issues_content_cache.get(content_id)
+        if project_item is not None and project_item.content.body is not None:
+            self.metrics.record_cache('bodies', hit=True)
+            return project_item.content.body
+        self.metrics.record_cache('bodies', hit=False)
+        # Other missing bodies are loaded in the same request,
+        # they are likely to be accessed next
+        content_ids = [content_id]
+        for other_id, other_item in self.__issues_content_cache.items():
+            if len(content_ids) >= NODES_BATCH_SIZE:
+                break
+            if other_id != content_id and other_item.content.body is None:
+                content_ids.append(other_id)
+        bodies = await self.fetch_bodies(content_ids)
+        return bodies.get(content_id)
+
+    def __uncache_project_item(self, item_id: str):
+        project_item = self.__issues_cache.pop(item_id, None)
+        if project_item is None:
+            return
+        self.__items_index.remove(item_id)
+        if project_item.content is not None:
+            self.__issues_content_cache.pop(project_item.content.id, None)
+            if self.__text_index is not None:
+                self.__text_index.remove(project_item.content.id)
+
+    def __reindex_project_item(self, project_item: CachedProjectItem):
+        # Items changed in place have to be indexed again
+        self.__items_index.add(project_item)
+        if self.__text_index is not None:
+            self.__index_item_text(project_item)
+
+    async def refresh_project_item(self, item_id: str) -> bool:
+        project_item = await self.load_node(item_id)
+        if (
+            not isinstance(project_item, (ProjectItem, CompactProjectItem))
+            or project_item.project_id != self.__project_id
+        ):
+            self.__uncache_project_item(item_id)
+            return False
+        # A single item in the empty cache would look like
+        # a loaded board to get_project_issues()
+        if self.__issues_cache:
+            self.__cache_project_item(project_item)
+        return True
+
+    def __is_outdated_event(
+        self,
+        node_id: str,
+        updated_at: Optional[str],
+        cached_updated_at: Optional[datetime] = None,
+    ) -> bool:
+        if not updated_at:
+            return False
+        event_time = datetime.fromisoformat(updated_at.replace('Z', '+00:00'))
+        last_time = self.__event_versions.get(node_id) or cached_updated_at
+        if last_time is not None and event_time < last_time:
+            return True
+        self.__event_versions[node_id] = event_time
+        return False
+
+    async def __apply_project_item_event(
+        self,
+        action: str,
+        payload: dict,
+    ) -> bool:
+        item_data = payload.get('projects_v2_item') or {}
+        item_id = item_data.get('node_id')
+        project_id = item_data.get('project_node_id')
+        if not item_id or project_id != self.__project_id:
+            return False
+        project_item = self.__issues_cache.get(item_id)
+        if self.__is_outdated_event(
+            item_id,
+            item_data.get('updated_at'),
+            project_item.updated_at if project_item is not None else None,
+        ):
+            return False
+        if action in ('archived', 'deleted'):
+            self.__uncache_project_item(item_id)
+            return True
+        if action == 'reordered' and project_item is not None:
+            return True
+        field_change = (payload.get('changes') or {}).get('field_value') or {}
+        field = None
+        for cached_field in self.__fields_cache.values():
+            if cached_field.id == field_change.get('field_node_id'):
+                field = cached_field
+                break
+        new_value = field_change.get('to')
+        if isinstance(new_value, dict):
+            new_value = new_value.get('name')
+        if (
+            action == 'edited'
+            and project_item is not None
+            and field is not None
+            and isinstance(new_value, str)
+            and field_change.get('field_type') in ('single_select', 'text')
+        ):
+            project_item.set_field_value(field.name, new_value, field.id)
+            self.__reindex_project_item(project_item)
+            return True
+        # Created, restored and converted items, changes without
+        # the new value and unknown items are fetched from GitHub
+        return await self.refresh_project_item(item_id)
+
+    def __get_event_issue_item(
+        self,
+        issue_data: dict,
+    ) -> Optional[CachedProjectItem]:
+        content_id = issue_data.get('node_id')
+        project_item = self.__issues_content_cache.get(content_id)
+        if project_item is None:
+            # Issues get to the project through projects_v2_item events
+            return None
+        if self.__is_outdated_event(content_id, issue_data.get('updated_at')):
+            return None
+        return project_item
+
+    async def __apply_issue_event(self, action: str, payload: dict) -> bool:
+        issue_data = payload.get('issue') or {}
+        project_item = self.__get_event_issue_item(issue_data)
+        if project_item is None:
+            return False
+        if action in ('deleted', 'transferred'):
+            self.__uncache_project_item(project_item.id)
+            return True
+        return await self.__update_issue_content(project_item, issue_data)
+
+    async def __apply_issue_comment_event(self, payload: dict) -> bool:
+        # The action is about the comment, the issue is only updated
+        issue_data = payload.get('issue') or {}
+        project_item = self.__get_event_issue_item(issue_data)
+        if project_item is None:
+            return False
+        return await self.__update_issue_content(project_item, issue_data)
+
+    async def __update_issue_content(
+        self,
+        project_item: CachedProjectItem,
+        issue_data: dict,
+    ) -> bool:
+        if 'title' not in issue_data or 'state' not in issue_data:
+            return await self.refresh_project_item(project_item.id)
+        content = project_item.content
+        content.title = issue_data['title']
+        content.body = issue_data.get('body') or ''
+        if hasattr(content, 'state'):
+            content.state = issue_data['state'].upper()
+        self.__reindex_project_item(project_item)
+        return True
+
+    async def apply_webhook_event(
+        self,
+        event_name: str,
+        payload: dict,
+    ) -> bool:
+        # Returns True when the cache was changed (or already up to date)
+        # and False when the event was ignored
+        action = payload.get('action', '')
+        if event_name == 'projects_v2_item':
+            return await self.__apply_project_item_event(action, payload)
+        if event_name == 'issues':
+            return await self.__apply_issue_event(action, payload)
+        if event_name == 'issue_comment':
+            return await self.__apply_issue_comment_event(payload)
+        return False
+
+    async def __fetch_nodes(
+        self,
+        node_ids: List[str],
+    ) -> Dict[str, Union[CachedProjectItem, ContentType]]:
+        response = await self.make_request(
+            QUERY_NODES,
+            variables={'ids': node_ids},
+        )
+        nodes = {}
+        for node in (response.get('data') or {}).get('nodes') or []:
+            if not node:
+                continue
+            if node.get('__typename') == 'ProjectV2Item':
+                project = node.pop('project', None) or {}
+                project_item = self.__parse_project_item(node)
+                project_item.project_id = project.get('id')
+                nodes[project_item.id] = project_item
+            elif 'id' in node:
+                nodes[node['id']] = self.__parse_content(node)
+        return nodes
+
+    async def load_node(
+        self,
+        node_id: str,
+    ) -> Optional[Union[CachedProjectItem, ContentType]]:
+        # Lookups made by concurrent coroutines during the same event loop
+        # iteration are sent together in nodes() queries. Inside of
+        # node_loader_scope() results are also reused by later lookups.
+        return await self.__node_loader.load(node_id)
+
+    async def load_nodes(
+        self,
+        node_ids: List[str],
+    ) -> List[Optional[Union[CachedProjectItem, ContentType]]]:
+        return await self.__node_loader.load_many(node_ids)
+
+    @staticmethod
+    def node_loader_scope():
+        return node_cache_scope()
+
+    def find_project_items(
+        self,
+        number: Optional[int] = None,
+        title: Optional[str] = None,
+        repository_id: Optional[str] = None,
+        fields: Optional[Dict[str, str]] = None,
+    ) -> List[CachedProjectItem]:
+        item_ids = self.__items_index.find(
+            number=number,
+            title=title,
+            repository_id=repository_id,
+            fields=fields,
+        )
+        return [self.__issues_cache[item_id] for item_id in item_ids]
+
+    def get_item_by_issue_number(
+        self,
+        number: int,
+        repository_id: Optional[str] = None,
+    ) -> Optional[CachedProjectItem]:
+        # Issue numbers are unique only within a repository
+        items = self.find_project_items(
+            number=number,
+            repository_id=repository_id or self.__default_repository_id,
+        )
+        return items[0] if items else None
+
+    def count_items_by_field(self, field_name: str) -> Dict[str, int]:
+        return self.__items_index.count(field_name)
+
+    def __index_item_text(self, project_item: CachedProjectItem):
+        if project_item.type != 'ISSUE' or project_item.content is None:
+            return
+        self.__text_index.add(
+            project_item.content.id,
+            project_item.content.title,
+            project_item.content.body,
+        )
+
+    async def search_cached_issues(
+        self,
+        query: str,
+        limit: int = 30,
+        include_closed: bool = False,
+        remote_fallback: bool = False,
+    ) -> List[Union[IssueContent, CompactContent]]:
+        # Searches titles and bodies of the cached issues, words have to
+        # match all, "quoted text" has to match as a phrase
+        if not query:
+            raise ValueError('Query cannot be empty string')
+        if self.__text_index is None:
+            self.__text_index = TextSearchIndex()
+            for project_item in self.__issues_cache.values():
+                self.__index_item_text(project_item)
+        accept = None
+        if not include_closed:
+            def accept(content_id: str) -> bool:
+                content = self.__issues_content_cache[content_id].content
+                return content.state == 'OPEN'
+        hits = self.__text_index.search(query, limit=limit, accept=accept)
+        result = [
+            self.__issues_content_cache[content_id].content
+            for content_id, _ in hits
+        ]
+        if result or not remote_fallback:
+            return result
+        response = await self.serach_issues(query)
+        nodes = SEARCH_NODES_PATH.search(response) or []
+        for node in nodes:
+            if node:
+                result.append(IssueContent(state='OPEN', **node))
+        return result[:limit]
+
     async def get_project_content_issues(self, reload: bool = False):
         if reload:
             await self.get_project_issues(reload=True)
         return self.__issues_content_cache
 
-    async def initialize(self):
-        await self.get_project_fields()
-        await self.get_project_issues()
+    async def __load_repository_id(self):
         repository_data = await self.make_request(
             QUERY_ORG_REPOSITORY_INFO,
             variables=self.__base_query_variables,
         )
-        self.__default_repository_id = jmespath.search(
-            'data.organization.repository.id',
+        self.__default_repository_id = REPOSITORY_ID_PATH.search(
             repository_data,
         )
 
+    async def initialize(self):
+        if self.__snapshot_path and await self.load_snapshot():
+            # Caches are warm already, bring them up to date
+            # without blocking the caller
+            self.__reconcile_task = asyncio.ensure_future(self.__reconcile())
+            return
+        await self.get_project_fields()
+        await self.get_project_issues()
+        await self.__load_repository_id()
+        if self.__snapshot_path:
+            await self.save_snapshot()
+
+    async def __reconcile(self):
+        # A full reload, incremental sync cannot notice items removed
+        # from the board since the snapshot was saved. Nobody may wait
+        # for the task, so errors are only logged.
+        try:
+            await self.get_project_fields(reload=True)
+            await self.get_project_issues(reload=True)
+            await self.__load_repository_id()
+            await self.save_snapshot()
+        except Exception:
+            self.__logger.exception('Cannot reconcile the project snapshot')
+
+    async def wait_for_reconciliation(self):
+        if self.__reconcile_task is not None:
+            await self.__reconcile_task
+
+    async def load_snapshot(self, path: Optional[str] = None) -> bool:
+        path = path or self.__snapshot_path
+        if not path:
+            raise ValueError('Snapshot path is not specified')
+        loop = asyncio.get_running_loop()
+        try:
+            snapshot = await loop.run_in_executor(None, read_snapshot, path)
+        except Exception:
+            self.__logger.warning(
+                'Cannot read the project snapshot %s', path, exc_info=True,
+            )
+            return False
+        if snapshot is None:
+            return False
+        is_compatible = (
+            snapshot.organization == self.__org_name
+            and snapshot.project_number == self.__project_number
+            and snapshot.repository_name == self.__default_repo_name
+        )
+        if not is_compatible:
+            self.__logger.info(
+                'Project snapshot %s belongs to another project', path,
+            )
+            return False
+        if (
+            self.__snapshot_max_age is not None
+            and time.time() - snapshot.created_at > self.__snapshot_max_age
+        ):
+            self.__logger.info('Project snapshot %s is stale', path)
+            return False
+        try:
+            fields = [deserialize_field(field) for field in snapshot.fields]
+            items = [deserialize_item(item) for item in snapshot.items]
+            if self.__compact_cache:
+                items = [CompactProjectItem.from_model(item) for item in items]
+        except Exception:
+            self.__logger.warning(
+                'Project snapshot %s is malformed', path, exc_info=True,
+            )
+            return False
+        self.__project_id = snapshot.project_id
+        self.__default_repository_id = snapshot.repository_id
+        self.__fields_cache = {field.name: field for field in fields}
+        self.__replace_project_items(items)
+        self.__last_synced_at = snapshot.last_synced_at
+        return True
+
+    async def save_snapshot(self, path: Optional[str] = None):
+        path = path or self.__snapshot_path
+        if not path:
+            raise ValueError('Snapshot path is not specified')
+        snapshot = ProjectSnapshot(
+            organization=self.__org_name,
+            project_number=self.__project_number,
+            repository_name=self.__default_repo_name,
+            project_id=self.__project_id,
+            repository_id=self.__default_repository_id,
+            last_synced_at=self.__last_synced_at,
+            fields=[
+                serialize_field(field)
+                for field in self.__fields_cache.values()
+            ],
+            items=[
+                serialize_item(
+                    item.to_model()
+                    if isinstance(item, CompactProjectItem)
+                    else item
+                )
+                for item in self.__issues_cache.values()
+            ],
+        )
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, write_snapshot, path, snapshot)
+
+    async def close(self):
+        # Queued updates are sent before the session is closed
+        await self.__write_queue.close()
+        await self.__flights.cancel_all()
+        if self.__reconcile_task is not None:
+            self.__reconcile_task.cancel()
+            try:
+                await self.__reconcile_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self.__reconcile_task = None
+        await super().close()
+
+    def __is_cached_value(
+        self,
+        item_id: str,
+        field_name: str,
+        value: Union[str, float],
+    ) -> bool:
+        # The cache may be stale when the board is changed by someone
+        # else, force=True sends the value anyway
+        project_item = self.__issues_cache.get(item_id)
+        hit = (
+            project_item is not None
+            and project_item.get_field_value(field_name) == value
+        )
+        self.metrics.record_cache('writes', hit=hit)
+        return hit
+
+    def __write_through(
+        self,
+        item_id: str,
+        field_name: str,
+        value: str,
+        field_id: str,
+    ):
+        project_item = self.__issues_cache.get(item_id)
+        if project_item is None:
+            return
+        project_item.set_field_value(field_name, value, field_id)
+        self.__reindex_project_item(project_item)
+
     async def __set_single_select_field(
         self,
         column_name: str,
         option_name: str,
         issue_id: str,
+        force: bool = False,
     ):
+        if self.__write_behind:
+            # Checked against the cache when the queue is flushed,
+            # a value queued earlier may be pending for the field
+            self.queue_field_update(
+                issue_id,
+                column_name,
+                option_name,
+                value_type='single_select',
+                force=force,
+            )
+            return
         column: SingleSelectProjectField = self.__fields_cache.get(column_name)
         if not column:
             raise ValueError(f'Incorrect column name: {column_name}')
@@ -245,9 +1445,15 @@ class IntegrationsGHGraphQLClient(BaseGHGraphQLClient):
                 option = opt
                 break
         if not option:
-            ValueError(
+            raise ValueError(
                 f'Incorrect option for the column {column_name}: {option_name}'
             )
+        if not force and self.__is_cached_value(
+            issue_id,
+            column_name,
+            option_name,
+        ):
+            return
         mutation = generate_project_field_modification_mutation(
             value_type='single_select'
         )
@@ -258,16 +1464,33 @@ class IntegrationsGHGraphQLClient(BaseGHGraphQLClient):
             'option_id': option.id,
         }
         await self.make_request(mutation, variables=variables)
+        self.__write_through(issue_id, column_name, option_name, column.id)
 
     async def set_text_field(
         self,
         issue_id: str,
         field_name: str,
         field_value: str,
+        force: bool = False,
     ):
+        if self.__write_behind:
+            self.queue_field_update(
+                issue_id,
+                field_name,
+                field_value,
+                value_type='text',
+                force=force,
+            )
+            return
         field: BaseField = self.__fields_cache.get(field_name)
         if not field:
             raise ValueError(f'No such field: {field_name}')
+        if not force and self.__is_cached_value(
+            issue_id,
+            field_name,
+            field_value,
+        ):
+            return
         variables = {
             'project_id': self.__project_id,
             'item_id': issue_id,
@@ -276,17 +1499,196 @@ class IntegrationsGHGraphQLClient(BaseGHGraphQLClient):
         }
         mutation = generate_project_field_modification_mutation()
         await self.make_request(mutation, variables=variables)
+        self.__write_through(issue_id, field_name, field_value, field.id)
 
-    async def set_issue_status(self, issue_id: str, status: str):
-        await self.__set_single_select_field('Status', status, issue_id)
+    async def set_issue_status(
+        self,
+        issue_id: str,
+        status: str,
+        force: bool = False,
+    ):
+        await self.__set_single_select_field(
+            'Status',
+            status,
+            issue_id,
+            force=force,
+        )
 
-    async def set_issue_platform(self, issue_id: str, platform_name: str):
+    async def set_issue_platform(
+        self,
+        issue_id: str,
+        platform_name: str,
+        force: bool = False,
+    ):
         await self.__set_single_select_field(
             'Platform',
             platform_name,
             issue_id,
+            force=force,
         )
 
+    def __resolve_field_update(
+        self,
+        update: ProjectFieldUpdate,
+    ) -> Tuple[str, str, Union[str, float]]:
+        field = self.__fields_cache.get(update.field_name)
+        if not field:
+            raise ValueError(f'No such field: {update.field_name}')
+        value_type = update.value_type
+        if value_type is None:
+            value_type = (
+                'single_select'
+                if isinstance(field, SingleSelectProjectField)
+                else 'text'
+            )
+        if value_type not in FIELD_VALUE_TYPES:
+            raise ValueError(f'Incorrect value type: {value_type}')
+        value = update.value
+        if value_type == 'single_select':
+            option = None
+            for opt in getattr(field, 'options', []):
+                if opt.name == value:
+                    option = opt
+                    break
+            if not option:
+                raise ValueError(
+                    f'Incorrect option for the column {field.name}: {value}'
+                )
+            value = option.id
+        return field.id, value_type, value
+
+    @staticmethod
+    def __get_errors_by_alias(response: dict) -> Dict[Optional[str], str]:
+        errors = {}
+        for error in response.get('errors') or []:
+            path = error.get('path') or [None]
+            errors.setdefault(path[0], error.get('message', 'Unknown error'))
+        return errors
+
+    async def set_fields_batch(
+        self,
+        updates: List[ProjectFieldUpdate],
+        max_mutations_per_request: int = DEFAULT_MUTATIONS_PER_REQUEST,
+    ) -> List[ProjectFieldUpdateResult]:
+        if max_mutations_per_request < 1:
+            raise ValueError('Mutations per request should be positive')
+        results: List[Any] = [None] * len(updates)
+        prepared = []
+        # An update which is sent before in the same call may change
+        # the value, the cached one cannot be trusted for these fields
+        sent_keys = set()
+        for index, update in enumerate(updates):
+            try:
+                field_id, value_type, value = self.__resolve_field_update(
+                    update
+                )
+            except ValueError as error:
+                results[index] = ProjectFieldUpdateResult(
+                    item_id=update.item_id,
+                    field_name=update.field_name,
+                    value=update.value,
+                    success=False,
+                    error=str(error),
+                )
+                continue
+            key = (update.item_id, update.field_name)
+            if (
+                not update.force
+                and value_type in CACHED_FIELD_VALUE_TYPES
+                and key not in sent_keys
+                and self.__is_cached_value(*key, update.value)
+            ):
+                results[index] = ProjectFieldUpdateResult(
+                    item_id=update.item_id,
+                    field_name=update.field_name,
+                    value=update.value,
+                    success=True,
+                    skipped=True,
+                )
+                continue
+            sent_keys.add(key)
+            prepared.append((index, update, field_id, value_type, value))
+        for start in range(0, len(prepared), max_mutations_per_request):
+            chunk = prepared[start:start + max_mutations_per_request]
+            mutation = generate_project_fields_batch_mutation(
+                [value_type for _, _, _, value_type, _ in chunk]
+            )
+            variables = {'project_id': self.__project_id}
+            for alias_index, (_, update, field_id, _, value) in enumerate(
+                chunk
+            ):
+                variables[f'item_id_{alias_index}'] = update.item_id
+                variables[f'field_id_{alias_index}'] = field_id
+                variables[f'value_{alias_index}'] = value
+            try:
+                response = await self.make_request(
+                    mutation,
+                    variables=variables,
+                )
+            except GHRequestError as error:
+                # Earlier chunks are applied already, their results
+                # are kept and only this chunk is reported as failed
+                for index, update, _, _, _ in chunk:
+                    results[index] = ProjectFieldUpdateResult(
+                        item_id=update.item_id,
+                        field_name=update.field_name,
+                        value=update.value,
+                        success=False,
+                        error=str(error),
+                    )
+                continue
+            errors = self.__get_errors_by_alias(response)
+            data = response.get('data') or {}
+            for alias_index, (index, update, field_id, value_type, _) in (
+                enumerate(chunk)
+            ):
+                alias = f'update_{alias_index}'
+                error = errors.get(alias) or errors.get(None)
+                if not error and not data.get(alias):
+                    error = 'Empty mutation result'
+                if not error and value_type in CACHED_FIELD_VALUE_TYPES:
+                    self.__write_through(
+                        update.item_id,
+                        update.field_name,
+                        update.value,
+                        field_id,
+                    )
+                results[index] = ProjectFieldUpdateResult(
+                    item_id=update.item_id,
+                    field_name=update.field_name,
+                    value=update.value,
+                    success=not error,
+                    error=error,
+                )
+        return results
+
+    def queue_field_update(
+        self,
+        item_id: str,
+        field_name: str,
+        value: Union[str, float],
+        value_type: Optional[str] = None,
+        force: bool = False,
+    ) -> asyncio.Future:
+        # The update is validated right away and sent by the write
+        # queue later, the future gets its ProjectFieldUpdateResult
+        update = ProjectFieldUpdate(
+            item_id=item_id,
+            field_name=field_name,
+            value=value,
+            value_type=value_type,
+            force=force,
+        )
+        self.__resolve_field_update(update)
+        return self.__write_queue.put(update)
+
+    async def flush(self):
+        await self.__write_queue.flush()
+
+    @property
+    def pending_updates_count(self) -> int:
+        return self.__write_queue.pending_count
+
     async def create_issue(
         self,
         title: str,
@@ -306,7 +1708,8 @@ class IntegrationsGHGraphQLClient(BaseGHGraphQLClient):
             MUTATION_CREATE_ISSUE,
             variables=variables,
         )
-        new_issue_id = jmespath.search('data.createIssue.issue.id', response)
+        issue_data = CREATED_ISSUE_PATH.search(response) or {}
+        new_issue_id = issue_data.get('id')
 
         # Create project item
         variables = {
@@ -317,23 +1720,212 @@ class IntegrationsGHGraphQLClient(BaseGHGraphQLClient):
             MUTATION_CREATE_PROJECT_ITEM,
             variables=variables,
         )
-        project_item_id = jmespath.search(
-            'data.addProjectV2ItemById.item.id', response
-        )
+        project_item_id = CREATED_PROJECT_ITEM_ID_PATH.search(response)
+        if project_item_id and new_issue_id:
+            # The status is written through when it is set
+            self.__cache_new_issue(
+                project_item_id,
+                issue_data,
+                IssueCreationRequest(
+                    title=title,
+                    body=body,
+                    initial_status=initial_status,
+                    repository_id=repo_id,
+                ),
+                repo_id,
+            )
         await self.set_issue_status(project_item_id, initial_status)
         return new_issue_id, project_item_id
 
+    def __cache_new_issue(
+        self,
+        project_item_id: str,
+        issue_data: dict,
+        request: IssueCreationRequest,
+        repository_id: Optional[str],
+        status: Optional[str] = None,
+    ):
+        # A single item in the empty cache would look like
+        # a loaded board to get_project_issues()
+        if not self.__issues_cache:
+            return
+        project_item = ProjectItem(
+            id=project_item_id,
+            type='ISSUE',
+            content=IssueContent(
+                id=issue_data['id'],
+                title=request.title,
+                body=request.body,
+                number=issue_data['number'],
+                state=issue_data.get('state') or 'OPEN',
+            ),
+            project_id=self.__project_id,
+            repository_id=repository_id,
+            fields={},
+        )
+        status_field = self.__fields_cache.get('Status')
+        if status and status_field:
+            project_item.set_field_value('Status', status, status_field.id)
+        if self.__compact_cache:
+            project_item = CompactProjectItem.from_model(project_item)
+        self.__cache_project_item(project_item)
+
+    async def __create_issues_chunk(
+        self,
+        chunk: List[Tuple[IssueCreationRequest, IssueCreationResult]],
+    ):
+        # Stage 1: create issues in their repositories
+        variables = {}
+        for index, (request, _) in enumerate(chunk):
+            variables[f'title_{index}'] = request.title
+            variables[f'body_{index}'] = request.body
+            variables[f'repository_id_{index}'] = (
+                request.repository_id or self.__default_repository_id
+            )
+        response = await self.make_request(
+            generate_create_issues_batch_mutation(len(chunk)),
+            variables=variables,
+        )
+        errors = self.__get_errors_by_alias(response)
+        data = response.get('data') or {}
+        created = []
+        for index, (request, result) in enumerate(chunk):
+            issue_data = (data.get(f'issue_{index}') or {}).get('issue')
+            if not issue_data:
+                result.error = (
+                    errors.get(f'issue_{index}')
+                    or errors.get(None)
+                    or 'Issue is not created'
+                )
+                continue
+            result.issue_id = issue_data['id']
+            created.append((request, result, issue_data))
+        if not created:
+            return
+
+        # Stage 2: add the new issues to the project
+        variables = {'project_id': self.__project_id}
+        for index, (_, result, _) in enumerate(created):
+            variables[f'github_item_id_{index}'] = result.issue_id
+        response = await self.make_request(
+            generate_create_project_items_batch_mutation(len(created)),
+            variables=variables,
+        )
+        errors = self.__get_errors_by_alias(response)
+        data = response.get('data') or {}
+        added = []
+        for index, (request, result, issue_data) in enumerate(created):
+            item_data = (data.get(f'item_{index}') or {}).get('item')
+            if not item_data:
+                result.error = (
+                    errors.get(f'item_{index}')
+                    or errors.get(None)
+                    or 'Project item is not created'
+                )
+                continue
+            result.project_item_id = item_data['id']
+            added.append((request, result, issue_data))
+
+        # Stage 3: set initial statuses
+        updates = [
+            ProjectFieldUpdate(
+                item_id=result.project_item_id,
+                field_name='Status',
+                value=request.initial_status,
+            )
+            for request, result, _ in added
+            if request.initial_status
+        ]
+        update_results = {
+            update_result.item_id: update_result
+            for update_result in await self.set_fields_batch(updates)
+        }
+        for request, result, issue_data in added:
+            update_result = update_results.get(result.project_item_id)
+            status = None
+            if update_result is not None and not update_result.success:
+                result.error = f'Status is not set: {update_result.error}'
+            else:
+                status = request.initial_status
+                result.success = True
+            self.__cache_new_issue(
+                result.project_item_id,
+                issue_data,
+                request,
+                request.repository_id or self.__default_repository_id,
+                status=status,
+            )
+
+    async def create_issues(
+        self,
+        issues: List[IssueCreationRequest],
+        issues_per_request: int = DEFAULT_ISSUES_PER_REQUEST,
+        concurrency: int = DEFAULT_ISSUE_CREATION_CONCURRENCY,
+    ) -> List[IssueCreationResult]:
+        # Issues go through the stages of create_issue() in chunks,
+        # each stage of a chunk is a single aliased mutation and up to
+        # `concurrency` chunks are in different stages at the same time
+        if issues_per_request < 1 or concurrency < 1:
+            raise ValueError('Chunk size and concurrency should be positive')
+        results = []
+        valid = []
+        for request in issues:
+            result = IssueCreationResult(title=request.title)
+            results.append(result)
+            if not request.title:
+                result.error = 'Issue title cannot be empty string'
+            elif not request.body:
+                result.error = 'Issue body cannot be empty string'
+            else:
+                valid.append((request, result))
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def process_chunk(chunk):
+            async with semaphore:
+                try:
+                    await self.__create_issues_chunk(chunk)
+                except GHRequestError as error:
+                    for _, result in chunk:
+                        if not result.success and not result.error:
+                            result.error = str(error)
+
+        await asyncio.gather(*(
+            process_chunk(valid[start:start + issues_per_request])
+            for start in range(0, len(valid), issues_per_request)
+        ))
+        return results
+
     async def close_issue(
         self,
         issue_id: str,
+        force: bool = False,
     ):
         # Validate inputs
         if not issue_id:
             raise ValueError('Issue ID cannot be empty string')
+        project_item = self.__issues_content_cache.get(issue_id)
+        state = None
+        if project_item is not None:
+            state = getattr(project_item.content, 'state', None)
+        if not force and project_item is not None:
+            closed = state == 'CLOSED'
+            self.metrics.record_cache('writes', hit=closed)
+            if closed:
+                # Same data as GitHub returns for the mutation
+                return {
+                    'data': {
+                        'closeIssue': {
+                            'issue': {'id': issue_id, 'state': state},
+                        },
+                    },
+                }
         response = await self.make_request(
             MUTATION_CLOSE_ISSUE,
             variables={'issueId': issue_id},
         )
+        new_state = CLOSED_ISSUE_STATE_PATH.search(response)
+        if state is not None and new_state:
+            project_item.content.state = new_state
         return response
 
     async def create_comment(
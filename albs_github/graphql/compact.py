@@ -0,0 +1,227 @@
+# This file contains the compact representation of cached project items
+import sys
+from datetime import datetime
+from typing import Dict, Optional, Tuple, Union
+
+from .models import (
+    DraftIssueContent,
+    IssueContent,
+    ProjectItem,
+    PullRequestContent,
+)
+
+__all__ = [
+    'CompactContent',
+    'CompactProjectItem',
+    'parse_compact_content',
+    'parse_compact_project_item',
+]
+
+CONTENT_MODELS = {
+    'DraftIssue': DraftIssueContent,
+    'Issue': IssueContent,
+    'PullRequest': PullRequestContent,
+}
+
+FieldValue = Tuple[str, str, Optional[str]]
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+class CompactContent:
+    __slots__ = ('type_name', 'id', 'title', 'body', 'number', 'state')
+
+    def __init__(
+        self,
+        type_name: str,
+        id: str,
+        title: str,
+        body: Optional[str],
+        number: Optional[int] = None,
+        state: Optional[str] = None,
+    ):
+        self.type_name = type_name
+        self.id = id
+        self.title = title
+        self.body = body
+        self.number = number
+        self.state = state
+
+    @classmethod
+    def from_model(
+        cls,
+        content: Union[DraftIssueContent, IssueContent, PullRequestContent],
+    ) -> 'CompactContent':
+        for type_name, model in CONTENT_MODELS.items():
+            if type(content) is model:
+                break
+        else:
+            type_name = 'PullRequest'
+        return cls(
+            sys.intern(type_name),
+            content.id,
+            content.title,
+            content.body,
+            getattr(content, 'number', None),
+            _intern(getattr(content, 'state', None)),
+        )
+
+    def to_model(
+        self,
+    ) -> Union[DraftIssueContent, IssueContent, PullRequestContent]:
+        data = {'id': self.id, 'title': self.title, 'body': self.body}
+        if self.type_name != 'DraftIssue':
+            data['number'] = self.number
+        if self.type_name == 'Issue':
+            data['state'] = self.state
+        return CONTENT_MODELS.get(self.type_name, PullRequestContent)(**data)
+
+
+class CompactProjectItem:
+    __slots__ = (
+        'id',
+        'type',
+        'content',
+        'project_id',
+        'repository_id',
+        'updated_at',
+        'field_values',
+    )
+
+    def __init__(
+        self,
+        id: str,
+        type: str,
+        content: Optional[CompactContent] = None,
+        project_id: Optional[str] = None,
+        repository_id: Optional[str] = None,
+        updated_at: Optional[datetime] = None,
+        field_values: Optional[Dict[str, FieldValue]] = None,
+    ):
+        self.id = id
+        self.type = type
+        self.content = content
+        self.project_id = project_id
+        self.repository_id = repository_id
+        self.updated_at = updated_at
+        # Field name -> (value, field id, value id), names and ids
+        # are interned so every item shares the same string objects
+        self.field_values = field_values if field_values is not None else {}
+
+    @property
+    def fields(self) -> Dict[str, dict]:
+        # Built on every access in the same layout as ProjectItem.fields,
+        # use set_field_value() to change the values
+        return {
+            name: {
+                'name': name,
+                'value': value,
+                'filed_id': field_id,
+                'value_id': value_id,
+            }
+            for name, (value, field_id, value_id) in self.field_values.items()
+        }
+
+    def get_field_value(self, field_name: str) -> Optional[str]:
+        field_value = self.field_values.get(field_name)
+        return field_value[0] if field_value else None
+
+    def set_field_value(
+        self,
+        field_name: str,
+        value: str,
+        field_id: str,
+        value_id: Optional[str] = None,
+    ):
+        if value_id is None and field_name in self.field_values:
+            value_id = self.field_values[field_name][2]
+        self.field_values[sys.intern(field_name)] = (
+            value,
+            sys.intern(field_id),
+            value_id,
+        )
+
+    @classmethod
+    def from_model(cls, item: ProjectItem) -> 'CompactProjectItem':
+        compact_item = cls(
+            item.id,
+            sys.intern(item.type),
+            CompactContent.from_model(item.content) if item.content else None,
+            _intern(item.project_id),
+            _intern(item.repository_id),
+            item.updated_at,
+        )
+        for name, field in (item.fields or {}).items():
+            compact_item.set_field_value(
+                name,
+                field['value'],
+                field['filed_id'],
+                field['value_id'],
+            )
+        return compact_item
+
+    def to_model(self) -> ProjectItem:
+        return ProjectItem(
+            id=self.id,
+            type=self.type,
+            content=self.content.to_model() if self.content else None,
+            project_id=self.project_id,
+            repository_id=self.repository_id,
+            fields=self.fields,
+            updated_at=self.updated_at,
+        )
+
+
+def parse_compact_content(content_data: dict) -> CompactContent:
+    type_name = content_data.get('__typename') or 'PullRequest'
+    return CompactContent(
+        sys.intern(type_name),
+        content_data.get('id'),
+        content_data.get('title'),
+        content_data.get('body'),
+        content_data.get('number'),
+        _intern(content_data.get('state')),
+    )
+
+
+def parse_compact_project_item(
+    item_data: dict,
+    project_id: Optional[str] = None,
+) -> CompactProjectItem:
+    # API responses are trusted here, so no validation is done
+    content = parse_compact_content(item_data.get('content') or {})
+    item = CompactProjectItem(
+        item_data['id'],
+        sys.intern(item_data['type']),
+        content,
+        _intern(project_id),
+        updated_at=_parse_datetime(item_data.get('updatedAt')),
+    )
+    field_values = item.field_values
+    for field in item_data['fieldValues']['nodes']:
+        type_name = field.get('__typename')
+        if type_name == 'ProjectV2ItemFieldRepositoryValue':
+            item.repository_id = sys.intern(field['repository']['id'])
+            continue
+        if 'field' not in field:
+            # Values of the field types which are not requested
+            continue
+        value = (
+            sys.intern(field['name'])
+            if type_name == 'ProjectV2ItemFieldSingleSelectValue'
+            else field['text']
+        )
+        field_values[sys.intern(field['field']['name'])] = (
+            value,
+            sys.intern(field['field']['id']),
+            field['id'],
+        )
+    return item
@@ -0,0 +1,22 @@
+from typing import Optional
+
+__all__ = [
+    'GHRateLimitError',
+    'GHRequestError',
+]
+
+
+class GHRequestError(Exception):
+    def __init__(
+        self,
+        message: str,
+        status: Optional[int] = None,
+        payload: Optional[dict] = None,
+    ):
+        super().__init__(message)
+        self.status = status
+        self.payload = payload
+
+
+class GHRateLimitError(GHRequestError):
+    pass
@@ -0,0 +1,366 @@
+# This file contains the streaming export of project items to files.
+#
+#   python -m albs_github.graphql.export --organization AlmaLinux \
+#       --project 1 --format csv --output items.csv
+import argparse
+import asyncio
+import csv
+import io
+import os
+import sys
+import tempfile
+from datetime import datetime
+from typing import BinaryIO, Dict, List, Optional, Sequence, Union
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from .client import CACHED_FIELD_DATA_TYPES, IntegrationsGHGraphQLClient
+from .compact import CONTENT_MODELS
+from .models import ProjectItemsProjection
+from .serialization import JSONCodec, get_json_codec
+
+__all__ = [
+    'EXPORT_FORMATS',
+    'ITEM_COLUMNS',
+    'export_project_items',
+    'flatten_project_item',
+    'get_export_columns',
+]
+
+EXPORT_FORMATS = ('ndjson', 'csv', 'parquet')
+# Columns of every exported item, values of the project fields
+# follow as 'fields.<field name>'
+ITEM_COLUMNS = (
+    'id',
+    'type',
+    'updated_at',
+    'content_type',
+    'content_id',
+    'number',
+    'title',
+    'state',
+    'body',
+    'repository_id',
+)
+FIELD_COLUMN_PREFIX = 'fields.'
+# Rows handed to the writer at once, a page of items at most
+DEFAULT_EXPORT_BATCH_SIZE = 100
+DEFAULT_ROW_GROUP_SIZE = 10000
+
+Output = Union[str, os.PathLike, BinaryIO]
+
+
+def get_export_columns(field_names: Sequence[str]) -> List[str]:
+    return list(ITEM_COLUMNS) + [
+        FIELD_COLUMN_PREFIX + field_name for field_name in field_names
+    ]
+
+
+def _get_content_type(content) -> Optional[str]:
+    type_name = getattr(content, 'type_name', None)
+    if type_name is not None:
+        return type_name
+    for type_name, model in CONTENT_MODELS.items():
+        if type(content) is model:
+            return type_name
+    return None
+
+
+def flatten_project_item(project_item, field_names: Sequence[str]) -> dict:
+    # Works for both ProjectItem and CompactProjectItem
+    content = project_item.content
+    row = {
+        'id': project_item.id,
+        'type': project_item.type,
+        'updated_at': project_item.updated_at,
+        'content_type': None,
+        'content_id': None,
+        'number': None,
+        'title': None,
+        'state': None,
+        'body': None,
+        'repository_id': project_item.repository_id,
+    }
+    if content is not None:
+        row['content_type'] = _get_content_type(content)
+        row['content_id'] = content.id
+        row['number'] = getattr(content, 'number', None)
+        row['title'] = content.title
+        row['state'] = getattr(content, 'state', None)
+        row['body'] = content.body
+    for field_name in field_names:
+        row[FIELD_COLUMN_PREFIX + field_name] = project_item.get_field_value(
+            field_name
+        )
+    return row
+
+
+def _to_text(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+class _NDJSONWriter:
+    def __init__(self, file: BinaryIO, columns: List[str], codec: JSONCodec):
+        self.__file = file
+        self.__dumps = codec.dumps
+
+    def write_rows(self, rows: List[dict]):
+        self.__file.write(b''.join(
+            self.__dumps({key: _to_text(value) for key, value in row.items()})
+            + b'\n'
+            for row in rows
+        ))
+
+    def close(self):
+        self.__file.flush()
+
+
+class _CSVWriter:
+    def __init__(self, file: BinaryIO, columns: List[str], codec: JSONCodec):
+        self.__text_file = io.TextIOWrapper(
+            file,
+            encoding='utf-8',
+            newline='',
+        )
+        self.__writer = csv.DictWriter(self.__text_file, fieldnames=columns)
+        self.__writer.writeheader()
+
+    def write_rows(self, rows: List[dict]):
+        self.__writer.writerows(
+            {key: _to_text(value) for key, value in row.items()}
+            for row in rows
+        )
+
+    def close(self):
+        self.__text_file.flush()
+        # The binary file belongs to the caller
+        self.__text_file.detach()
+
+
+class _ParquetWriter:
+    def __init__(self, file: BinaryIO, columns: List[str], codec: JSONCodec):
+        if pyarrow is None:
+            raise ImportError('pyarrow is required for the parquet export')
+        types = {
+            'number': pyarrow.int64(),
+            'updated_at': pyarrow.timestamp('us', tz='UTC'),
+        }
+        self.__schema = pyarrow.schema([
+            (column, types.get(column, pyarrow.string()))
+            for column in columns
+        ])
+        self.__writer = pyarrow.parquet.ParquetWriter(file, self.__schema)
+        # Rows are collected into row groups of a reasonable size,
+        # a row group per page would make the file slow to read
+        self.__rows: List[dict] = []
+
+    def __write_row_group(self):
+        if not self.__rows:
+            return
+        table = pyarrow.Table.from_pydict(
+            {
+                column: [row[column] for row in self.__rows]
+                for column in self.__schema.names
+            },
+            schema=self.__schema,
+        )
+        self.__writer.write_table(table)
+        self.__rows = []
+
+    def write_rows(self, rows: List[dict]):
+        self.__rows.extend(rows)
+        if len(self.__rows) >= DEFAULT_ROW_GROUP_SIZE:
+            self.__write_row_group()
+
+    def close(self):
+        self.__write_row_group()
+        self.__writer.close()
+
+
+WRITERS = {
+    'ndjson': _NDJSONWriter,
+    'csv': _CSVWriter,
+    'parquet': _ParquetWriter,
+}
+
+
+async def _write_items(
+    client: IntegrationsGHGraphQLClient,
+    file: BinaryIO,
+    export_format: str,
+    field_names: List[str],
+    items_query: Optional[str],
+    projection: Optional[ProjectItemsProjection],
+    page_size: Optional[int],
+    batch_size: int,
+    json_codec: Optional[Union[str, JSONCodec]],
+) -> int:
+    # Rows are written by a worker thread while the next page is
+    # fetched and parsed, so at most two batches are kept in memory
+    loop = asyncio.get_running_loop()
+    writer = await loop.run_in_executor(
+        None,
+        WRITERS[export_format],
+        file,
+        get_export_columns(field_names),
+        get_json_codec(json_codec),
+    )
+    count = 0
+    pending_write = None
+    rows = []
+    try:
+        async for project_item in client.iter_project_items(
+            items_query=items_query,
+            page_size=page_size,
+            projection=projection,
+        ):
+            rows.append(flatten_project_item(project_item, field_names))
+            if len(rows) < batch_size:
+                continue
+            if pending_write is not None:
+                await pending_write
+            pending_write = loop.run_in_executor(None, writer.write_rows, rows)
+            count += len(rows)
+            rows = []
+        if pending_write is not None:
+            await pending_write
+        pending_write = None
+        if rows:
+            await loop.run_in_executor(None, writer.write_rows, rows)
+            count += len(rows)
+    finally:
+        # The writer cannot be closed while a batch is being written
+        if pending_write is not None:
+            await asyncio.gather(pending_write, return_exceptions=True)
+        await loop.run_in_executor(None, writer.close)
+    return count
+
+
+async def export_project_items(
+    client: IntegrationsGHGraphQLClient,
+    output: Output,
+    export_format: str = 'ndjson',
+    items_query: Optional[str] = None,
+    projection: Optional[ProjectItemsProjection] = None,
+    page_size: Optional[int] = None,
+    batch_size: int = DEFAULT_EXPORT_BATCH_SIZE,
+    json_codec: Optional[Union[str, JSONCodec]] = None,
+) -> int:
+    # Items are streamed page by page and are not stored in the client
+    # caches. Columns come from the project fields, so every row has
+    # the same columns even if the first items have no values.
+    # The output is a path or a binary file, a path is replaced only
+    # when the whole export succeeds.
+    if export_format not in WRITERS:
+        raise ValueError(f'Incorrect export format: {export_format}')
+    if batch_size < 1:
+        raise ValueError('Batch size should be positive')
+    if projection is not None and projection.field_names:
+        field_names = list(projection.field_names)
+    elif projection is not None and not projection.with_field_values:
+        field_names = []
+    else:
+        # Only fields with cached values get columns, the others
+        # (e.g. assignees or the repository) would always be empty.
+        # Fields loaded from older snapshots have no data types.
+        fields = await client.get_project_fields(reload=True)
+        field_names = [
+            name for name, field in fields.items()
+            if field.data_type in CACHED_FIELD_DATA_TYPES
+        ]
+    args = (
+        export_format,
+        field_names,
+        items_query,
+        projection,
+        page_size,
+        batch_size,
+        json_codec,
+    )
+    if not isinstance(output, (str, os.PathLike)):
+        return await _write_items(client, output, *args)
+    directory = os.path.dirname(os.path.abspath(output))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            count = await _write_items(client, tmp_file, *args)
+        # mkstemp() creates files readable by the owner only
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, output)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
+
+
+async def run_export(args: argparse.Namespace) -> int:
+    projection = None
+    if args.fields or args.without_bodies:
+        projection = ProjectItemsProjection(
+            with_bodies=not args.without_bodies,
+            field_names=args.fields or None,
+        )
+    client_kwargs: Dict = {}
+    if args.api_url:
+        client_kwargs['api_url'] = args.api_url
+    async with IntegrationsGHGraphQLClient(
+        args.token,
+        args.organization,
+        args.project,
+        # Items are read from the board only, the repository is not used
+        default_repository_name='',
+        compact_cache=True,
+        **client_kwargs,
+    ) as client:
+        output = args.output
+        if output == '-':
+            output = sys.stdout.buffer
+        return await export_project_items(
+            client,
+            output,
+            export_format=args.format,
+            items_query=args.query,
+            projection=projection,
+            page_size=args.page_size,
+            json_codec=args.json_codec,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Export items of a GitHub project board',
+    )
+    parser.add_argument('--token', default=os.environ.get('GITHUB_TOKEN'),
+                        help='GitHub token, $GITHUB_TOKEN by default')
+    parser.add_argument('--organization', required=True)
+    parser.add_argument('--project', type=int, required=True,
+                        help='Project number')
+    parser.add_argument('--format', choices=EXPORT_FORMATS,
+                        default='ndjson')
+    parser.add_argument('--output', default='-',
+                        help='Output file, stdout by default')
+    parser.add_argument('--query',
+                        help='Filter of items, e.g. "status:Todo is:open"')
+    parser.add_argument('--fields', nargs='+',
+                        help='Export values of these fields only')
+    parser.add_argument('--without-bodies', action='store_true')
+    parser.add_argument('--page-size', type=int, default=None)
+    parser.add_argument('--json-codec', default=None,
+                        help='json, orjson or msgspec')
+    parser.add_argument('--api-url', default=None)
+    args = parser.parse_args()
+    if not args.token:
+        parser.error('GitHub token is required')
+    count = asyncio.run(run_export(args))
+    print(f'Exported {count} items', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
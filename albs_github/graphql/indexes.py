@@ -0,0 +1,111 @@
+# This file contains secondary indexes over the cached project items
+from typing import Dict, Hashable, Optional, Set, Tuple
+
+__all__ = [
+    'ProjectItemsIndex',
+]
+
+
+class ProjectItemsIndex:
+    def __init__(self):
+        self.__by_number: Dict[int, Set[str]] = {}
+        self.__by_title: Dict[str, Set[str]] = {}
+        self.__by_field: Dict[Tuple[str, str], Set[str]] = {}
+        self.__by_repository: Dict[Optional[str], Set[str]] = {}
+        # Items are changed in place, so the keys they were indexed with
+        # are kept to remove them later
+        self.__item_keys: Dict[str, tuple] = {}
+
+    def __len__(self) -> int:
+        return len(self.__item_keys)
+
+    @staticmethod
+    def __add_key(index: Dict, key: Hashable, item_id: str):
+        index.setdefault(key, set()).add(item_id)
+
+    @staticmethod
+    def __remove_key(index: Dict, key: Hashable, item_id: str):
+        item_ids = index.get(key)
+        if item_ids is None:
+            return
+        item_ids.discard(item_id)
+        if not item_ids:
+            del index[key]
+
+    def add(self, item):
+        self.remove(item.id)
+        content = item.content
+        number = getattr(content, 'number', None) if content else None
+        title = content.title if content else None
+        field_keys = tuple(
+            (name, field['value'])
+            for name, field in (item.fields or {}).items()
+        )
+        if number is not None:
+            self.__add_key(self.__by_number, number, item.id)
+        if title is not None:
+            self.__add_key(self.__by_title, title, item.id)
+        for field_key in field_keys:
+            self.__add_key(self.__by_field, field_key, item.id)
+        self.__add_key(self.__by_repository, item.repository_id, item.id)
+        self.__item_keys[item.id] = (
+            number,
+            title,
+            field_keys,
+            item.repository_id,
+        )
+
+    def remove(self, item_id: str):
+        keys = self.__item_keys.pop(item_id, None)
+        if keys is None:
+            return
+        number, title, field_keys, repository_id = keys
+        if number is not None:
+            self.__remove_key(self.__by_number, number, item_id)
+        if title is not None:
+            self.__remove_key(self.__by_title, title, item_id)
+        for field_key in field_keys:
+            self.__remove_key(self.__by_field, field_key, item_id)
+        self.__remove_key(self.__by_repository, repository_id, item_id)
+
+    def clear(self):
+        self.__by_number.clear()
+        self.__by_title.clear()
+        self.__by_field.clear()
+        self.__by_repository.clear()
+        self.__item_keys.clear()
+
+    def find(
+        self,
+        number: Optional[int] = None,
+        title: Optional[str] = None,
+        repository_id: Optional[str] = None,
+        fields: Optional[Dict[str, str]] = None,
+    ) -> Set[str]:
+        candidates = []
+        if number is not None:
+            candidates.append(self.__by_number.get(number, set()))
+        if title is not None:
+            candidates.append(self.__by_title.get(title, set()))
+        if repository_id is not None:
+            candidates.append(self.__by_repository.get(repository_id, set()))
+        for field_key in (fields or {}).items():
+            candidates.append(self.__by_field.get(field_key, set()))
+        if not candidates:
+            return set(self.__item_keys)
+        # Intersect starting from the smallest set, so the cost is
+        # proportional to the size of the result rather than the cache
+        candidates.sort(key=len)
+        result = set(candidates[0])
+        for item_ids in candidates[1:]:
+            if not result:
+                break
+            result.intersection_update(item_ids)
+        return result
+
+    def count(self, field_name: str) -> Dict[str, int]:
+        return {
+            value: len(item_ids)
+            for (name, value), item_ids in self.__by_field.items()
+            if name == field_name
+        }
@@ -0,0 +1,104 @@
+# This file contains the batching loader of GitHub nodes by their IDs
+import asyncio
+import contextlib
+import contextvars
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+__all__ = [
+    'NodeLoader',
+    'get_node_cache',
+    'node_cache_scope',
+]
+
+BatchFunction = Callable[[List[str]], Awaitable[Dict[str, Any]]]
+
+# Results are cached per scope (e.g. per webhook or per build event),
+# the scope is inherited by the tasks created inside of it
+_node_cache: contextvars.ContextVar = contextvars.ContextVar(
+    'albs_github_node_cache',
+    default=None,
+)
+
+
+def get_node_cache() -> Optional[Dict[str, asyncio.Future]]:
+    return _node_cache.get()
+
+
+@contextlib.contextmanager
+def node_cache_scope():
+    token = _node_cache.set({})
+    try:
+        yield
+    finally:
+        _node_cache.reset(token)
+
+
+class NodeLoader:
+    def __init__(self, batch_function: BatchFunction, max_batch_size: int):
+        self.__batch_function = batch_function
+        self.max_batch_size = max_batch_size
+        # Requested or in-flight IDs are shared by all callers,
+        # so the same ID is never fetched twice at the same time
+        self.__pending: Dict[str, asyncio.Future] = {}
+        self.__queue: List[str] = []
+        self.__dispatch_scheduled = False
+
+    def load(self, node_id: str) -> Awaitable:
+        cache = get_node_cache()
+        if cache is not None and node_id in cache:
+            return asyncio.shield(cache[node_id])
+        future = self.__pending.get(node_id)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self.__pending[node_id] = future
+            self.__queue.append(node_id)
+            if not self.__dispatch_scheduled:
+                # Everything requested until the end of the current
+                # event loop iteration goes into the same batch
+                loop.call_soon(self.__dispatch)
+                self.__dispatch_scheduled = True
+        if cache is not None:
+            cache[node_id] = future
+            future.add_done_callback(
+                lambda done: self.__forget_failed(cache, node_id, done)
+            )
+        # Every caller gets its own future, so a cancelled caller
+        # does not cancel the shared one for the others
+        return asyncio.shield(future)
+
+    async def load_many(self, node_ids: List[str]) -> List[Any]:
+        return list(await asyncio.gather(*map(self.load, node_ids)))
+
+    @staticmethod
+    def __forget_failed(
+        cache: Dict[str, asyncio.Future],
+        node_id: str,
+        future: asyncio.Future,
+    ):
+        if future.cancelled() or future.exception() is not None:
+            if cache.get(node_id) is future:
+                del cache[node_id]
+
+    def __dispatch(self):
+        queue = self.__queue
+        self.__queue = []
+        self.__dispatch_scheduled = False
+        for start in range(0, len(queue), self.max_batch_size):
+            asyncio.ensure_future(
+                self.__load_batch(queue[start:start + self.max_batch_size])
+            )
+
+    async def __load_batch(self, node_ids: List[str]):
+        try:
+            results = await self.__batch_function(node_ids)
+        except Exception as error:
+            for node_id in node_ids:
+                future = self.__pending.pop(node_id)
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for node_id in node_ids:
+            future = self.__pending.pop(node_id)
+            if not future.done():
+                future.set_result(results.get(node_id))
@@ -0,0 +1,143 @@
+# This file contains counters and timings collected by the clients
+import functools
+import logging
+import re
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+__all__ = [
+    'ClientMetrics',
+    'RequestEvent',
+    'describe_error',
+    'get_operation_name',
+]
+
+OPERATION_NAME_REGEX = re.compile(r'^\s*(?:query|mutation)\s+(\w+)')
+
+_logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=256)
+def get_operation_name(query: str) -> str:
+    match = OPERATION_NAME_REGEX.match(query)
+    return match.group(1) if match else 'anonymous'
+
+
+def describe_error(error: BaseException) -> str:
+    # Some errors have no message at all (e.g. asyncio.TimeoutError)
+    message = str(error)
+    error_type = type(error).__name__
+    return f'{error_type}: {message}' if message else error_type
+
+
+class RequestEvent(NamedTuple):
+    operation: str
+    status: Optional[int]
+    network_time: float
+    decode_time: float
+    response_bytes: int
+    cost: Optional[int] = None
+    error: Optional[str] = None
+
+
+class OperationStats:
+    __slots__ = (
+        'requests',
+        'errors',
+        'network_time',
+        'decode_time',
+        'response_bytes',
+        'cost',
+    )
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.network_time = 0.0
+        self.decode_time = 0.0
+        self.response_bytes = 0
+        self.cost = 0
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class ClientMetrics:
+    def __init__(self):
+        self.__hooks: List[Callable[[RequestEvent], None]] = []
+        self.reset()
+
+    def reset(self):
+        self.__operations: Dict[str, OperationStats] = {}
+        self.__parse: Dict[str, List[float]] = {}
+        self.__caches: Dict[str, List[int]] = {}
+        self.__scans: Dict[str, List[float]] = {}
+
+    def add_hook(self, hook: Callable[[RequestEvent], None]):
+        # Hooks are called synchronously after every request,
+        # so they should be cheap (e.g. update Prometheus metrics)
+        self.__hooks.append(hook)
+
+    def remove_hook(self, hook: Callable[[RequestEvent], None]):
+        self.__hooks.remove(hook)
+
+    def record_request(self, event: RequestEvent):
+        stats = self.__operations.get(event.operation)
+        if stats is None:
+            stats = self.__operations[event.operation] = OperationStats()
+        stats.requests += 1
+        stats.network_time += event.network_time
+        stats.decode_time += event.decode_time
+        stats.response_bytes += event.response_bytes
+        if event.cost:
+            stats.cost += event.cost
+        if event.error is not None:
+            stats.errors += 1
+        # Hooks run while the request is being completed, a broken one
+        # must not fail the request or hide its error
+        for hook in self.__hooks:
+            try:
+                hook(event)
+            except Exception:
+                _logger.exception('Metrics hook %r has failed', hook)
+
+    def record_parse(self, kind: str, seconds: float, count: int = 1):
+        parse_stats = self.__parse.setdefault(kind, [0, 0.0])
+        parse_stats[0] += count
+        parse_stats[1] += seconds
+
+    def record_cache(self, name: str, hit: bool):
+        cache_stats = self.__caches.setdefault(name, [0, 0])
+        cache_stats[0 if hit else 1] += 1
+
+    def record_scan(self, kind: str, pages: int, items: int, seconds: float):
+        scan_stats = self.__scans.setdefault(kind, [0, 0, 0, 0.0])
+        scan_stats[0] += 1
+        scan_stats[1] += pages
+        scan_stats[2] += items
+        scan_stats[3] += seconds
+
+    def snapshot(self) -> dict:
+        return {
+            'operations': {
+                name: stats.as_dict()
+                for name, stats in self.__operations.items()
+            },
+            'parse': {
+                kind: {'items': count, 'time': seconds}
+                for kind, (count, seconds) in self.__parse.items()
+            },
+            'caches': {
+                name: {'hits': hits, 'misses': misses}
+                for name, (hits, misses) in self.__caches.items()
+            },
+            'scans': {
+                kind: {
+                    'scans': scans,
+                    'pages': pages,
+                    'items': items,
+                    'time': seconds,
+                }
+                for kind, (scans, pages, items, seconds)
+                in self.__scans.items()
+            },
+        }
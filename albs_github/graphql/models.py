@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import List, Optional, Union
 
 from pydantic import BaseModel
@@ -7,7 +8,12 @@ __all__ = [
     'BaseField',
     'DraftIssueContent',
     'IssueContent',
+    'IssueCreationRequest',
+    'IssueCreationResult',
+    'ProjectFieldUpdate',
+    'ProjectFieldUpdateResult',
     'ProjectItem',
+    'ProjectItemsProjection',
     'PullRequestContent',
     'SingleSelectOption',
     'SingleSelectProjectField',
@@ -24,6 +30,8 @@ class BaseField(BaseModel):
     __typename: str
     id: str
     name: str
+    # ProjectV2FieldType, e.g. TEXT, SINGLE_SELECT or ASSIGNEES
+    data_type: Optional[str] = None
 
     @property
     def type_name(self) -> str:
@@ -32,7 +40,8 @@ class BaseField(BaseModel):
 
 class BaseContent(BaseModel):
     id: str
-    body: str
+    # None when the body was not requested yet
+    body: Optional[str] = None
     title: str
 
 
@@ -62,3 +71,78 @@ class ProjectItem(BaseModel):
     project_id: Optional[str] = None
     repository_id: Optional[str] = None
     fields: Optional[dict] = None
+    updated_at: Optional[datetime] = None
+
+    def get_field_value(self, field_name: str) -> Optional[str]:
+        field = (self.fields or {}).get(field_name)
+        return field['value'] if field else None
+
+    def set_field_value(
+        self,
+        field_name: str,
+        value: str,
+        field_id: str,
+        value_id: Optional[str] = None,
+    ):
+        if self.fields is None:
+            self.fields = {}
+        previous = self.fields.get(field_name) or {}
+        self.fields[field_name] = {
+            'name': field_name,
+            'value': value,
+            'filed_id': field_id,
+            'value_id': value_id or previous.get('value_id'),
+        }
+
+
+class ProjectFieldUpdate(BaseModel):
+    item_id: str
+    field_name: str
+    value: Union[str, float]
+    # Inferred from the project field when omitted:
+    # single select fields take an option name, other fields take text
+    value_type: Optional[str] = None
+    # Send the update even if the cached value is the same
+    force: bool = False
+
+
+class ProjectFieldUpdateResult(BaseModel):
+    item_id: str
+    field_name: str
+    value: Union[str, float]
+    success: bool
+    error: Optional[str] = None
+    # Not sent because the cached value is the same already
+    skipped: bool = False
+
+
+class ProjectItemsProjection(BaseModel):
+    # Which parts of project items are requested from GitHub,
+    # id, type, updatedAt and content metadata are always fetched
+    with_bodies: bool = True
+    with_field_values: bool = True
+    # Fetch values of these fields only (all fields when not set)
+    field_names: Optional[List[str]] = None
+
+    @property
+    def is_full(self) -> bool:
+        return (
+            self.with_bodies
+            and self.with_field_values
+            and not self.field_names
+        )
+
+
+class IssueCreationRequest(BaseModel):
+    title: str
+    body: str
+    initial_status: Optional[str] = 'Todo'
+    repository_id: Optional[str] = None
+
+
+class IssueCreationResult(BaseModel):
+    title: str
+    issue_id: Optional[str] = None
+    project_item_id: Optional[str] = None
+    success: bool = False
+    error: Optional[str] = None
@@ -1,5 +1,12 @@
+import functools
+from typing import Sequence, Tuple
+
 __all__ = [
+    'generate_create_issues_batch_mutation',
+    'generate_create_project_items_batch_mutation',
     'generate_project_field_modification_mutation',
+    'generate_project_fields_batch_mutation',
+    'FIELD_VALUE_TYPES',
     'MUTATION_ADD_COMMENT',
     'MUTATION_CREATE_ISSUE',
     'MUTATION_ADD_COMMENT_TO_ISSUE',
@@ -8,26 +15,35 @@ __all__ = [
 ]
 
 CHANGE_PROJECT_FIELD_VALUE_TEMPLATE = """
-mutation ChangeProjectItemFieldValue(%s) {
-    updateProjectV2ItemFieldValue (
+mutation ChangeProjectItemFieldValue(%s) {%s}
+"""
+
+CHANGE_PROJECT_FIELD_VALUE_OPERATION_TEMPLATE = """
+    %(alias)supdateProjectV2ItemFieldValue (
         input: {
             projectId: $project_id
-            itemId: $item_id
-            fieldId: $field_id
-            value: %s
+            itemId: $%(item_id)s
+            fieldId: $%(field_id)s
+            value: %(value)s
         }
     ){
         projectV2Item {
             id
         }
     }
-}
 """
 
+# Value type -> (GraphQL type of the variable, key of ProjectV2FieldValue)
+FIELD_VALUE_TYPES = {
+    'text': ('String!', 'text'),
+    'number': ('Float!', 'number'),
+    'date': ('Date!', 'date'),
+    'single_select': ('String!', 'singleSelectOptionId'),
+    'iteration': ('String!', 'iterationId'),
+}
 
-def generate_project_field_modification_mutation(
-    value_type: str = 'text'
-) -> str:
+
+def _generate_project_field_modification_mutation(value_type: str) -> str:
     allowed = ('text', 'number', 'date', 'single_select', 'iteration')
     if value_type not in allowed:
         raise ValueError(f'Incorrect value type: {value_type}')
@@ -51,8 +67,61 @@ def generate_project_field_modification_mutation(
         params_string = ('$project_id: ID!, $item_id: ID!, $field_id: ID!, '
                          '$iteration_id: String!')
         mutation_value = '{iterationId: $iteration_id}'
+    operation = CHANGE_PROJECT_FIELD_VALUE_OPERATION_TEMPLATE % {
+        'alias': '',
+        'item_id': 'item_id',
+        'field_id': 'field_id',
+        'value': mutation_value,
+    }
     mutation_string = CHANGE_PROJECT_FIELD_VALUE_TEMPLATE % (
-        params_string, mutation_value)
+        params_string, operation)
+    return mutation_string.strip()
+
+
+# Documents for every value type are built once at import
+PROJECT_FIELD_MODIFICATION_MUTATIONS = {
+    value_type: _generate_project_field_modification_mutation(value_type)
+    for value_type in FIELD_VALUE_TYPES
+}
+
+
+def generate_project_field_modification_mutation(
+    value_type: str = 'text'
+) -> str:
+    if value_type not in PROJECT_FIELD_MODIFICATION_MUTATIONS:
+        raise ValueError(f'Incorrect value type: {value_type}')
+    return PROJECT_FIELD_MODIFICATION_MUTATIONS[value_type]
+
+
+def generate_project_fields_batch_mutation(value_types: Sequence[str]) -> str:
+    return _generate_project_fields_batch_mutation(tuple(value_types))
+
+
+@functools.lru_cache(maxsize=256)
+def _generate_project_fields_batch_mutation(
+    value_types: Tuple[str, ...],
+) -> str:
+    # Every update gets its own alias (update_<index>) and its own set of
+    # variables, so several field changes are sent in one request
+    params = ['$project_id: ID!']
+    operations = []
+    for index, value_type in enumerate(value_types):
+        if value_type not in FIELD_VALUE_TYPES:
+            raise ValueError(f'Incorrect value type: {value_type}')
+        graphql_type, value_key = FIELD_VALUE_TYPES[value_type]
+        params.extend((
+            f'$item_id_{index}: ID!',
+            f'$field_id_{index}: ID!',
+            f'$value_{index}: {graphql_type}',
+        ))
+        operations.append(CHANGE_PROJECT_FIELD_VALUE_OPERATION_TEMPLATE % {
+            'alias': f'update_{index}: ',
+            'item_id': f'item_id_{index}',
+            'field_id': f'field_id_{index}',
+            'value': f'{{{value_key}: $value_{index}}}',
+        })
+    mutation_string = CHANGE_PROJECT_FIELD_VALUE_TEMPLATE % (
+        ', '.join(params), ''.join(operations))
     return mutation_string.strip()
 
 
@@ -82,6 +151,8 @@ mutation CreateIssue($title: String!, $repository_id: ID!, $body: String!) {
     ){
         issue {
             id
+            number
+            state
         }
     }
 }
@@ -131,3 +202,62 @@ mutation CloseIssue($issueId: ID!) {
   }
 }
 """.strip()
+
+CREATE_ISSUE_OPERATION_TEMPLATE = """
+    issue_%(index)d: createIssue(
+        input: {
+            title: $title_%(index)d
+            repositoryId: $repository_id_%(index)d
+            body: $body_%(index)d
+        }
+    ){
+        issue {
+            id
+            number
+            state
+        }
+    }
+"""
+
+CREATE_PROJECT_ITEM_OPERATION_TEMPLATE = """
+    item_%(index)d: addProjectV2ItemById(
+        input: {
+            projectId: $project_id
+            contentId: $github_item_id_%(index)d
+        }
+    ) {
+        item {
+            id
+        }
+    }
+"""
+
+
+@functools.lru_cache(maxsize=64)
+def generate_create_issues_batch_mutation(count: int) -> str:
+    # Issues are aliased as issue_<index>
+    params = []
+    operations = []
+    for index in range(count):
+        params.extend((
+            f'$title_{index}: String!',
+            f'$repository_id_{index}: ID!',
+            f'$body_{index}: String!',
+        ))
+        operations.append(CREATE_ISSUE_OPERATION_TEMPLATE % {'index': index})
+    return 'mutation CreateIssues(%s) {%s}' % (
+        ', '.join(params), ''.join(operations))
+
+
+@functools.lru_cache(maxsize=64)
+def generate_create_project_items_batch_mutation(count: int) -> str:
+    # Project items are aliased as item_<index>
+    params = ['$project_id: ID!']
+    operations = []
+    for index in range(count):
+        params.append(f'$github_item_id_{index}: ID!')
+        operations.append(
+            CREATE_PROJECT_ITEM_OPERATION_TEMPLATE % {'index': index}
+        )
+    return 'mutation CreateProjectItems(%s) {%s}' % (
+        ', '.join(params), ''.join(operations))
@@ -0,0 +1,162 @@
+# This file contains the adaptive page sizing of project item scans
+import math
+from typing import Optional
+
+from .metrics import RequestEvent
+
+__all__ = [
+    'MAX_QUERY_NODES',
+    'PageSizer',
+    'estimate_items_query_cost',
+    'estimate_items_query_nodes',
+]
+
+# GitHub rejects queries which may return more nodes than this
+MAX_QUERY_NODES = 500000
+MAX_PAGE_SIZE = 100
+DEFAULT_MIN_PAGE_SIZE = 10
+# Pages taking longer than this are shrunk, GitHub gives up on
+# queries after 10 seconds and answers with 502
+DEFAULT_TARGET_PAGE_TIME = 3.0
+DEFAULT_MAX_PAGE_BYTES = 8 * 1024 * 1024
+DEFAULT_SMOOTHING = 0.3
+# Not more than this times bigger page after a single observation
+MAX_GROWTH_FACTOR = 1.5
+# Successful pages before trying a size which has failed before
+CEILING_PROBE_INTERVAL = 20
+
+
+def estimate_items_query_nodes(
+    page_size: int,
+    field_values_size: Optional[int] = None,
+) -> int:
+    nodes = page_size
+    if field_values_size:
+        nodes += page_size * field_values_size
+    return nodes
+
+
+def estimate_items_query_cost(
+    page_size: int,
+    field_values_size: Optional[int] = None,
+) -> int:
+    # GitHub counts one request per connection to fill: the items
+    # of the page plus the field values of every item. The sum is
+    # divided by 100 and rounded, but it is never less than a point.
+    requests = 1
+    if field_values_size:
+        requests += page_size
+    return max(1, round(requests / 100))
+
+
+class PageSizer:
+    def __init__(
+        self,
+        initial_size: int = MAX_PAGE_SIZE,
+        min_size: int = DEFAULT_MIN_PAGE_SIZE,
+        max_size: int = MAX_PAGE_SIZE,
+        target_page_time: float = DEFAULT_TARGET_PAGE_TIME,
+        max_page_bytes: int = DEFAULT_MAX_PAGE_BYTES,
+        max_page_cost: Optional[int] = None,
+        smoothing: float = DEFAULT_SMOOTHING,
+    ):
+        if not 1 <= min_size <= initial_size <= max_size <= MAX_PAGE_SIZE:
+            raise ValueError('Incorrect page size limits')
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_page_time = target_page_time
+        self.max_page_bytes = max_page_bytes
+        self.max_page_cost = max_page_cost
+        self.smoothing = smoothing
+        self.__page_size = initial_size
+        # Pages are not grown back to the size which has failed,
+        # the ceiling is lifted again after a series of successes
+        self.__ceiling = max_size
+        self.__successes = 0
+        self.__largest_success = 0
+        # Exponentially smoothed observations per item
+        self.__seconds_per_item: Optional[float] = None
+        self.__bytes_per_item: Optional[float] = None
+
+    @property
+    def page_size(self) -> int:
+        return self.__page_size
+
+    @property
+    def seconds_per_item(self) -> Optional[float]:
+        return self.__seconds_per_item
+
+    @property
+    def bytes_per_item(self) -> Optional[float]:
+        return self.__bytes_per_item
+
+    def __smooth(self, previous: Optional[float], value: float) -> float:
+        if previous is None:
+            return value
+        return previous + self.smoothing * (value - previous)
+
+    def get_page_size(self, field_values_size: Optional[int] = None) -> int:
+        # Biggest page within the limits: more items per request
+        # means more items per second and per rate limit point
+        page_size = self.__page_size
+        while page_size > 1 and (
+            estimate_items_query_nodes(page_size, field_values_size)
+            > MAX_QUERY_NODES
+            or (
+                self.max_page_cost is not None
+                and estimate_items_query_cost(page_size, field_values_size)
+                > self.max_page_cost
+            )
+        ):
+            page_size -= 1
+        return page_size
+
+    def observe(
+        self,
+        event: RequestEvent,
+        items_count: int,
+        page_size: Optional[int] = None,
+    ):
+        if event.error is not None:
+            # Server errors and timeouts on big pages are usually
+            # caused by the page size, rate limits are not
+            if event.status is None or event.status >= 500:
+                # Bisect between the largest page which has worked
+                # and the one which has not
+                failed_size = self.__page_size
+                ceiling = failed_size - 1
+                if self.__largest_success < failed_size:
+                    ceiling = (self.__largest_success + failed_size) // 2
+                self.__ceiling = max(self.min_size, ceiling)
+                self.__page_size = max(self.min_size, self.__page_size // 2)
+                self.__successes = 0
+            return
+        # The last page of a scan is usually short, the fixed overhead
+        # of the request would look like a slow item
+        if not items_count or (page_size and items_count < page_size):
+            return
+        self.__seconds_per_item = self.__smooth(
+            self.__seconds_per_item,
+            (event.network_time + event.decode_time) / items_count,
+        )
+        self.__bytes_per_item = self.__smooth(
+            self.__bytes_per_item,
+            event.response_bytes / items_count,
+        )
+        self.__successes += 1
+        self.__largest_success = max(self.__largest_success, items_count)
+        if self.__successes >= CEILING_PROBE_INTERVAL:
+            # Errors may be transient, bigger pages are tried again
+            self.__ceiling = (self.__ceiling + self.max_size + 1) // 2
+            self.__successes = 0
+        limits = [
+            self.__ceiling,
+            math.ceil(self.__page_size * MAX_GROWTH_FACTOR),
+        ]
+        if self.__seconds_per_item > 0:
+            limits.append(
+                int(self.target_page_time / self.__seconds_per_item)
+            )
+        if self.__bytes_per_item > 0:
+            limits.append(int(self.max_page_bytes / self.__bytes_per_item))
+        self.__page_size = max(self.min_size, min(limits))
@@ -0,0 +1,187 @@
+# This file contains the pool of clients for several project boards
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Tuple, Union
+
+import aiohttp
+
+from .auth import GHAppTokenProvider, StaticTokenProvider, TokenProvider
+from .client import IntegrationsGHGraphQLClient, create_client_session
+from .metrics import ClientMetrics
+from .rate_limit import RateLimiter
+
+__all__ = [
+    'ProjectClientPool',
+    'ProjectKey',
+]
+
+DEFAULT_INITIALIZATION_CONCURRENCY = 4
+
+# (organization name, project number)
+ProjectKey = Tuple[str, int]
+
+
+class ProjectClientPool:
+    def __init__(
+        self,
+        github_token: Union[str, TokenProvider],
+        max_concurrency: int = DEFAULT_INITIALIZATION_CONCURRENCY,
+        session: Optional[aiohttp.ClientSession] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        metrics: Optional[ClientMetrics] = None,
+        session_options: Optional[Dict[str, Any]] = None,
+        **client_kwargs,
+    ):
+        if max_concurrency < 1:
+            raise ValueError('Concurrency should be positive')
+        if isinstance(github_token, TokenProvider):
+            self.__token_provider = github_token
+        else:
+            self.__token_provider = StaticTokenProvider(github_token)
+        self.max_concurrency = max_concurrency
+        self.__logger = logging.getLogger(__name__)
+        self.__session = session
+        self.__owns_session = session is None
+        # Keyword arguments of create_client_session()
+        self.__session_options = session_options or {}
+        # All clients spend the same rate limit budget of the token,
+        # so they share one limiter instead of racing each other
+        self.__rate_limiter = rate_limiter or RateLimiter()
+        self.__metrics = metrics or ClientMetrics()
+        self.__client_kwargs = client_kwargs
+        self.__projects: Dict[ProjectKey, dict] = {}
+        self.__clients: Dict[ProjectKey, IntegrationsGHGraphQLClient] = {}
+
+    @property
+    def token_provider(self) -> TokenProvider:
+        return self.__token_provider
+
+    @property
+    def rate_limiter(self) -> RateLimiter:
+        return self.__rate_limiter
+
+    @property
+    def metrics(self) -> ClientMetrics:
+        return self.__metrics
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self.__session is None or self.__session.closed:
+            self.__session = create_client_session(**self.__session_options)
+            self.__owns_session = True
+        provider = self.__token_provider
+        if isinstance(provider, GHAppTokenProvider) and (
+            provider.session is None or provider.session.closed
+        ):
+            provider.session = self.__session
+        return self.__session
+
+    @property
+    def projects(self) -> Tuple[ProjectKey, ...]:
+        return tuple(self.__projects)
+
+    def add_project(
+        self,
+        organization_name: str,
+        project_number: int,
+        default_repository_name: str,
+        **kwargs,
+    ) -> ProjectKey:
+        # Client options can be overridden per project
+        # (e.g. snapshot_path or compact_cache)
+        key = (organization_name, project_number)
+        if key in self.__projects:
+            raise ValueError(
+                f'Project {project_number} of {organization_name} '
+                'is already added'
+            )
+        self.__projects[key] = dict(
+            self.__client_kwargs,
+            organization_name=organization_name,
+            project_number=project_number,
+            default_repository_name=default_repository_name,
+            **kwargs,
+        )
+        return key
+
+    async def remove_project(
+        self,
+        organization_name: str,
+        project_number: int,
+    ):
+        key = (organization_name, project_number)
+        self.__projects.pop(key, None)
+        client = self.__clients.pop(key, None)
+        if client is not None:
+            await client.close()
+
+    def get_client(
+        self,
+        organization_name: str,
+        project_number: int,
+    ) -> IntegrationsGHGraphQLClient:
+        key = (organization_name, project_number)
+        if key not in self.__projects:
+            raise KeyError(
+                f'Project {project_number} of {organization_name} '
+                'is not added'
+            )
+        session = self.session
+        client = self.__clients.get(key)
+        if client is None:
+            client = IntegrationsGHGraphQLClient(
+                self.__token_provider,
+                session=session,
+                rate_limiter=self.__rate_limiter,
+                metrics=self.__metrics,
+                **self.__projects[key],
+            )
+            self.__clients[key] = client
+        return client
+
+    async def __initialize_client(
+        self,
+        semaphore: asyncio.Semaphore,
+        key: ProjectKey,
+    ):
+        async with semaphore:
+            await self.get_client(*key).initialize()
+
+    async def initialize(self) -> Dict[ProjectKey, Exception]:
+        # Projects are initialized concurrently, but not more than
+        # max_concurrency at a time. A failed project does not stop
+        # the others, errors are returned by project.
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        keys = list(self.__projects)
+        results = await asyncio.gather(
+            *(self.__initialize_client(semaphore, key) for key in keys),
+            return_exceptions=True,
+        )
+        errors = {}
+        for key, result in zip(keys, results):
+            if isinstance(result, Exception):
+                self.__logger.error(
+                    'Cannot initialize project %s of %s: %s',
+                    key[1],
+                    key[0],
+                    result,
+                )
+                errors[key] = result
+        return errors
+
+    async def close(self):
+        clients = list(self.__clients.values())
+        self.__clients = {}
+        await asyncio.gather(
+            *(client.close() for client in clients),
+            return_exceptions=True,
+        )
+        if self.__session is not None and self.__owns_session:
+            await self.__session.close()
+        self.__session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
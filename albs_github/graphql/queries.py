@@ -1,11 +1,19 @@
 # This file contains functions that create queries to the GitHub GraphQL API
-from typing import Optional
+import functools
+import json
+import textwrap
+from typing import Optional, Sequence, Tuple
 
 __all__ = [
     'QUERY_ORG_PROJECT_FIELDS',
+    'QUERY_NODES',
+    'QUERY_NODES_BODIES',
+    'QUERY_ORG_PROJECT_ISSUES',
     'QUERY_SEARCH_ISSUE',
     'QUERY_ORG_REPOSITORY_INFO',
+    'generate_items_filter',
     'generate_project_issues_query',
+    'generate_project_issues_query_for_fields',
 ]
 
 QUERY_SEARCH_ISSUE = """
@@ -32,6 +40,13 @@ query SearchIssue($query: String!) {
 
 QUERY_ORG_PROJECT_FIELDS = """
 query GetOrgProjectFields($org_name: String!, $project_number: Int!) {
+    rateLimit {
+        cost
+        limit
+        remaining
+        used
+        resetAt
+    }
     organization(login: $org_name) {
         projectV2(number: $project_number) {
             fields(first: 100) {
@@ -40,6 +55,7 @@ query GetOrgProjectFields($org_name: String!, $project_number: Int!) {
                         __typename
                         name
                         id
+                        dataType
                     }
                     ... on ProjectV2SingleSelectField {
                         name
@@ -56,8 +72,68 @@ query GetOrgProjectFields($org_name: String!, $project_number: Int!) {
 }
 """.strip()
 
+PROJECT_ITEM_FIELD_VALUE_FRAGMENTS = """
+__typename
+... on ProjectV2ItemFieldTextValue {
+    id
+    text
+    field {
+        __typename
+        ... on ProjectV2Field {
+            id
+            name
+        }
+    }
+}
+... on ProjectV2ItemFieldSingleSelectValue {
+    id
+    name
+    optionId
+    field {
+        __typename
+        ... on ProjectV2SingleSelectField {
+            id
+            name
+        }
+    }
+}
+... on ProjectV2ItemFieldRepositoryValue {
+    repository {
+        id
+        name
+    }
+}
+""".strip()
+
+PROJECT_ITEM_FIELD_VALUES_SELECTION = """
+fieldValues(first: $field_values_first) @include(if: $with_field_values) {
+    nodes {
+%s
+    }
+}
+""".strip() % textwrap.indent(PROJECT_ITEM_FIELD_VALUE_FRAGMENTS, ' ' * 8)
+
+# Values of the selected fields only, aliased as field_<index>
+PROJECT_ITEM_FIELD_VALUE_BY_NAME_SELECTION = """
+field_%d: fieldValueByName(name: %s) @include(if: $with_field_values) {
+%s
+}
+""".strip()
+
 QUERY_ORG_PROJECT_ISSUES_TEMPLATE = """
-query GetOrgProjectIssues($org_name: String!, $project_number: Int!) {
+query GetOrgProjectIssues(
+    $org_name: String!
+    $project_number: Int!
+    $with_body: Boolean = true
+    $with_field_values: Boolean = true%s
+) {
+    rateLimit {
+        cost
+        limit
+        remaining
+        used
+        resetAt
+    }
     organization(login: $org_name) {
         projectV2(number: $project_number) {
             title
@@ -71,17 +147,18 @@ query GetOrgProjectIssues($org_name: String!, $project_number: Int!) {
                 nodes {
                     type
                     id
+                    updatedAt
                     content {
                         __typename
                         ... on Issue {
                             id
-                            body
+                            body @include(if: $with_body)
                             state
                             title
                             number
                         }
                         ... on DraftIssue {
-                            body
+                            body @include(if: $with_body)
                             title
                             id
                         }
@@ -89,43 +166,10 @@ query GetOrgProjectIssues($org_name: String!, $project_number: Int!) {
                             id
                             number
                             title
-                            body
-                        }
-                    }
-                    fieldValues(first: 100) {
-                        nodes {
-                            __typename
-                            ... on ProjectV2ItemFieldTextValue {
-                                id
-                                text
-                                field {
-                                    __typename
-                                    ... on ProjectV2Field {
-                                        id
-                                        name
-                                    }
-                                }
-                            }
-                            ... on ProjectV2ItemFieldSingleSelectValue {
-                                id
-                                name
-                                optionId
-                                field {
-                                    __typename
-                                    ... on ProjectV2SingleSelectField {
-                                        id
-                                        name
-                                    }
-                                }
-                            }
-                            ... on ProjectV2ItemFieldRepositoryValue {
-                                repository {
-                                    id
-                                    name
-                                }
-                            }
+                            body @include(if: $with_body)
                         }
                     }
+%s
                 }
             }
         }
@@ -144,10 +188,175 @@ query GetRepositoryInfo ($org_name: String!, $repo_name: String!){
 """.strip()
 
 
-def generate_project_issues_query(next_cursor: Optional[str] = None) -> str:
+def generate_project_issues_query(
+    next_cursor: Optional[str] = None,
+    items_query: Optional[str] = None,
+    page_size: int = 100,
+) -> str:
+    if not 1 <= page_size <= 100:
+        raise ValueError(f'Incorrect page size: {page_size}')
     if next_cursor:
-        insert = f'first: 100, after: "{next_cursor}"'
+        insert = f'first: {page_size}, after: "{next_cursor}"'
     else:
-        insert = 'first: 100'
-    query = QUERY_ORG_PROJECT_ISSUES_TEMPLATE % insert
+        insert = f'first: {page_size}'
+    if items_query:
+        insert += f', query: {json.dumps(items_query)}'
+    query = QUERY_ORG_PROJECT_ISSUES_TEMPLATE % (
+        _FIELD_VALUES_VARIABLES,
+        insert,
+        _FIELD_VALUES_SELECTION,
+    )
     return query
+
+
+_ITEMS_VARIABLES = """
+    $first: Int!
+    $after: String
+    $items_query: String"""
+_ITEMS_ARGUMENTS = 'first: $first, after: $after, query: $items_query'
+# Projects have less fields than 100 usually, a smaller connection
+# makes the estimated number of nodes of the query smaller
+_FIELD_VALUES_VARIABLES = """
+    $field_values_first: Int = 100"""
+_FIELD_VALUES_SELECTION = textwrap.indent(
+    PROJECT_ITEM_FIELD_VALUES_SELECTION,
+    ' ' * 20,
+)
+
+# The cursor, the page size and the filter are passed as variables,
+# so the document is built only once. Bodies and field values are
+# skipped with $with_body/$with_field_values set to false.
+QUERY_ORG_PROJECT_ISSUES = (
+    QUERY_ORG_PROJECT_ISSUES_TEMPLATE % (
+        _ITEMS_VARIABLES + _FIELD_VALUES_VARIABLES,
+        _ITEMS_ARGUMENTS,
+        _FIELD_VALUES_SELECTION,
+    )
+).strip()
+
+
+@functools.lru_cache(maxsize=64)
+def _generate_project_issues_query_for_fields(
+    field_names: Tuple[str, ...],
+) -> str:
+    selections = [
+        PROJECT_ITEM_FIELD_VALUE_BY_NAME_SELECTION % (
+            index,
+            json.dumps(field_name),
+            textwrap.indent(PROJECT_ITEM_FIELD_VALUE_FRAGMENTS, ' ' * 4),
+        )
+        for index, field_name in enumerate(field_names)
+    ]
+    query = QUERY_ORG_PROJECT_ISSUES_TEMPLATE % (
+        _ITEMS_VARIABLES,
+        _ITEMS_ARGUMENTS,
+        textwrap.indent('\n'.join(selections), ' ' * 20),
+    )
+    return query.strip()
+
+
+def generate_project_issues_query_for_fields(
+    field_names: Sequence[str],
+) -> str:
+    # Same as QUERY_ORG_PROJECT_ISSUES, but fetches values
+    # of the given fields only
+    if not field_names:
+        raise ValueError('Field names cannot be empty')
+    return _generate_project_issues_query_for_fields(tuple(field_names))
+
+
+def _quote_filter_value(value: str) -> str:
+    if any(char.isspace() or char in '":,' for char in value):
+        return json.dumps(value)
+    return value
+
+
+def generate_items_filter(field_name: str, value: Optional[str] = None) -> str:
+    # Term of the items(query:) filter, e.g. status:"In progress",
+    # or no:status for items without a value of the field
+    field_key = '-'.join(field_name.lower().split())
+    if value is None:
+        return f'no:{field_key}'
+    return f'{field_key}:{_quote_filter_value(value)}'
+
+
+QUERY_NODES_BODIES = """
+query GetNodesBodies($ids: [ID!]!) {
+    nodes(ids: $ids) {
+        __typename
+        ... on Issue {
+            id
+            body
+        }
+        ... on DraftIssue {
+            id
+            body
+        }
+        ... on PullRequest {
+            id
+            body
+        }
+    }
+}
+""".strip()
+
+
+QUERY_NODES = """
+query GetNodes($ids: [ID!]!) {
+    nodes(ids: $ids) {
+        __typename
+        ... on Issue {
+            id
+            body
+            state
+            title
+            number
+        }
+        ... on DraftIssue {
+            id
+            body
+            title
+        }
+        ... on PullRequest {
+            id
+            number
+            title
+            body
+        }
+        ... on ProjectV2Item {
+            type
+            id
+            updatedAt
+            project {
+                id
+            }
+            content {
+                __typename
+                ... on Issue {
+                    id
+                    body
+                    state
+                    title
+                    number
+                }
+                ... on DraftIssue {
+                    body
+                    title
+                    id
+                }
+                ... on PullRequest{
+                    id
+                    number
+                    title
+                    body
+                }
+            }
+            fieldValues(first: 100) {
+                nodes {
+%s
+                }
+            }
+        }
+    }
+}
+""".strip() % textwrap.indent(PROJECT_ITEM_FIELD_VALUE_FRAGMENTS, ' ' * 20)
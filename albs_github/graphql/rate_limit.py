@@ -0,0 +1,205 @@
+# This file contains the scheduler that keeps requests within
+# GitHub API rate limits
+import asyncio
+import contextlib
+import random
+import time
+from datetime import datetime
+from typing import Mapping, Optional
+
+from pydantic import BaseModel
+
+__all__ = [
+    'RateLimiter',
+    'RateLimitState',
+]
+
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_RESERVE_POINTS = 100
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF_BASE = 1.0
+DEFAULT_BACKOFF_MAX = 60.0
+# GitHub asks to wait at least a minute after a secondary rate limit
+# when no Retry-After header is sent
+SECONDARY_LIMIT_DELAY = 60.0
+
+
+class RateLimitState(BaseModel):
+    limit: Optional[int] = None
+    remaining: Optional[int] = None
+    used: Optional[int] = None
+    reset_at: Optional[float] = None
+    last_cost: Optional[int] = None
+    concurrency: int
+    max_concurrency: int
+    in_flight: int
+    paused_until: Optional[float] = None
+    retries: int = 0
+    throttled: int = 0
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        min_concurrency: int = 1,
+        reserve_points: int = DEFAULT_RESERVE_POINTS,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_base: float = DEFAULT_BACKOFF_BASE,
+        backoff_max: float = DEFAULT_BACKOFF_MAX,
+    ):
+        if min_concurrency < 1 or max_concurrency < min_concurrency:
+            raise ValueError('Incorrect concurrency limits')
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.reserve_points = reserve_points
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.__concurrency = max_concurrency
+        self.__in_flight = 0
+        self.__successes = 0
+        self.__condition = None
+        self.__limit = None
+        self.__remaining = None
+        self.__used = None
+        self.__reset_at = None
+        self.__last_cost = None
+        self.__paused_until = None
+        self.__retries = 0
+        self.__throttled = 0
+
+    @property
+    def state(self) -> RateLimitState:
+        return RateLimitState(
+            limit=self.__limit,
+            remaining=self.__remaining,
+            used=self.__used,
+            reset_at=self.__reset_at,
+            last_cost=self.__last_cost,
+            concurrency=self.__concurrency,
+            max_concurrency=self.max_concurrency,
+            in_flight=self.__in_flight,
+            paused_until=self.__paused_until,
+            retries=self.__retries,
+            throttled=self.__throttled,
+        )
+
+    def __get_condition(self) -> asyncio.Condition:
+        # Limiters are usually created before the event loop is running,
+        # and before Python 3.10 the condition would be bound to the loop
+        # current at its creation instead of the one awaiting it
+        if self.__condition is None:
+            self.__condition = asyncio.Condition()
+        return self.__condition
+
+    def __get_delay(self) -> float:
+        now = time.time()
+        delay = 0.0
+        if self.__paused_until is not None:
+            if now >= self.__paused_until:
+                self.__paused_until = None
+            else:
+                delay = self.__paused_until - now
+        if self.__reset_at is not None and now >= self.__reset_at:
+            # The budget window is over, GitHub will report a new one
+            self.__remaining = None
+            self.__reset_at = None
+        elif (
+            self.__remaining is not None
+            and self.__reset_at is not None
+            and self.__remaining <= self.reserve_points
+        ):
+            delay = max(delay, self.__reset_at - now)
+        return delay
+
+    async def acquire(self):
+        while True:
+            delay = self.__get_delay()
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay + random.uniform(0, 1))
+        condition = self.__get_condition()
+        async with condition:
+            await condition.wait_for(
+                lambda: self.__in_flight < self.__concurrency
+            )
+            self.__in_flight += 1
+
+    async def release(self):
+        condition = self.__get_condition()
+        async with condition:
+            self.__in_flight -= 1
+            condition.notify_all()
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            await self.release()
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        if 'X-RateLimit-Remaining' not in headers:
+            return
+        self.__remaining = int(headers['X-RateLimit-Remaining'])
+        if 'X-RateLimit-Limit' in headers:
+            self.__limit = int(headers['X-RateLimit-Limit'])
+        if 'X-RateLimit-Used' in headers:
+            self.__used = int(headers['X-RateLimit-Used'])
+        if 'X-RateLimit-Reset' in headers:
+            self.__reset_at = float(headers['X-RateLimit-Reset'])
+
+    def update_from_payload(self, payload: dict):
+        rate_limit = (payload.get('data') or {}).get('rateLimit')
+        if not rate_limit:
+            return
+        self.__last_cost = rate_limit.get('cost', self.__last_cost)
+        self.__limit = rate_limit.get('limit', self.__limit)
+        self.__remaining = rate_limit.get('remaining', self.__remaining)
+        self.__used = rate_limit.get('used', self.__used)
+        reset_at = rate_limit.get('resetAt')
+        if reset_at:
+            self.__reset_at = datetime.fromisoformat(
+                reset_at.replace('Z', '+00:00')
+            ).timestamp()
+
+    def on_success(self):
+        # Additive increase: one more parallel request after
+        # a full "window" of successful ones
+        self.__successes += 1
+        if self.__successes >= self.__concurrency:
+            self.__successes = 0
+            self.__concurrency = min(
+                self.max_concurrency,
+                self.__concurrency + 1,
+            )
+
+    def on_throttled(self, retry_after: Optional[float] = None):
+        # Multiplicative decrease and a pause for everyone
+        self.__throttled += 1
+        self.__successes = 0
+        self.__concurrency = max(
+            self.min_concurrency,
+            self.__concurrency // 2,
+        )
+        if retry_after is None:
+            retry_after = SECONDARY_LIMIT_DELAY
+        paused_until = time.time() + retry_after
+        if self.__paused_until is None or paused_until > self.__paused_until:
+            self.__paused_until = paused_until
+
+    def on_budget_exhausted(self):
+        self.__throttled += 1
+        self.__remaining = 0
+        if self.__reset_at is None:
+            self.__reset_at = time.time() + SECONDARY_LIMIT_DELAY
+
+    def get_backoff_delay(self, attempt: int) -> float:
+        # "Full jitter" exponential backoff
+        self.__retries += 1
+        return random.uniform(
+            0,
+            min(self.backoff_max, self.backoff_base * 2 ** attempt),
+        )
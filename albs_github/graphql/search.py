@@ -0,0 +1,167 @@
+# This file contains the local full-text index over cached issues
+import heapq
+import math
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+__all__ = [
+    'TextSearchIndex',
+    'parse_search_query',
+    'tokenize',
+]
+
+TOKEN_REGEX = re.compile(r'\w+')
+PHRASE_REGEX = re.compile(r'"([^"]*)"')
+# Gap between title and body positions, so phrases never match across them
+FIELDS_GAP = 1000
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return TOKEN_REGEX.findall(text.lower())
+
+
+def parse_search_query(query: str) -> Tuple[List[str], List[List[str]]]:
+    # Quoted parts are phrases, all their tokens are search terms as well
+    phrases = [tokenize(phrase) for phrase in PHRASE_REGEX.findall(query)]
+    terms = tokenize(PHRASE_REGEX.sub(' ', query))
+    for phrase in phrases:
+        terms.extend(phrase)
+    phrases = [phrase for phrase in phrases if len(phrase) > 1]
+    return list(dict.fromkeys(terms)), phrases
+
+
+class TextSearchIndex:
+    def __init__(
+        self,
+        title_weight: float = 3.0,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        self.title_weight = title_weight
+        self.k1 = k1
+        self.b = b
+        # token -> document id -> positions of the token in the document
+        self.__postings: Dict[str, Dict[str, List[int]]] = {}
+        # document id -> (title length, document length, unique tokens)
+        self.__documents: Dict[str, Tuple[int, int, Tuple[str, ...]]] = {}
+        self.__total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.__documents)
+
+    def add(self, doc_id: str, title: Optional[str], body: Optional[str]):
+        self.remove(doc_id)
+        title_tokens = tokenize(title)
+        body_tokens = tokenize(body)
+        positions: Dict[str, List[int]] = {}
+        for position, token in enumerate(title_tokens):
+            positions.setdefault(token, []).append(position)
+        offset = len(title_tokens) + FIELDS_GAP
+        for position, token in enumerate(body_tokens, start=offset):
+            positions.setdefault(token, []).append(position)
+        for token, token_positions in positions.items():
+            self.__postings.setdefault(token, {})[doc_id] = token_positions
+        length = len(title_tokens) + len(body_tokens)
+        self.__documents[doc_id] = (
+            len(title_tokens),
+            length,
+            tuple(positions),
+        )
+        self.__total_length += length
+
+    def remove(self, doc_id: str):
+        document = self.__documents.pop(doc_id, None)
+        if document is None:
+            return
+        _, length, tokens = document
+        self.__total_length -= length
+        for token in tokens:
+            postings = self.__postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self.__postings[token]
+
+    def clear(self):
+        self.__postings.clear()
+        self.__documents.clear()
+        self.__total_length = 0
+
+    def __has_phrase(self, doc_id: str, phrase: List[str]) -> bool:
+        first_positions = self.__postings[phrase[0]][doc_id]
+        for start in first_positions:
+            for shift, token in enumerate(phrase[1:], start=1):
+                if start + shift not in self.__postings[token][doc_id]:
+                    break
+            else:
+                return True
+        return False
+
+    def search(
+        self,
+        query: str,
+        limit: int = 30,
+        accept: Optional[Callable[[str], bool]] = None,
+    ) -> List[Tuple[str, float]]:
+        terms, phrases = parse_search_query(query)
+        if not terms:
+            return []
+        postings = []
+        for term in terms:
+            term_postings = self.__postings.get(term)
+            if not term_postings:
+                # Every term has to match
+                return []
+            postings.append(term_postings)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for term_postings in postings[1:]:
+            candidates.intersection_update(term_postings)
+            if not candidates:
+                return []
+        if accept is not None:
+            candidates = {doc_id for doc_id in candidates if accept(doc_id)}
+        if phrases:
+            candidates = {
+                doc_id for doc_id in candidates
+                if all(self.__has_phrase(doc_id, phrase) for phrase in phrases)
+            }
+        # BM25, matches in the title count title_weight times
+        documents_count = len(self.__documents)
+        average_length = self.__total_length / documents_count or 1
+        weighted_postings = [
+            (
+                math.log(
+                    1 + (documents_count - len(term_postings) + 0.5)
+                    / (len(term_postings) + 0.5)
+                ),
+                term_postings,
+            )
+            for term_postings in postings
+        ]
+        scores = []
+        for doc_id in candidates:
+            title_length, length, _ = self.__documents[doc_id]
+            norm = self.k1 * (1 - self.b + self.b * length / average_length)
+            score = 0.0
+            for idf, term_postings in weighted_postings:
+                positions = term_postings[doc_id]
+                title_hits = 0
+                for position in positions:
+                    if position >= title_length:
+                        break
+                    title_hits += 1
+                frequency = (
+                    len(positions) - title_hits
+                    + self.title_weight * title_hits
+                )
+                score += idf * frequency * (self.k1 + 1) / (frequency + norm)
+            scores.append((doc_id, score))
+        return heapq.nsmallest(
+            limit,
+            scores,
+            key=lambda pair: (-pair[1], pair[0]),
+        )
@@ -0,0 +1,56 @@
+# This file contains JSON codecs used for requests to the GitHub API,
+# faster libraries are used when they are installed
+import json
+from typing import Any, Callable, NamedTuple, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+__all__ = [
+    'JSONCodec',
+    'get_json_codec',
+]
+
+
+class JSONCodec(NamedTuple):
+    name: str
+    loads: Callable[[bytes], Any]
+    dumps: Callable[[Any], bytes]
+
+
+def _json_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+STDLIB_CODEC = JSONCodec('json', json.loads, _json_dumps)
+CODECS = {'json': STDLIB_CODEC}
+if orjson is not None:
+    CODECS['orjson'] = JSONCodec('orjson', orjson.loads, orjson.dumps)
+if msgspec is not None:
+    CODECS['msgspec'] = JSONCodec(
+        'msgspec',
+        msgspec.json.decode,
+        msgspec.json.encode,
+    )
+# Preferred codecs go first
+CODECS_PRIORITY = ('orjson', 'msgspec', 'json')
+
+
+def get_json_codec(codec: Optional[Union[str, JSONCodec]] = None) -> JSONCodec:
+    if isinstance(codec, JSONCodec):
+        return codec
+    if codec is not None:
+        if codec not in CODECS:
+            raise ValueError(f'JSON codec is not available: {codec}')
+        return CODECS[codec]
+    for name in CODECS_PRIORITY:
+        if name in CODECS:
+            return CODECS[name]
+    return STDLIB_CODEC
@@ -0,0 +1,80 @@
+# This file contains the coalescing of concurrent identical operations
+import asyncio
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    TypeVar,
+)
+
+__all__ = [
+    'SingleFlight',
+]
+
+T = TypeVar('T')
+
+
+class SingleFlight:
+    def __init__(self):
+        # Key -> [running task, number of callers waiting for it]
+        self.__flights: Dict[Hashable, List] = {}
+
+    def is_running(self, key: Hashable) -> bool:
+        return key in self.__flights
+
+    def __on_done(self, key: Hashable, task: asyncio.Future):
+        flight = self.__flights.get(key)
+        if flight is not None and flight[0] is task:
+            del self.__flights[key]
+        # Nobody may wait for the result if every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def __cancel(self, key: Hashable, task: asyncio.Future):
+        # Callers coming after the cancellation start a new call
+        # instead of waiting for the cancelled one
+        flight = self.__flights.get(key)
+        if flight is not None and flight[0] is task:
+            del self.__flights[key]
+        task.cancel()
+
+    async def cancel_all(self):
+        flights = list(self.__flights.items())
+        for key, (task, _) in flights:
+            self.__cancel(key, task)
+        await asyncio.gather(
+            *(task for _, (task, _) in flights),
+            return_exceptions=True,
+        )
+
+    async def run(
+        self,
+        key: Hashable,
+        function: Callable[[], Awaitable[T]],
+        copy: Optional[Callable[[T], T]] = None,
+    ) -> T:
+        # Callers with the same key share one call of the function.
+        # The task is shielded, so a cancelled caller does not cancel
+        # it for others, it is cancelled when nobody waits for it.
+        flight = self.__flights.get(key)
+        if flight is None:
+            task = asyncio.ensure_future(function())
+            flight = self.__flights[key] = [task, 0]
+            task.add_done_callback(
+                lambda done_task: self.__on_done(key, done_task)
+            )
+        flight[1] += 1
+        try:
+            result = await asyncio.shield(flight[0])
+        finally:
+            flight[1] -= 1
+            if not flight[1] and not flight[0].done():
+                self.__cancel(key, flight[0])
+        # The last caller takes the result itself, the others get
+        # copies when the callers are allowed to modify it
+        if copy is not None and flight[1]:
+            return copy(result)
+        return result
@@ -0,0 +1,115 @@
+# This file contains helpers to persist client caches between restarts
+import gzip
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import List, Optional, Union
+
+from pydantic import BaseModel, Field
+
+from .models import (
+    BaseField,
+    DraftIssueContent,
+    IssueContent,
+    ProjectItem,
+    PullRequestContent,
+    SingleSelectProjectField,
+)
+
+__all__ = [
+    'SNAPSHOT_VERSION',
+    'ProjectSnapshot',
+    'deserialize_field',
+    'deserialize_item',
+    'read_snapshot',
+    'serialize_field',
+    'serialize_item',
+    'write_snapshot',
+]
+
+# Bump the version whenever the layout of the serialized fields/items
+# changes, old snapshots are ignored then
+SNAPSHOT_VERSION = 1
+
+CONTENT_TYPES = {
+    'DraftIssue': DraftIssueContent,
+    'Issue': IssueContent,
+    'PullRequest': PullRequestContent,
+}
+
+
+class ProjectSnapshot(BaseModel):
+    version: int = SNAPSHOT_VERSION
+    organization: str
+    project_number: int
+    repository_name: str
+    created_at: float = Field(default_factory=time.time)
+    project_id: Optional[str] = None
+    repository_id: Optional[str] = None
+    last_synced_at: Optional[datetime] = None
+    fields: List[dict] = []
+    items: List[dict] = []
+
+
+def serialize_field(field: Union[BaseField, SingleSelectProjectField]) -> dict:
+    data = field.model_dump()
+    data['single_select'] = isinstance(field, SingleSelectProjectField)
+    return data
+
+
+def deserialize_field(
+    data: dict,
+) -> Union[BaseField, SingleSelectProjectField]:
+    data = dict(data)
+    if data.pop('single_select', False):
+        return SingleSelectProjectField(**data)
+    return BaseField(**data)
+
+
+def serialize_item(item: ProjectItem) -> dict:
+    data = item.model_dump(mode='json', exclude={'content'})
+    if item.content is not None:
+        for type_name, content_type in CONTENT_TYPES.items():
+            if type(item.content) is content_type:
+                data['content_type'] = type_name
+                break
+        data['content'] = item.content.model_dump()
+    return data
+
+
+def deserialize_item(data: dict) -> ProjectItem:
+    data = dict(data)
+    content_data = data.pop('content', None)
+    content_type = CONTENT_TYPES[data.pop('content_type', 'PullRequest')]
+    item = ProjectItem(**data)
+    if content_data is not None:
+        item.content = content_type(**content_data)
+    return item
+
+
+def write_snapshot(path: str, snapshot: ProjectSnapshot):
+    # Write into a temporary file first so a crash in the middle
+    # never leaves a truncated snapshot behind
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            with gzip.GzipFile(fileobj=tmp_file, mode='wb') as gz_file:
+                gz_file.write(snapshot.model_dump_json().encode('utf-8'))
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_snapshot(path: str) -> Optional[ProjectSnapshot]:
+    if not os.path.exists(path):
+        return None
+    with gzip.open(path, 'rb') as gz_file:
+        data = json.loads(gz_file.read().decode('utf-8'))
+    if data.get('version') != SNAPSHOT_VERSION:
+        return None
+    return ProjectSnapshot(**data)
@@ -0,0 +1,155 @@
+# This file contains the write-behind queue of project field updates
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .models import ProjectFieldUpdate, ProjectFieldUpdateResult
+
+__all__ = [
+    'FieldUpdateQueue',
+]
+
+DEFAULT_FLUSH_INTERVAL = 0.5
+DEFAULT_MAX_BATCH_SIZE = 50
+
+BatchFunction = Callable[
+    [List[ProjectFieldUpdate]],
+    Awaitable[List[ProjectFieldUpdateResult]],
+]
+
+_logger = logging.getLogger(__name__)
+
+
+class FieldUpdateQueue:
+    def __init__(
+        self,
+        batch_function: BatchFunction,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    ):
+        if max_batch_size < 1:
+            raise ValueError('Batch size should be positive')
+        self.__batch_function = batch_function
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        # (item ID, field name) -> the latest update and the futures
+        # of its callers, earlier updates of the same pair are never sent
+        self.__pending: Dict[
+            Tuple[str, str],
+            Tuple[ProjectFieldUpdate, List[asyncio.Future]],
+        ] = {}
+        self.__timer: Optional[asyncio.TimerHandle] = None
+        self.__flush_task: Optional[asyncio.Task] = None
+        self.__lock: Optional[asyncio.Lock] = None
+
+    @property
+    def pending_count(self) -> int:
+        return len(self.__pending)
+
+    def __get_lock(self) -> asyncio.Lock:
+        # The queue is made in the constructor of its client, which may
+        # run outside of the loop flushing the queue (a lock made there
+        # is bound to the wrong loop before Python 3.10)
+        if self.__lock is None:
+            self.__lock = asyncio.Lock()
+        return self.__lock
+
+    @staticmethod
+    def __consume_error(future: asyncio.Future):
+        # Errors are logged by flush(), callers may not wait for them
+        if not future.cancelled():
+            future.exception()
+
+    @staticmethod
+    def __log_result(result: ProjectFieldUpdateResult):
+        # Callers may not wait for their updates, failures
+        # should not go unnoticed then
+        if not result.success:
+            _logger.warning(
+                'Cannot set %s of %s to %s: %s',
+                result.field_name,
+                result.item_id,
+                result.value,
+                result.error,
+            )
+
+    def put(self, update: ProjectFieldUpdate) -> asyncio.Future:
+        # Updates of the same field of the same item are merged,
+        # every caller gets the result of the value which is sent
+        # at last. Each caller has its own future, so a cancelled
+        # caller does not cancel the update for the others.
+        loop = asyncio.get_running_loop()
+        key = (update.item_id, update.field_name)
+        future = loop.create_future()
+        future.add_done_callback(self.__consume_error)
+        futures = []
+        pending = self.__pending.pop(key, None)
+        if pending is not None:
+            futures = [waiter for waiter in pending[1] if not waiter.done()]
+        futures.append(future)
+        self.__pending[key] = (update, futures)
+        if len(self.__pending) >= self.max_batch_size:
+            self.__schedule_flush()
+        elif self.__timer is None:
+            self.__timer = loop.call_later(
+                self.flush_interval,
+                self.__schedule_flush,
+            )
+        return future
+
+    def __cancel_timer(self):
+        if self.__timer is not None:
+            self.__timer.cancel()
+            self.__timer = None
+
+    def __schedule_flush(self):
+        self.__cancel_timer()
+        # A running flush sends everything pending until the queue
+        # is empty, including the updates added meanwhile
+        if self.__flush_task is None or self.__flush_task.done():
+            self.__flush_task = asyncio.ensure_future(self.flush())
+
+    def __take_batch(
+        self,
+    ) -> List[Tuple[ProjectFieldUpdate, List[asyncio.Future]]]:
+        batch = []
+        for key in list(self.__pending)[:self.max_batch_size]:
+            batch.append(self.__pending.pop(key))
+        return batch
+
+    async def flush(self):
+        # Batches are sent one by one, so a value queued after
+        # another one for the same field is always written later
+        async with self.__get_lock():
+            while self.__pending:
+                self.__cancel_timer()
+                batch = self.__take_batch()
+                try:
+                    results = await self.__batch_function(
+                        [update for update, _ in batch]
+                    )
+                except asyncio.CancelledError:
+                    for _, futures in batch:
+                        for future in futures:
+                            future.cancel()
+                    raise
+                except Exception as error:
+                    _logger.warning(
+                        'Cannot update %d project fields: %s',
+                        len(batch),
+                        error,
+                    )
+                    for _, futures in batch:
+                        for future in futures:
+                            if not future.done():
+                                future.set_exception(error)
+                    continue
+                for (_, futures), result in zip(batch, results):
+                    self.__log_result(result)
+                    for future in futures:
+                        if not future.done():
+                            future.set_result(result)
+
+    async def close(self):
+        self.__cancel_timer()
+        await self.flush()
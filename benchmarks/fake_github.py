@@ -0,0 +1,644 @@
+# This file contains a local stand-in for api.github.com/graphql
+# which serves a synthetic ProjectV2 board
+import argparse
+import asyncio
+import base64
+import json
+import random
+import re
+import shlex
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from aiohttp import web
+
+__all__ = [
+    'FakeGitHubServer',
+    'FakeProject',
+    'start_server',
+]
+
+OPERATION_NAME_REGEX = re.compile(r'^\s*(?:query|mutation)\s+(\w+)')
+INLINE_FIRST_REGEX = re.compile(r'items\(first: (\d+)')
+INLINE_AFTER_REGEX = re.compile(r'after: "([^"]+)"')
+INLINE_QUERY_REGEX = re.compile(r'query: ("(?:[^"\\]|\\.)*")')
+FIELD_BY_NAME_REGEX = re.compile(
+    r'(field_\d+): fieldValueByName\(name: ("(?:[^"\\]|\\.)*")\)'
+)
+MUTATION_ALIAS_REGEX = re.compile(
+    r'(?:(\w+): )?(updateProjectV2ItemFieldValue|createIssue'
+    r'|addProjectV2ItemById|closeIssue|addComment)\s*\('
+)
+
+PROJECT_ID = 'PVT_kwDOBENCH'
+STATUS_FIELD_ID = 'PVTSSF_STATUS'
+PLATFORM_FIELD_ID = 'PVTSSF_PLATFORM'
+NOTES_FIELD_ID = 'PVTF_NOTES'
+STATUSES = ('Todo', 'In progress', 'Blocked', 'Done')
+PLATFORMS = ('x86_64', 'aarch64', 'ppc64le', 's390x', 'i686')
+REPOSITORIES = ('almalinux-build', 'albs-web-server', 'albs-node')
+# Items are updated one minute after another, the last ones are the
+# most recent, so "updated:>=" filters return a tail of the board
+BASE_UPDATED_AT = datetime(2024, 1, 1, tzinfo=timezone.utc)
+UPDATE_STEP = timedelta(minutes=1)
+DEFAULT_RATE_LIMIT_BUDGET = 5000
+
+BODY_WORDS = (
+    'build', 'failed', 'kernel', 'package', 'mock', 'rpm', 'srpm',
+    'dependency', 'missing', 'module', 'stream', 'release', 'errata',
+    'signed', 'sign', 'key', 'repository', 'mirror', 'upstream',
+    'debrand', 'patch', 'rebuild', 'test', 'platform', 'architecture',
+)
+BUILD_LOG_LINES = (
+    'DEBUG util.py:446:  No matching package to install: {word}',
+    'ERROR: Command failed: /usr/bin/rpmbuild -bb {word}.spec',
+    'DEBUG util.py:444:  Error: Unable to find a match: {word}-devel',
+    'Finish: build phase for {word}-{num}.el9.src.rpm',
+)
+
+
+def encode_cursor(offset: int) -> str:
+    return base64.b64encode(f'cursor:{offset}'.encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    return int(base64.b64decode(cursor).decode().split(':', 1)[1])
+
+
+def format_datetime(value: datetime) -> str:
+    return value.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class FakeProject:
+    # Items are generated from their index on every request, so even
+    # a board with 100k items does not take memory on the server side
+    def __init__(self, items_count: int, seed: int = 0):
+        self.items_count = items_count
+        self.seed = seed
+        self.__filters: Dict[str, List[int]] = {}
+
+    @property
+    def fields(self) -> List[dict]:
+        return [
+            {'__typename': 'ProjectV2Field', 'id': 'PVTF_TITLE',
+             'name': 'Title', 'dataType': 'TITLE'},
+            {'__typename': 'ProjectV2Field', 'id': 'PVTF_ASSIGNEES',
+             'name': 'Assignees', 'dataType': 'ASSIGNEES'},
+            {
+                '__typename': 'ProjectV2SingleSelectField',
+                'id': STATUS_FIELD_ID,
+                'name': 'Status',
+                'dataType': 'SINGLE_SELECT',
+                'options': [
+                    {'id': f'OPT_S_{index}', 'name': name,
+                     'description': ''}
+                    for index, name in enumerate(STATUSES)
+                ],
+            },
+            {
+                '__typename': 'ProjectV2SingleSelectField',
+                'id': PLATFORM_FIELD_ID,
+                'name': 'Platform',
+                'dataType': 'SINGLE_SELECT',
+                'options': [
+                    {'id': f'OPT_P_{index}', 'name': name,
+                     'description': ''}
+                    for index, name in enumerate(PLATFORMS)
+                ],
+            },
+            {'__typename': 'ProjectV2Field', 'id': NOTES_FIELD_ID,
+             'name': 'Notes', 'dataType': 'TEXT'},
+            {'__typename': 'ProjectV2Field', 'id': 'PVTF_REPOSITORY',
+             'name': 'Repository', 'dataType': 'REPOSITORY'},
+        ]
+
+    @staticmethod
+    def get_status(index: int) -> str:
+        return STATUSES[index * 7 % len(STATUSES)]
+
+    @staticmethod
+    def get_repository(index: int) -> str:
+        return REPOSITORIES[index % len(REPOSITORIES)]
+
+    @staticmethod
+    def get_type(index: int) -> str:
+        if index % 29 == 0:
+            return 'DRAFT_ISSUE'
+        if index % 37 == 0:
+            return 'PULL_REQUEST'
+        return 'ISSUE'
+
+    @staticmethod
+    def get_state(index: int) -> str:
+        return 'CLOSED' if index % 5 == 0 else 'OPEN'
+
+    @staticmethod
+    def get_updated_at(index: int) -> datetime:
+        return BASE_UPDATED_AT + UPDATE_STEP * index
+
+    @staticmethod
+    def get_content_id(index: int) -> str:
+        return f'I_kwDOBENCH{index}'
+
+    def get_body(self, index: int) -> str:
+        rnd = random.Random(self.seed * 1000003 + index)
+        words = rnd.choices(BODY_WORDS, k=rnd.randint(20, 120))
+        lines = [
+            f'### {" ".join(words[:6]).capitalize()}',
+            '',
+            ' '.join(words),
+            '',
+            '```',
+        ]
+        for _ in range(rnd.randint(2, 30)):
+            lines.append(rnd.choice(BUILD_LOG_LINES).format(
+                word=rnd.choice(BODY_WORDS),
+                num=rnd.randint(1, 100),
+            ))
+        lines.append('```')
+        return '\n'.join(lines)
+
+    def get_content(self, index: int, with_body: bool = True) -> dict:
+        item_type = self.get_type(index)
+        content = {'id': self.get_content_id(index)}
+        title = f'Build of {BODY_WORDS[index % len(BODY_WORDS)]} #{index}'
+        if item_type == 'DRAFT_ISSUE':
+            content['__typename'] = 'DraftIssue'
+            content['title'] = title
+        elif item_type == 'PULL_REQUEST':
+            content['__typename'] = 'PullRequest'
+            content['number'] = index + 1
+            content['title'] = title
+        else:
+            content['__typename'] = 'Issue'
+            content['state'] = self.get_state(index)
+            content['title'] = title
+            content['number'] = index + 1
+        if with_body:
+            content['body'] = self.get_body(index)
+        return content
+
+    def get_field_values(self, index: int) -> List[dict]:
+        status = self.get_status(index)
+        platform = PLATFORMS[index % len(PLATFORMS)]
+        values = [
+            {
+                '__typename': 'ProjectV2ItemFieldSingleSelectValue',
+                'id': f'PVTFSV_S_{index}',
+                'name': status,
+                'optionId': f'OPT_S_{STATUSES.index(status)}',
+                'field': {
+                    '__typename': 'ProjectV2SingleSelectField',
+                    'id': STATUS_FIELD_ID,
+                    'name': 'Status',
+                },
+            },
+            {
+                '__typename': 'ProjectV2ItemFieldSingleSelectValue',
+                'id': f'PVTFSV_P_{index}',
+                'name': platform,
+                'optionId': f'OPT_P_{PLATFORMS.index(platform)}',
+                'field': {
+                    '__typename': 'ProjectV2SingleSelectField',
+                    'id': PLATFORM_FIELD_ID,
+                    'name': 'Platform',
+                },
+            },
+            {
+                '__typename': 'ProjectV2ItemFieldTextValue',
+                'id': f'PVTFTV_N_{index}',
+                'text': f'Build {index} notes',
+                'field': {
+                    '__typename': 'ProjectV2Field',
+                    'id': NOTES_FIELD_ID,
+                    'name': 'Notes',
+                },
+            },
+            {
+                '__typename': 'ProjectV2ItemFieldRepositoryValue',
+                'repository': {
+                    'id': f'R_{self.get_repository(index)}',
+                    'name': self.get_repository(index),
+                },
+            },
+        ]
+        if self.get_type(index) == 'DRAFT_ISSUE':
+            # Drafts are not connected to any repository
+            values.pop()
+        return values
+
+    def get_item(
+        self,
+        index: int,
+        with_body: bool = True,
+        with_field_values: bool = True,
+        field_names: Optional[List[Tuple[str, str]]] = None,
+    ) -> dict:
+        item = {
+            'type': self.get_type(index),
+            'id': f'PVTI_{index}',
+            'updatedAt': format_datetime(self.get_updated_at(index)),
+            'content': self.get_content(index, with_body),
+        }
+        if not with_field_values:
+            return item
+        values = self.get_field_values(index)
+        if field_names is None:
+            item['fieldValues'] = {'nodes': values}
+            return item
+        for alias, field_name in field_names:
+            item[alias] = None
+            for value in values:
+                name = (
+                    'Repository'
+                    if 'repository' in value
+                    else value['field']['name']
+                )
+                if name == field_name:
+                    item[alias] = value
+        return item
+
+    def __get_predicate(self, term: str) -> Callable[[int], bool]:
+        key, _, value = term.partition(':')
+        if key == 'updated' and value.startswith('>='):
+            since = datetime.strptime(value[2:], '%Y-%m-%d').replace(
+                tzinfo=timezone.utc,
+            )
+            return lambda index: self.get_updated_at(index) >= since
+        if key == 'status':
+            statuses = set(value.split(','))
+            return lambda index: self.get_status(index) in statuses
+        if key == 'platform':
+            platforms = set(value.split(','))
+            return lambda index: (
+                PLATFORMS[index % len(PLATFORMS)] in platforms
+            )
+        if key == 'no' and value in ('status', 'platform'):
+            return lambda index: False
+        if key == 'repo':
+            repo = value.rsplit('/', 1)[-1]
+            return lambda index: self.get_repository(index) == repo
+        if key == 'is' and value in ('open', 'closed'):
+            state = value.upper()
+            return lambda index: self.get_state(index) == state
+        raise ValueError(f'Unsupported filter: {term}')
+
+    def filter_items(self, items_query: Optional[str]) -> Sequence[int]:
+        if not items_query:
+            return range(self.items_count)
+        if items_query not in self.__filters:
+            predicates = [
+                self.__get_predicate(term)
+                for term in shlex.split(items_query)
+            ]
+            self.__filters[items_query] = [
+                index for index in range(self.items_count)
+                if all(predicate(index) for predicate in predicates)
+            ]
+        return self.__filters[items_query]
+
+    def parse_node_id(self, node_id: str) -> Tuple[str, Optional[int]]:
+        for prefix, kind in (('PVTI_', 'item'), ('I_kwDOBENCH', 'content')):
+            if node_id.startswith(prefix):
+                index = int(node_id[len(prefix):])
+                if 0 <= index < self.items_count:
+                    return kind, index
+        return 'unknown', None
+
+
+class FakeGitHubServer:
+    def __init__(
+        self,
+        project: FakeProject,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        rate_limit_every: int = 0,
+        error_every: int = 0,
+        retry_after: int = 1,
+        rate_limit_budget: int = DEFAULT_RATE_LIMIT_BUDGET,
+        reset_window: int = 3600,
+        item_latency: float = 0.0,
+        fail_pages_over: int = 0,
+    ):
+        self.project = project
+        self.latency = latency
+        # Bigger pages take longer, pages over the limit time out
+        # with 502 like heavy queries on GitHub do
+        self.item_latency = item_latency
+        self.fail_pages_over = fail_pages_over
+        self.jitter = jitter
+        self.rate_limit_every = rate_limit_every
+        self.error_every = error_every
+        self.retry_after = retry_after
+        self.rate_limit_budget = rate_limit_budget
+        self.reset_window = reset_window
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.operations: Dict[str, int] = {}
+        self.sent_bytes = 0
+        self.throttled = 0
+        self.failed = 0
+        self.used = 0
+        self.reset_at = time.time() + self.reset_window
+        self.__created = 0
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'requests': self.requests,
+            'operations': dict(self.operations),
+            'sent_bytes': self.sent_bytes,
+            'throttled': self.throttled,
+            'failed': self.failed,
+            'used': self.used,
+        }
+
+    def make_app(self) -> web.Application:
+        app = web.Application(client_max_size=16 * 1024 * 1024)
+        app.router.add_post('/graphql', self.handle)
+        return app
+
+    def __get_rate_limit_headers(self) -> Dict[str, str]:
+        return {
+            'X-RateLimit-Limit': str(self.rate_limit_budget),
+            'X-RateLimit-Remaining': str(
+                max(self.rate_limit_budget - self.used, 0)
+            ),
+            'X-RateLimit-Used': str(self.used),
+            'X-RateLimit-Reset': str(int(self.reset_at)),
+        }
+
+    def __get_rate_limit(self, cost: int) -> dict:
+        return {
+            'cost': cost,
+            'limit': self.rate_limit_budget,
+            'remaining': max(self.rate_limit_budget - self.used, 0),
+            'used': self.used,
+            'resetAt': format_datetime(
+                datetime.fromtimestamp(self.reset_at, tz=timezone.utc)
+            ),
+        }
+
+    def __json_response(self, data: dict, status: int = 200, headers=None):
+        body = json.dumps(data).encode()
+        self.sent_bytes += len(body)
+        return web.Response(
+            body=body,
+            status=status,
+            content_type='application/json',
+            headers=headers,
+        )
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        payload = await request.json()
+        query = payload['query']
+        variables = payload.get('variables') or {}
+        match = OPERATION_NAME_REGEX.match(query)
+        operation = match.group(1) if match else 'anonymous'
+        self.operations[operation] = self.operations.get(operation, 0) + 1
+        if self.latency or self.jitter:
+            await asyncio.sleep(
+                self.latency + random.uniform(0, self.jitter)
+            )
+        if time.time() >= self.reset_at:
+            self.used = 0
+            self.reset_at = time.time() + self.reset_window
+        headers = self.__get_rate_limit_headers()
+        if self.error_every and self.requests % self.error_every == 0:
+            self.failed += 1
+            return web.Response(status=502, text='Bad Gateway')
+        if (
+            self.rate_limit_every
+            and self.requests % self.rate_limit_every == 0
+        ):
+            self.throttled += 1
+            headers['Retry-After'] = str(self.retry_after)
+            return self.__json_response(
+                {'message': 'You have exceeded a secondary rate limit.'},
+                status=403,
+                headers=headers,
+            )
+        if self.used >= self.rate_limit_budget:
+            self.throttled += 1
+            return self.__json_response(
+                {'errors': [{
+                    'type': 'RATE_LIMITED',
+                    'message': 'API rate limit exceeded',
+                }]},
+                headers=headers,
+            )
+        if operation == 'GetOrgProjectIssues':
+            first = variables.get('first') or 100
+            if self.item_latency:
+                await asyncio.sleep(self.item_latency * first)
+            if self.fail_pages_over and first > self.fail_pages_over:
+                self.failed += 1
+                return web.Response(status=502, text='Bad Gateway')
+        try:
+            data, cost = self.__execute(operation, query, variables)
+        except ValueError as error:
+            return self.__json_response(
+                {'errors': [{'message': str(error)}]},
+                headers=headers,
+            )
+        self.used += cost
+        if 'rateLimit' in query:
+            data['rateLimit'] = self.__get_rate_limit(cost)
+        headers = self.__get_rate_limit_headers()
+        return self.__json_response({'data': data}, headers=headers)
+
+    def __execute(
+        self,
+        operation: str,
+        query: str,
+        variables: dict,
+    ) -> Tuple[dict, int]:
+        if operation == 'GetOrgProjectFields':
+            return self.__organization({'projectV2': {
+                'fields': {'nodes': self.project.fields},
+            }}), 1
+        if operation == 'GetRepositoryInfo':
+            return self.__organization({'repository': {
+                'id': f'R_{variables.get("repo_name")}',
+            }}), 1
+        if operation == 'GetOrgProjectIssues':
+            return self.__get_project_items(query, variables)
+        if operation in ('GetNodes', 'GetNodesBodies'):
+            return self.__get_nodes(operation, variables['ids']), 1
+        if query.lstrip().startswith('mutation'):
+            return self.__mutate(query, variables), 1
+        raise ValueError(f'Unsupported operation: {operation}')
+
+    @staticmethod
+    def __organization(data: dict) -> dict:
+        return {'organization': data}
+
+    def __get_project_items(
+        self,
+        query: str,
+        variables: dict,
+    ) -> Tuple[dict, int]:
+        first = variables.get('first')
+        after = variables.get('after')
+        items_query = variables.get('items_query')
+        # Legacy documents carry the arguments inline
+        if first is None:
+            match = INLINE_FIRST_REGEX.search(query)
+            first = int(match.group(1)) if match else 100
+        if after is None:
+            match = INLINE_AFTER_REGEX.search(query)
+            after = match.group(1) if match else None
+        if items_query is None:
+            match = INLINE_QUERY_REGEX.search(query)
+            items_query = json.loads(match.group(1)) if match else None
+        if not 1 <= first <= 100:
+            raise ValueError('first should be between 1 and 100')
+        field_names = [
+            (alias, json.loads(name))
+            for alias, name in FIELD_BY_NAME_REGEX.findall(query)
+        ] or None
+        indexes = self.project.filter_items(items_query)
+        offset = decode_cursor(after)
+        page = indexes[offset:offset + first]
+        end = offset + len(page)
+        nodes = [
+            self.project.get_item(
+                index,
+                with_body=variables.get('with_body', True),
+                with_field_values=variables.get('with_field_values', True),
+                field_names=field_names,
+            )
+            for index in page
+        ]
+        data = self.__organization({'projectV2': {
+            'title': 'Benchmark board',
+            'id': PROJECT_ID,
+            'items': {
+                'pageInfo': {
+                    'startCursor': encode_cursor(offset),
+                    'endCursor': encode_cursor(end),
+                    'hasNextPage': end < len(indexes),
+                },
+                'nodes': nodes,
+            },
+        }})
+        return data, 1
+
+    def __get_nodes(self, operation: str, ids: List[str]) -> dict:
+        nodes = []
+        for node_id in ids:
+            kind, index = self.project.parse_node_id(node_id)
+            if kind == 'item':
+                node = self.project.get_item(index)
+                node['__typename'] = 'ProjectV2Item'
+                node['project'] = {'id': PROJECT_ID}
+            elif kind == 'content':
+                node = self.project.get_content(index)
+                if operation == 'GetNodesBodies':
+                    node = {
+                        '__typename': node['__typename'],
+                        'id': node['id'],
+                        'body': node['body'],
+                    }
+            else:
+                node = None
+            nodes.append(node)
+        return {'nodes': nodes}
+
+    def __mutate(self, query: str, variables: dict) -> dict:
+        data = {}
+        for alias, mutation in MUTATION_ALIAS_REGEX.findall(query):
+            key = alias or mutation
+            suffix = key.rsplit('_', 1)[-1] if alias else ''
+            if mutation == 'updateProjectV2ItemFieldValue':
+                item_id = variables.get(
+                    f'item_id_{suffix}' if alias else 'item_id'
+                )
+                data[key] = {'projectV2Item': {'id': item_id}}
+            elif mutation == 'createIssue':
+                self.__created += 1
+                data[key] = {'issue': {
+                    'id': f'I_NEW{self.__created}',
+                    'number': self.project.items_count + self.__created,
+                    'state': 'OPEN',
+                }}
+            elif mutation == 'addProjectV2ItemById':
+                self.__created += 1
+                data[key] = {'item': {'id': f'PVTI_NEW{self.__created}'}}
+            elif mutation == 'closeIssue':
+                data[key] = {'issue': {
+                    'id': variables.get('issueId'),
+                    'state': 'CLOSED',
+                }}
+            else:
+                data[key] = {'subject': {'id': variables.get('issue_id')}}
+        return data
+
+
+async def start_server(
+    server: FakeGitHubServer,
+    host: str = '127.0.0.1',
+    port: int = 0,
+) -> Tuple[web.AppRunner, str]:
+    runner = web.AppRunner(server.make_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f'http://{host}:{port}/graphql'
+
+
+async def serve(args: argparse.Namespace):
+    server = FakeGitHubServer(
+        FakeProject(args.items, seed=args.seed),
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        rate_limit_every=args.rate_limit_every,
+        error_every=args.error_every,
+        item_latency=args.item_latency / 1000,
+        fail_pages_over=args.fail_pages_over,
+    )
+    runner, url = await start_server(server, args.host, args.port)
+    print(f'Serving {args.items} items at {url}')
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Fake GitHub GraphQL API serving a synthetic project',
+    )
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Response delay in milliseconds')
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help='Random extra delay in milliseconds')
+    parser.add_argument('--rate-limit-every', type=int, default=0,
+                        help='Answer every Nth request with 403')
+    parser.add_argument('--error-every', type=int, default=0,
+                        help='Answer every Nth request with 502')
+    parser.add_argument('--item-latency', type=float, default=0.0,
+                        help='Extra delay per requested item in ms')
+    parser.add_argument('--fail-pages-over', type=int, default=0,
+                        help='Answer bigger item pages with 502')
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
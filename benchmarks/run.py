@@ -0,0 +1,296 @@
+# This file runs the client against the fake GitHub server and reports
+# wall time, request count, peak RSS and per-item parse cost.
+#
+#   python -m benchmarks.run --sizes 1000 10000 --output results.json
+#   python -m benchmarks.run --baseline results.json
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import sys
+import time
+from typing import List, Optional
+
+from albs_github.graphql.client import IntegrationsGHGraphQLClient
+from albs_github.graphql.export import export_project_items
+from albs_github.graphql.models import (
+    ProjectFieldUpdate,
+    ProjectItemsProjection,
+)
+from albs_github.graphql.rate_limit import RateLimiter
+
+from .fake_github import (
+    FakeGitHubServer,
+    FakeProject,
+    start_server,
+)
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+BATCH_UPDATES_COUNT = 500
+
+
+def get_peak_rss() -> Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def make_client(url: str, options: dict) -> IntegrationsGHGraphQLClient:
+    return IntegrationsGHGraphQLClient(
+        'benchmark-token',
+        'AlmaLinux',
+        1,
+        'almalinux-build',
+        compact_cache=options.get('compact_cache', False),
+        json_codec=options.get('json_codec'),
+        api_url=url,
+        # Throttling is injected on purpose, backoff delays
+        # should not dominate the results
+        rate_limiter=RateLimiter(backoff_base=0.05, backoff_max=1.0),
+    )
+
+
+async def scenario_initialize(client: IntegrationsGHGraphQLClient):
+    await client.initialize()
+
+
+async def scenario_scan_without_bodies(client: IntegrationsGHGraphQLClient):
+    await client.get_project_issues(
+        projection=ProjectItemsProjection(with_bodies=False),
+    )
+
+
+async def scenario_scan_status_only(client: IntegrationsGHGraphQLClient):
+    await client.get_project_issues(
+        projection=ProjectItemsProjection(
+            with_bodies=False,
+            field_names=['Status'],
+        ),
+    )
+
+
+async def scenario_scan_partitioned(client: IntegrationsGHGraphQLClient):
+    await client.get_project_issues(partition_by='Status')
+
+
+async def scenario_stream_items(client: IntegrationsGHGraphQLClient):
+    async for _ in client.iter_project_items():
+        pass
+
+
+async def scenario_export_ndjson(client: IntegrationsGHGraphQLClient):
+    with open(os.devnull, 'wb') as file:
+        await export_project_items(client, file)
+
+
+async def prepare_initialized(client: IntegrationsGHGraphQLClient):
+    await client.initialize()
+
+
+async def scenario_incremental_sync(client: IntegrationsGHGraphQLClient):
+    await client.get_project_issues(reload=True, incremental=True)
+
+
+async def scenario_set_fields_batch(client: IntegrationsGHGraphQLClient):
+    items = list((await client.get_project_issues()).values())
+    updates = [
+        ProjectFieldUpdate(
+            item_id=item.id,
+            field_name='Status',
+            value='Done',
+            # Measures the mutations, not the values already set
+            force=True,
+        )
+        for item in items[:BATCH_UPDATES_COUNT]
+    ]
+    await client.set_fields_batch(updates)
+
+
+# Name -> (preparation which is not measured, measured part, options)
+SCENARIOS = {
+    'initialize': (None, scenario_initialize, {}),
+    'initialize_compact': (
+        None,
+        scenario_initialize,
+        {'compact_cache': True},
+    ),
+    'scan_without_bodies': (None, scenario_scan_without_bodies, {}),
+    'scan_status_only': (None, scenario_scan_status_only, {}),
+    'scan_partitioned': (None, scenario_scan_partitioned, {}),
+    'stream_items': (None, scenario_stream_items, {}),
+    'export_ndjson': (None, scenario_export_ndjson, {'compact_cache': True}),
+    'incremental_sync': (prepare_initialized, scenario_incremental_sync, {}),
+    'set_fields_batch': (prepare_initialized, scenario_set_fields_batch, {}),
+}
+
+
+async def run_scenario(name: str, url: str, options: dict) -> dict:
+    prepare, measure, scenario_options = SCENARIOS[name]
+    options = dict(options, **scenario_options)
+    async with make_client(url, options) as client:
+        if prepare is not None:
+            await prepare(client)
+        client.metrics.reset()
+        started_at = time.perf_counter()
+        await measure(client)
+        wall_time = time.perf_counter() - started_at
+        snapshot = client.metrics.snapshot()
+    operations = snapshot['operations'].values()
+    parse = snapshot['parse'].get('ProjectItem') or {'items': 0, 'time': 0}
+    return {
+        'wall_time': wall_time,
+        'requests': sum(stats['requests'] for stats in operations),
+        'errors': sum(stats['errors'] for stats in operations),
+        'response_bytes': sum(
+            stats['response_bytes'] for stats in operations
+        ),
+        'decode_time': sum(stats['decode_time'] for stats in operations),
+        'parsed_items': parse['items'],
+        'parse_us_per_item': (
+            parse['time'] / parse['items'] * 1e6 if parse['items'] else None
+        ),
+        'peak_rss': get_peak_rss(),
+        'metrics': snapshot,
+    }
+
+
+def run_case(name: str, url: str, options: dict) -> dict:
+    # Every case runs in a fresh process, so the peak RSS
+    # belongs to this scenario only
+    return asyncio.run(run_scenario(name, url, options))
+
+
+async def run_benchmarks(args: argparse.Namespace) -> List[dict]:
+    results = []
+    loop = asyncio.get_running_loop()
+    context = multiprocessing.get_context('spawn')
+    options = {'json_codec': args.json_codec}
+    for size in args.sizes:
+        server = FakeGitHubServer(
+            FakeProject(size, seed=args.seed),
+            latency=args.latency / 1000,
+            jitter=args.jitter / 1000,
+            rate_limit_every=args.rate_limit_every,
+            error_every=args.error_every,
+            retry_after=args.retry_after,
+            item_latency=args.item_latency / 1000,
+            fail_pages_over=args.fail_pages_over,
+        )
+        runner, url = await start_server(server)
+        try:
+            for name in args.scenarios:
+                server.reset()
+                with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=1,
+                    mp_context=context,
+                ) as executor:
+                    result = await loop.run_in_executor(
+                        executor, run_case, name, url, options,
+                    )
+                result.update(
+                    scenario=name,
+                    items=size,
+                    server=server.stats,
+                )
+                print_result(result)
+                results.append(result)
+        finally:
+            await runner.cleanup()
+    return results
+
+
+def format_size(value: Optional[int]) -> str:
+    if value is None:
+        return '-'
+    return f'{value / 1024 / 1024:.1f}M'
+
+
+def print_result(result: dict, baseline: Optional[dict] = None):
+    parse_cost = result['parse_us_per_item']
+    line = (
+        f'{result["scenario"]:<22}{result["items"]:>8}'
+        f'{result["wall_time"]:>10.3f}s'
+        f'{result["requests"]:>8}'
+        f'{result["errors"]:>7}'
+        f'{format_size(result["response_bytes"]):>10}'
+        f'{format_size(result["peak_rss"]):>10}'
+        f'{parse_cost if parse_cost is not None else 0:>10.2f}us'
+    )
+    if baseline is not None:
+        change = result['wall_time'] / baseline['wall_time'] - 1
+        line += f'{change:>+10.1%}'
+    print(line, flush=True)
+
+
+def print_header():
+    print(
+        f'{"scenario":<22}{"items":>8}{"wall":>11}{"reqs":>8}'
+        f'{"errors":>7}{"received":>10}{"peak rss":>10}'
+        f'{"parse/item":>12}'
+    )
+
+
+def compare(results: List[dict], baseline_path: str):
+    with open(baseline_path) as file:
+        baseline = {
+            (result['scenario'], result['items']): result
+            for result in json.load(file)
+        }
+    print(f'\nCompared to {baseline_path}:')
+    print_header()
+    for result in results:
+        print_result(
+            result,
+            baseline.get((result['scenario'], result['items'])),
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmarks of the GraphQL client on synthetic projects',
+    )
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=list(DEFAULT_SIZES))
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS),
+                        default=list(SCENARIOS))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Response delay in milliseconds')
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help='Random extra delay in milliseconds')
+    parser.add_argument('--rate-limit-every', type=int, default=0,
+                        help='Answer every Nth request with 403')
+    parser.add_argument('--error-every', type=int, default=0,
+                        help='Answer every Nth request with 502')
+    parser.add_argument('--item-latency', type=float, default=0.0,
+                        help='Extra delay per requested item in ms')
+    parser.add_argument('--fail-pages-over', type=int, default=0,
+                        help='Answer bigger item pages with 502')
+    parser.add_argument('--retry-after', type=int, default=0,
+                        help='Retry-After of injected 403 responses')
+    parser.add_argument('--json-codec', default=None,
+                        help='json, orjson or msgspec')
+    parser.add_argument('--output', help='Save results as JSON')
+    parser.add_argument('--baseline',
+                        help='Compare wall time with saved results')
+    args = parser.parse_args()
+    print_header()
+    results = asyncio.run(run_benchmarks(args))
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == '__main__':
+    main()
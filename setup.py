@@ -26,5 +26,15 @@ setup(
         'pydantic>=2.4.2',
         'requests>=2.26.0',
     ],
+    extras_require={
+        'orjson': ['orjson>=3.6.0'],
+        'msgspec': ['msgspec>=0.18.0'],
+        'parquet': ['pyarrow>=7.0.0'],
+    },
+    entry_points={
+        'console_scripts': [
+            'albs-github-export=albs_github.graphql.export:main',
+        ],
+    },
     python_requires='>=3.7',
 )
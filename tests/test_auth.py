@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+
+import aiohttp
+from aiohttp import web
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from albs_github.graphql.auth import (
+    GHAppTokenProvider,
+    TokenProvider,
+    get_gh_app_token_provider,
+)
+from albs_github.graphql.client import IntegrationsGHGraphQLClient
+
+
+class TestTokenProvider(unittest.TestCase):
+    def test_is_abstract(self):
+        with self.assertRaises(TypeError):
+            TokenProvider()
+
+
+class TestGHAppTokenProvider(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        fd, self.pem_path = tempfile.mkstemp(suffix='.pem')
+        with os.fdopen(fd, 'wb') as pem_file:
+            pem_file.write(key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.TraditionalOpenSSL,
+                serialization.NoEncryption(),
+            ))
+        self.addCleanup(os.remove, self.pem_path)
+        self.callers = []
+        app = web.Application()
+        app.router.add_post(
+            '/app/installations/{installation_id}/access_tokens',
+            self.handle,
+        )
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        self.addAsyncCleanup(runner.cleanup)
+        self.api_url = f'http://127.0.0.1:{runner.addresses[0][1]}'
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.callers.append(request.headers.get('X-Caller'))
+        return web.json_response({
+            'token': f'token {len(self.callers)}',
+            'expires_at': '2100-01-01T00:00:00Z',
+        })
+
+    async def test_token_is_reused(self):
+        provider = GHAppTokenProvider(
+            self.pem_path,
+            '1',
+            '2',
+            api_url=self.api_url,
+        )
+        self.assertEqual(await provider.get_token(), 'token 1')
+        self.assertEqual(await provider.get_token(), 'token 1')
+        self.assertEqual(provider.current_token, 'token 1')
+        self.assertEqual(len(self.callers), 1)
+
+    async def test_session_is_not_kept_by_shared_provider(self):
+        provider = get_gh_app_token_provider(self.pem_path, '1', '3')
+        provider.api_url = self.api_url
+        client_type = IntegrationsGHGraphQLClient
+        async with aiohttp.ClientSession(
+            headers={'X-Caller': 'first'},
+        ) as session:
+            token = await client_type.generate_token_for_gh_app(
+                self.pem_path,
+                '1',
+                '3',
+                session=session,
+            )
+        self.assertEqual(token, 'token 1')
+        self.assertEqual(self.callers, ['first'])
+        self.assertIsNone(provider.session)
+
+
+if __name__ == '__main__':
+    unittest.main()
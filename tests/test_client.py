@@ -0,0 +1,631 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+from albs_github.graphql.client import (
+    SYNC_SAFETY_MARGIN,
+    BaseGHGraphQLClient,
+    IntegrationsGHGraphQLClient,
+)
+from albs_github.graphql.exceptions import GHRequestError
+from albs_github.graphql.models import ProjectFieldUpdate
+from albs_github.graphql.paging import PageSizer
+from albs_github.graphql.rate_limit import RateLimiter
+from benchmarks.fake_github import (
+    PROJECT_ID,
+    STATUS_FIELD_ID,
+    FakeGitHubServer,
+    FakeProject,
+    start_server,
+)
+
+
+class FlakyServer:
+    # Answers with the given statuses first and with 200 afterwards
+    def __init__(self, statuses: List[int], delay: float = 0.0):
+        self.statuses = list(statuses)
+        self.delay = delay
+        self.requests = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.statuses:
+            status = self.statuses.pop(0)
+            if status == 403:
+                return web.json_response(
+                    {'message': 'You have exceeded a secondary rate limit'},
+                    status=403,
+                    headers={'Retry-After': '0'},
+                )
+            return web.Response(status=status, text='Error')
+        return web.json_response({'data': {'ok': True}})
+
+
+class TestRequestRetries(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.runner = None
+
+    async def asyncTearDown(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+    async def make_client(
+        self,
+        server: FlakyServer,
+        **kwargs,
+    ) -> BaseGHGraphQLClient:
+        app = web.Application()
+        app.router.add_post('/graphql', server.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = self.runner.addresses[0][1]
+        kwargs.setdefault('rate_limiter', RateLimiter(backoff_base=0.01))
+        client = BaseGHGraphQLClient(
+            'token',
+            api_url=f'http://127.0.0.1:{port}/graphql',
+            **kwargs,
+        )
+        self.addAsyncCleanup(client.close)
+        return client
+
+    async def test_query_is_retried_after_server_error(self):
+        server = FlakyServer([502, 503])
+        client = await self.make_client(server)
+        response = await client.make_request('query Test { ok }')
+        self.assertEqual(response, {'data': {'ok': True}})
+        self.assertEqual(server.requests, 3)
+
+    async def test_mutation_is_not_retried_after_server_error(self):
+        # GitHub may have applied the mutation before answering with 502
+        server = FlakyServer([502])
+        client = await self.make_client(server)
+        with self.assertRaises(GHRequestError):
+            await client.make_request('mutation Test { ok }')
+        self.assertEqual(server.requests, 1)
+
+    async def test_mutation_is_retried_after_rate_limit(self):
+        server = FlakyServer([403])
+        client = await self.make_client(server)
+        response = await client.make_request('mutation Test { ok }')
+        self.assertEqual(response, {'data': {'ok': True}})
+        self.assertEqual(server.requests, 2)
+
+    async def test_mutation_is_retried_after_connection_error(self):
+        client = BaseGHGraphQLClient(
+            'token',
+            # Nothing listens on the port
+            api_url='http://127.0.0.1:1/graphql',
+            rate_limiter=RateLimiter(max_retries=2, backoff_base=0.01),
+        )
+        self.addAsyncCleanup(client.close)
+        with self.assertRaises(GHRequestError):
+            await client.make_request('mutation Test { ok }')
+        self.assertEqual(
+            client.metrics.snapshot()['operations']['Test']['requests'],
+            3,
+        )
+
+    async def test_timeout_is_reported_as_error(self):
+        server = FlakyServer([], delay=1)
+        client = await self.make_client(
+            server,
+            request_timeout=0.05,
+            rate_limiter=RateLimiter(max_retries=1, backoff_base=0.01),
+        )
+        with self.assertRaisesRegex(GHRequestError, 'TimeoutError'):
+            await client.make_request('query Test { ok }')
+        stats = client.metrics.snapshot()['operations']['Test']
+        self.assertEqual((stats['requests'], stats['errors']), (2, 2))
+
+
+class ChangingProject(FakeProject):
+    # Items of the fake board are generated from their indexes,
+    # changes made by the tests are kept on top of them
+    def __init__(self, items_count: int):
+        super().__init__(items_count)
+        self.changes: Dict[int, dict] = {}
+
+    def change(self, index: int, **values):
+        # GitHub reports the update time in seconds
+        values.setdefault(
+            'updated_at',
+            datetime.now(timezone.utc).replace(microsecond=0),
+        )
+        self.changes.setdefault(index, {}).update(values)
+
+    def get_updated_at(self, index: int) -> datetime:
+        changes = self.changes.get(index, {})
+        return changes.get('updated_at') or super().get_updated_at(index)
+
+    def get_status(self, index: int) -> str:
+        changes = self.changes.get(index, {})
+        return changes.get('status') or super().get_status(index)
+
+    def get_content(self, index: int, with_body: bool = True) -> dict:
+        content = super().get_content(index, with_body)
+        content.update(self.changes.get(index, {}).get('content', {}))
+        return content
+
+    def filter_items(self, items_query: Optional[str]) -> List[int]:
+        # FakeProject caches filtered items, but these ones change
+        prefix = 'updated:>='
+        if not items_query or not items_query.startswith(prefix):
+            return list(super().filter_items(items_query))
+        since = datetime.strptime(
+            items_query[len(prefix):],
+            '%Y-%m-%d',
+        ).replace(tzinfo=timezone.utc)
+        return [
+            index for index in range(self.items_count)
+            if self.get_updated_at(index) >= since
+        ]
+
+
+class BoardServer(FakeGitHubServer):
+    # Batched field updates are recorded. Updates of rejected_items
+    # fail with an error of their alias like on GitHub, requests with
+    # failing_items are answered with 502.
+    def __init__(self, project: FakeProject):
+        super().__init__(project)
+        self.rejected_items = set()
+        self.failing_items = set()
+        self.mutations = 0
+        self.updates = []
+
+    async def handle(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        if payload['query'].startswith('mutation'):
+            self.mutations += 1
+        variables = payload.get('variables') or {}
+        if 'item_id_0' not in variables:
+            return await super().handle(request)
+        self.requests += 1
+        item_ids = {
+            name[len('item_id_'):]: value
+            for name, value in variables.items()
+            if name.startswith('item_id_')
+        }
+        if self.failing_items & set(item_ids.values()):
+            return web.Response(status=502, text='Bad Gateway')
+        data = {}
+        errors = []
+        for suffix, item_id in item_ids.items():
+            alias = f'update_{suffix}'
+            if item_id in self.rejected_items:
+                data[alias] = None
+                errors.append({
+                    'path': [alias],
+                    'message': f'Could not resolve to a node: {item_id}',
+                })
+                continue
+            self.updates.append(
+                (item_id, variables[f'value_{suffix}'])
+            )
+            data[alias] = {'projectV2Item': {'id': item_id}}
+        response = {'data': data}
+        if errors:
+            response['errors'] = errors
+        return web.json_response(response)
+
+
+class FakeBoardTestCase(unittest.IsolatedAsyncioTestCase):
+    async def start_server(self, *args, **kwargs) -> FakeGitHubServer:
+        return await self.serve(FakeGitHubServer(*args, **kwargs))
+
+    async def serve(self, server: FakeGitHubServer) -> FakeGitHubServer:
+        runner, self.api_url = await start_server(server)
+        self.addAsyncCleanup(runner.cleanup)
+        return server
+
+    def make_client(self, **kwargs) -> IntegrationsGHGraphQLClient:
+        client = IntegrationsGHGraphQLClient(
+            'token',
+            'AlmaLinux',
+            1,
+            'almalinux-build',
+            api_url=self.api_url,
+            **kwargs,
+        )
+        self.addAsyncCleanup(client.close)
+        return client
+
+
+class TestClose(FakeBoardTestCase):
+    async def test_close_stops_abandoned_scan(self):
+        server = await self.start_server(FakeProject(2000), latency=0.01)
+        client = self.make_client()
+        task = asyncio.ensure_future(client.get_project_issues(reload=True))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        await client.close()
+        # The request sent before closing may still reach the server
+        await asyncio.sleep(0.05)
+        requests = server.requests
+        await asyncio.sleep(0.2)
+        self.assertEqual(server.requests, requests)
+        with self.assertRaises(RuntimeError):
+            client.session
+
+
+class TestPageSizing(FakeBoardTestCase):
+    async def test_timeouts_shrink_pages(self):
+        # Pages over 50 items take longer than the request timeout
+        server = await self.start_server(FakeProject(120), item_latency=0.004)
+        page_sizer = PageSizer()
+        client = self.make_client(
+            page_sizer=page_sizer,
+            request_timeout=0.2,
+            rate_limiter=RateLimiter(backoff_base=0.01),
+        )
+        items = await client.get_project_issues(reload=True)
+        self.assertEqual(len(items), 120)
+        self.assertLessEqual(page_sizer.page_size, 50)
+        stats = client.metrics.snapshot()['operations']
+        self.assertGreater(stats['GetOrgProjectIssues']['errors'], 0)
+
+
+class TestSetFieldsBatch(FakeBoardTestCase):
+    async def asyncSetUp(self):
+        self.server = await self.serve(BoardServer(ChangingProject(10)))
+        self.client = self.make_client()
+        await self.client.initialize()
+
+    async def test_errors_are_reported_per_update(self):
+        self.server.rejected_items.add('PVTI_2')
+        results = await self.client.set_fields_batch([
+            ProjectFieldUpdate(
+                item_id=f'PVTI_{index}',
+                field_name='Notes',
+                value='Rebuilt',
+            )
+            for index in (1, 2, 3)
+        ])
+        self.assertEqual(
+            [result.success for result in results],
+            [True, False, True],
+        )
+        self.assertIn('PVTI_2', results[1].error)
+        self.assertEqual(self.server.mutations, 1)
+        # Only the applied values get to the cache
+        items = await self.client.get_project_issues()
+        self.assertEqual(items['PVTI_1'].get_field_value('Notes'), 'Rebuilt')
+        self.assertEqual(
+            items['PVTI_2'].get_field_value('Notes'),
+            'Build 2 notes',
+        )
+
+    async def test_failed_chunk_does_not_stop_others(self):
+        self.server.failing_items.add('PVTI_2')
+        results = await self.client.set_fields_batch(
+            [
+                ProjectFieldUpdate(
+                    item_id=f'PVTI_{index}',
+                    field_name='Notes',
+                    value='Rebuilt',
+                )
+                for index in (1, 2, 3)
+            ],
+            max_mutations_per_request=1,
+        )
+        self.assertEqual(
+            [result.success for result in results],
+            [True, False, True],
+        )
+        self.assertIn('502', results[1].error)
+        self.assertEqual(
+            self.server.updates,
+            [('PVTI_1', 'Rebuilt'), ('PVTI_3', 'Rebuilt')],
+        )
+
+    async def test_incorrect_update_is_not_sent(self):
+        results = await self.client.set_fields_batch([
+            ProjectFieldUpdate(
+                item_id='PVTI_1',
+                field_name='Status',
+                value='Unknown',
+            ),
+            ProjectFieldUpdate(
+                item_id='PVTI_1',
+                field_name='Missing',
+                value='Value',
+            ),
+        ])
+        self.assertFalse(any(result.success for result in results))
+        self.assertEqual(self.server.mutations, 0)
+
+
+class TestIncrementalSync(FakeBoardTestCase):
+    async def asyncSetUp(self):
+        self.board = ChangingProject(10)
+        self.server = await self.serve(BoardServer(self.board))
+        self.client = self.make_client()
+        await self.client.initialize()
+
+    async def sync(self):
+        return await self.client.get_project_issues(
+            reload=True,
+            incremental=True,
+        )
+
+    async def test_changed_items_are_merged(self):
+        self.board.change(3, status='Done')
+        started_at = datetime.now(timezone.utc)
+        items = await self.sync()
+        self.assertEqual(len(items), 10)
+        self.assertEqual(items['PVTI_3'].get_field_value('Status'), 'Done')
+        scans = self.client.metrics.snapshot()['scans']
+        self.assertEqual(scans['incremental']['items'], 1)
+        # The watermark is the start of the scan minus the margin,
+        # not the update time of the newest item
+        self.assertLessEqual(
+            self.client.last_synced_at,
+            started_at - SYNC_SAFETY_MARGIN + timedelta(seconds=1),
+        )
+        self.assertGreaterEqual(
+            self.client.last_synced_at,
+            started_at - SYNC_SAFETY_MARGIN - timedelta(seconds=1),
+        )
+
+    async def test_cached_versions_are_not_overwritten(self):
+        updated_at = datetime.now(timezone.utc).replace(microsecond=0)
+        self.board.change(3, status='Done', updated_at=updated_at)
+        await self.sync()
+        # The same version is skipped, even if its data differs
+        self.board.change(3, status='Blocked', updated_at=updated_at)
+        items = await self.sync()
+        self.assertEqual(items['PVTI_3'].get_field_value('Status'), 'Done')
+        # A newer one is merged
+        self.board.change(
+            3,
+            status='Blocked',
+            updated_at=updated_at + timedelta(seconds=1),
+        )
+        items = await self.sync()
+        self.assertEqual(
+            items['PVTI_3'].get_field_value('Status'),
+            'Blocked',
+        )
+
+    async def test_change_during_scan_is_picked_up_later(self):
+        # An item changed after its page was loaded, but before
+        # the scan has finished, gets into the next sync
+        self.board.change(
+            5,
+            status='Todo',
+            updated_at=self.client.last_synced_at + timedelta(seconds=1),
+        )
+        items = await self.sync()
+        self.assertEqual(items['PVTI_5'].get_field_value('Status'), 'Todo')
+
+
+def make_item_event(
+    action: str,
+    item_id: str,
+    updated_at: str,
+    status: Optional[str] = None,
+) -> dict:
+    payload = {
+        'action': action,
+        'projects_v2_item': {
+            'node_id': item_id,
+            'project_node_id': PROJECT_ID,
+            'updated_at': updated_at,
+        },
+    }
+    if status is not None:
+        payload['changes'] = {'field_value': {
+            'field_node_id': STATUS_FIELD_ID,
+            'field_type': 'single_select',
+            'to': {'name': status},
+        }}
+    return payload
+
+
+def make_issue_event(action: str, index: int, **issue) -> dict:
+    issue.setdefault('updated_at', '2030-01-01T00:00:00Z')
+    return {
+        'action': action,
+        'issue': dict(issue, node_id=f'I_kwDOBENCH{index}'),
+    }
+
+
+class TestWebhookEvents(FakeBoardTestCase):
+    async def asyncSetUp(self):
+        self.board = ChangingProject(10)
+        self.server = await self.serve(BoardServer(self.board))
+        self.client = self.make_client()
+        await self.client.initialize()
+
+    async def test_field_change_is_applied_in_place(self):
+        requests = self.server.requests
+        applied = await self.client.apply_webhook_event(
+            'projects_v2_item',
+            make_item_event(
+                'edited',
+                'PVTI_1',
+                '2030-01-01T00:00:00Z',
+                status='Blocked',
+            ),
+        )
+        self.assertTrue(applied)
+        items = await self.client.get_project_issues()
+        self.assertEqual(items['PVTI_1'].get_field_value('Status'), 'Blocked')
+        self.assertEqual(self.server.requests, requests)
+
+    async def test_outdated_event_is_ignored(self):
+        for updated_at, status in (
+            ('2030-01-01T00:00:02Z', 'Blocked'),
+            ('2030-01-01T00:00:01Z', 'Todo'),
+        ):
+            await self.client.apply_webhook_event(
+                'projects_v2_item',
+                make_item_event('edited', 'PVTI_1', updated_at, status),
+            )
+        items = await self.client.get_project_issues()
+        self.assertEqual(items['PVTI_1'].get_field_value('Status'), 'Blocked')
+
+    async def test_archived_item_is_removed(self):
+        applied = await self.client.apply_webhook_event(
+            'projects_v2_item',
+            make_item_event('archived', 'PVTI_1', '2030-01-01T00:00:00Z'),
+        )
+        self.assertTrue(applied)
+        items = await self.client.get_project_issues()
+        self.assertNotIn('PVTI_1', items)
+        self.assertEqual(len(items), 9)
+
+    async def test_new_item_is_fetched(self):
+        self.board.items_count = 11
+        applied = await self.client.apply_webhook_event(
+            'projects_v2_item',
+            make_item_event('created', 'PVTI_10', '2030-01-01T00:00:00Z'),
+        )
+        self.assertTrue(applied)
+        self.assertEqual(self.server.operations['GetNodes'], 1)
+        items = await self.client.get_project_issues()
+        self.assertEqual(items['PVTI_10'].content.id, 'I_kwDOBENCH10')
+
+    async def test_event_of_other_project_is_ignored(self):
+        payload = make_item_event('archived', 'PVTI_1', '2030-01-01T00:00:00Z')
+        payload['projects_v2_item']['project_node_id'] = 'PVT_other'
+        self.assertFalse(
+            await self.client.apply_webhook_event('projects_v2_item', payload)
+        )
+        self.assertIn('PVTI_1', await self.client.get_project_issues())
+
+    async def test_comment_event_updates_issue(self):
+        applied = await self.client.apply_webhook_event(
+            'issue_comment',
+            make_issue_event(
+                'deleted',
+                1,
+                title='New title',
+                body='New body',
+                state='closed',
+            ),
+        )
+        self.assertTrue(applied)
+        content = (await self.client.get_project_issues())['PVTI_1'].content
+        self.assertEqual(
+            (content.title, content.body, content.state),
+            ('New title', 'New body', 'CLOSED'),
+        )
+
+    async def test_deleted_issue_is_removed(self):
+        applied = await self.client.apply_webhook_event(
+            'issues',
+            make_issue_event('deleted', 1),
+        )
+        self.assertTrue(applied)
+        self.assertNotIn('PVTI_1', await self.client.get_project_issues())
+
+    async def test_refresh_does_not_move_watermark(self):
+        last_synced_at = self.client.last_synced_at
+        self.board.change(1, status='Todo')
+        self.assertTrue(await self.client.refresh_project_item('PVTI_1'))
+        items = await self.client.get_project_issues()
+        self.assertEqual(items['PVTI_1'].get_field_value('Status'), 'Todo')
+        self.assertEqual(self.client.last_synced_at, last_synced_at)
+
+    async def test_refresh_does_not_fill_empty_cache(self):
+        client = self.make_client()
+        # Streamed items are not cached, only the project ID is known
+        async for _ in client.iter_project_items():
+            pass
+        self.assertTrue(await client.refresh_project_item('PVTI_1'))
+        self.assertEqual(len(await client.get_project_issues()), 10)
+
+
+class TestWriteElision(FakeBoardTestCase):
+    async def asyncSetUp(self):
+        self.server = await self.serve(BoardServer(ChangingProject(10)))
+        self.client = self.make_client()
+        await self.client.initialize()
+
+    async def test_cached_value_is_not_sent(self):
+        # PVTI_1 is Done on the board already
+        await self.client.set_issue_status('PVTI_1', 'Done')
+        self.assertEqual(self.server.mutations, 0)
+        caches = self.client.metrics.snapshot()['caches']
+        self.assertEqual(caches['writes'], {'hits': 1, 'misses': 0})
+        await self.client.set_issue_status('PVTI_1', 'Done', force=True)
+        self.assertEqual(self.server.mutations, 1)
+
+    async def test_written_value_is_cached(self):
+        await self.client.set_issue_status('PVTI_1', 'Blocked')
+        self.assertEqual(self.server.mutations, 1)
+        items = await self.client.get_project_issues()
+        self.assertEqual(items['PVTI_1'].get_field_value('Status'), 'Blocked')
+        await self.client.set_issue_status('PVTI_1', 'Blocked')
+        self.assertEqual(self.server.mutations, 1)
+
+    async def test_batch_skips_cached_values(self):
+        results = await self.client.set_fields_batch([
+            ProjectFieldUpdate(
+                item_id='PVTI_1',
+                field_name='Notes',
+                value='Build 1 notes',
+            ),
+            ProjectFieldUpdate(
+                item_id='PVTI_2',
+                field_name='Notes',
+                value='Rebuilt',
+            ),
+        ])
+        self.assertEqual(
+            [(result.success, result.skipped) for result in results],
+            [(True, True), (True, False)],
+        )
+        self.assertEqual(self.server.updates, [('PVTI_2', 'Rebuilt')])
+        items = await self.client.get_project_issues()
+        self.assertEqual(items['PVTI_2'].get_field_value('Notes'), 'Rebuilt')
+
+    async def test_batch_sends_value_changed_in_same_call(self):
+        # The second update restores the cached value after the first
+        # one, so it cannot be skipped
+        results = await self.client.set_fields_batch([
+            ProjectFieldUpdate(
+                item_id='PVTI_1',
+                field_name='Notes',
+                value='Rebuilt',
+            ),
+            ProjectFieldUpdate(
+                item_id='PVTI_1',
+                field_name='Notes',
+                value='Build 1 notes',
+            ),
+        ])
+        self.assertFalse(any(result.skipped for result in results))
+        self.assertEqual(
+            self.server.updates,
+            [('PVTI_1', 'Rebuilt'), ('PVTI_1', 'Build 1 notes')],
+        )
+        items = await self.client.get_project_issues()
+        self.assertEqual(
+            items['PVTI_1'].get_field_value('Notes'),
+            'Build 1 notes',
+        )
+
+    async def test_closed_issue_is_not_closed_again(self):
+        # I_kwDOBENCH5 is closed on the board already
+        response = await self.client.close_issue('I_kwDOBENCH5')
+        self.assertEqual(
+            response['data']['closeIssue']['issue']['state'],
+            'CLOSED',
+        )
+        self.assertEqual(self.server.mutations, 0)
+        await self.client.close_issue('I_kwDOBENCH1')
+        self.assertEqual(self.server.mutations, 1)
+        items = await self.client.get_project_issues()
+        self.assertEqual(items['PVTI_1'].content.state, 'CLOSED')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import csv
+import io
+import unittest
+from unittest import mock
+
+from albs_github.graphql import export
+from albs_github.graphql.client import IntegrationsGHGraphQLClient
+from benchmarks.fake_github import (
+    FakeGitHubServer,
+    FakeProject,
+    start_server,
+)
+
+
+class TestExport(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = FakeGitHubServer(FakeProject(30))
+        runner, api_url = await start_server(self.server)
+        self.addAsyncCleanup(runner.cleanup)
+        self.client = IntegrationsGHGraphQLClient(
+            'token',
+            'AlmaLinux',
+            1,
+            'almalinux-build',
+            api_url=api_url,
+        )
+        self.addAsyncCleanup(self.client.close)
+
+    async def test_csv_has_columns_of_cached_values(self):
+        output = io.BytesIO()
+        count = await export.export_project_items(
+            self.client,
+            output,
+            export_format='csv',
+        )
+        rows = list(csv.DictReader(io.StringIO(output.getvalue().decode())))
+        self.assertEqual(count, 30)
+        self.assertEqual(len(rows), 30)
+        self.assertEqual(
+            [name for name in rows[0] if name.startswith('fields.')],
+            ['fields.Title', 'fields.Status', 'fields.Platform',
+             'fields.Notes'],
+        )
+        self.assertTrue(all(row['fields.Status'] for row in rows))
+        self.assertEqual(rows[1]['fields.Notes'], 'Build 1 notes')
+
+    async def test_parquet_requires_pyarrow(self):
+        with mock.patch.object(export, 'pyarrow', None):
+            with self.assertRaises(ImportError):
+                await export.export_project_items(
+                    self.client,
+                    io.BytesIO(),
+                    export_format='parquet',
+                )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import asyncio
+import unittest
+from typing import Dict, List, Optional
+
+from albs_github.graphql.loader import (
+    NodeLoader,
+    get_node_cache,
+    node_cache_scope,
+)
+
+
+class BatchRecorder:
+    def __init__(self, missing=(), error: Optional[Exception] = None):
+        self.batches: List[List[str]] = []
+        self.missing = set(missing)
+        self.error = error
+
+    async def __call__(self, node_ids: List[str]) -> Dict[str, str]:
+        self.batches.append(list(node_ids))
+        await asyncio.sleep(0)
+        if self.error is not None:
+            raise self.error
+        return {
+            node_id: f'node {node_id}'
+            for node_id in node_ids
+            if node_id not in self.missing
+        }
+
+
+class TestNodeLoader(unittest.IsolatedAsyncioTestCase):
+    async def test_loads_of_one_tick_are_batched(self):
+        recorder = BatchRecorder()
+        loader = NodeLoader(recorder, max_batch_size=100)
+        results = await asyncio.gather(
+            loader.load('A'),
+            loader.load('B'),
+            loader.load('A'),
+        )
+        self.assertEqual(results, ['node A', 'node B', 'node A'])
+        self.assertEqual(recorder.batches, [['A', 'B']])
+
+    async def test_batches_are_limited(self):
+        recorder = BatchRecorder()
+        loader = NodeLoader(recorder, max_batch_size=2)
+        results = await loader.load_many(['A', 'B', 'C', 'D', 'E'])
+        self.assertEqual(len(results), 5)
+        self.assertEqual(
+            recorder.batches,
+            [['A', 'B'], ['C', 'D'], ['E']],
+        )
+
+    async def test_missing_node_is_none(self):
+        loader = NodeLoader(BatchRecorder(missing=['B']), max_batch_size=10)
+        self.assertEqual(await loader.load_many(['A', 'B']), ['node A', None])
+
+    async def test_loads_of_next_ticks_are_fetched_again(self):
+        recorder = BatchRecorder()
+        loader = NodeLoader(recorder, max_batch_size=10)
+        await loader.load('A')
+        await loader.load('A')
+        self.assertEqual(recorder.batches, [['A'], ['A']])
+
+    async def test_error_is_set_for_every_node(self):
+        loader = NodeLoader(
+            BatchRecorder(error=RuntimeError('boom')),
+            max_batch_size=10,
+        )
+        results = await asyncio.gather(
+            loader.load('A'),
+            loader.load('B'),
+            return_exceptions=True,
+        )
+        self.assertTrue(
+            all(isinstance(result, RuntimeError) for result in results)
+        )
+
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        recorder = BatchRecorder()
+        loader = NodeLoader(recorder, max_batch_size=10)
+        cancelled = asyncio.ensure_future(loader.load('A'))
+        waiting = asyncio.ensure_future(loader.load('A'))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await cancelled
+        self.assertEqual(await waiting, 'node A')
+        self.assertEqual(await loader.load('A'), 'node A')
+        self.assertEqual(recorder.batches, [['A'], ['A']])
+
+    async def test_cancelled_caller_keeps_scope_cache(self):
+        recorder = BatchRecorder()
+        loader = NodeLoader(recorder, max_batch_size=10)
+        with node_cache_scope():
+            cancelled = asyncio.ensure_future(loader.load('A'))
+            await asyncio.sleep(0)
+            cancelled.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await cancelled
+            self.assertEqual(await loader.load('A'), 'node A')
+        self.assertEqual(recorder.batches, [['A']])
+
+    async def test_scope_caches_results(self):
+        recorder = BatchRecorder()
+        loader = NodeLoader(recorder, max_batch_size=10)
+        self.assertIsNone(get_node_cache())
+        with node_cache_scope():
+            await loader.load('A')
+            self.assertEqual(await loader.load('A'), 'node A')
+        self.assertIsNone(get_node_cache())
+        self.assertEqual(recorder.batches, [['A']])
+
+    async def test_scope_is_inherited_by_tasks(self):
+        recorder = BatchRecorder()
+        loader = NodeLoader(recorder, max_batch_size=10)
+        with node_cache_scope():
+            await loader.load('A')
+            await asyncio.ensure_future(loader.load_many(['A', 'B']))
+        self.assertEqual(recorder.batches, [['A'], ['B']])
+
+    async def test_scope_forgets_failures(self):
+        recorder = BatchRecorder(error=RuntimeError('boom'))
+        loader = NodeLoader(recorder, max_batch_size=10)
+        with node_cache_scope():
+            with self.assertRaises(RuntimeError):
+                await loader.load('A')
+            recorder.error = None
+            self.assertEqual(await loader.load('A'), 'node A')
+        self.assertEqual(recorder.batches, [['A'], ['A']])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+from albs_github.graphql.rate_limit import SECONDARY_LIMIT_DELAY, RateLimiter
+
+
+class TestRateLimiter(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrency_is_limited(self):
+        limiter = RateLimiter(max_concurrency=2)
+        in_flight = 0
+        max_in_flight = 0
+
+        async def request():
+            nonlocal in_flight, max_in_flight
+            async with limiter.slot():
+                in_flight += 1
+                max_in_flight = max(max_in_flight, in_flight)
+                await asyncio.sleep(0.01)
+                in_flight -= 1
+
+        await asyncio.gather(*(request() for _ in range(10)))
+        self.assertEqual(max_in_flight, 2)
+        self.assertEqual(limiter.state.in_flight, 0)
+
+    async def test_slot_is_released_on_error(self):
+        limiter = RateLimiter(max_concurrency=1)
+        with self.assertRaises(RuntimeError):
+            async with limiter.slot():
+                raise RuntimeError('boom')
+        await asyncio.wait_for(limiter.acquire(), timeout=1)
+        await limiter.release()
+
+    def test_aimd(self):
+        limiter = RateLimiter(max_concurrency=8, min_concurrency=1)
+        limiter.on_throttled(retry_after=0)
+        self.assertEqual(limiter.state.concurrency, 4)
+        limiter.on_throttled(retry_after=0)
+        limiter.on_throttled(retry_after=0)
+        limiter.on_throttled(retry_after=0)
+        self.assertEqual(limiter.state.concurrency, 1)
+        self.assertEqual(limiter.state.throttled, 4)
+        # One more request after a window of successful ones
+        limiter.on_success()
+        self.assertEqual(limiter.state.concurrency, 2)
+        limiter.on_success()
+        self.assertEqual(limiter.state.concurrency, 2)
+        limiter.on_success()
+        self.assertEqual(limiter.state.concurrency, 3)
+        for _ in range(100):
+            limiter.on_success()
+        self.assertEqual(limiter.state.concurrency, 8)
+
+    def test_throttling_pauses_requests(self):
+        limiter = RateLimiter()
+        started_at = time.time()
+        limiter.on_throttled()
+        self.assertGreaterEqual(
+            limiter.state.paused_until,
+            started_at + SECONDARY_LIMIT_DELAY,
+        )
+        # A shorter Retry-After does not shorten the pause
+        paused_until = limiter.state.paused_until
+        limiter.on_throttled(retry_after=1)
+        self.assertEqual(limiter.state.paused_until, paused_until)
+
+    async def test_acquire_waits_for_pause(self):
+        limiter = RateLimiter()
+        limiter.on_throttled(retry_after=0.05)
+        started_at = time.perf_counter()
+        with mock.patch('random.uniform', return_value=0):
+            async with limiter.slot():
+                pass
+        self.assertGreaterEqual(time.perf_counter() - started_at, 0.04)
+
+    async def test_acquire_waits_for_budget_reset(self):
+        limiter = RateLimiter(reserve_points=100)
+        limiter.update_from_headers({
+            'X-RateLimit-Remaining': '10',
+            'X-RateLimit-Reset': str(time.time() + 0.05),
+        })
+        started_at = time.perf_counter()
+        with mock.patch('random.uniform', return_value=0):
+            async with limiter.slot():
+                pass
+        self.assertGreaterEqual(time.perf_counter() - started_at, 0.04)
+        # The next budget window is unknown until GitHub reports it
+        self.assertIsNone(limiter.state.remaining)
+
+    def test_update_from_headers(self):
+        limiter = RateLimiter()
+        limiter.update_from_headers({'Content-Type': 'application/json'})
+        self.assertIsNone(limiter.state.remaining)
+        limiter.update_from_headers({
+            'X-RateLimit-Limit': '5000',
+            'X-RateLimit-Remaining': '4990',
+            'X-RateLimit-Used': '10',
+            'X-RateLimit-Reset': '1800000000',
+        })
+        state = limiter.state
+        self.assertEqual(
+            (state.limit, state.remaining, state.used, state.reset_at),
+            (5000, 4990, 10, 1800000000.0),
+        )
+
+    def test_update_from_payload(self):
+        limiter = RateLimiter()
+        limiter.update_from_payload({'data': {'rateLimit': {
+            'cost': 3,
+            'limit': 5000,
+            'remaining': 4000,
+            'used': 1000,
+            'resetAt': '2027-01-15T08:00:00Z',
+        }}})
+        state = limiter.state
+        self.assertEqual(state.last_cost, 3)
+        self.assertEqual(state.remaining, 4000)
+        self.assertEqual(state.reset_at, 1800000000.0)
+        limiter.update_from_payload({'data': None})
+        self.assertEqual(limiter.state.remaining, 4000)
+
+    def test_budget_exhausted(self):
+        limiter = RateLimiter()
+        limiter.on_budget_exhausted()
+        state = limiter.state
+        self.assertEqual(state.remaining, 0)
+        self.assertIsNotNone(state.reset_at)
+
+    def test_backoff_delay(self):
+        limiter = RateLimiter(backoff_base=1.0, backoff_max=5.0)
+        for attempt in range(10):
+            delay = limiter.get_backoff_delay(attempt)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(5.0, 2 ** attempt))
+        self.assertEqual(limiter.state.retries, 10)
+
+    def test_incorrect_limits(self):
+        with self.assertRaises(ValueError):
+            RateLimiter(max_concurrency=1, min_concurrency=2)
+        with self.assertRaises(ValueError):
+            RateLimiter(min_concurrency=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
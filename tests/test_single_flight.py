@@ -0,0 +1,141 @@
+import asyncio
+import copy
+import unittest
+from typing import Optional
+
+from albs_github.graphql.single_flight import SingleFlight
+
+
+class CountingFunction:
+    def __init__(self, result=None, error: Optional[Exception] = None):
+        self.calls = 0
+        self.result = result
+        self.error = error
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_calls_share_result(self):
+        flight = SingleFlight()
+        function = CountingFunction(result={'items': [1, 2]})
+        tasks = [
+            asyncio.ensure_future(flight.run('key', function))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        self.assertTrue(flight.is_running('key'))
+        function.release.set()
+        results = await asyncio.gather(*tasks)
+        self.assertEqual(function.calls, 1)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertFalse(flight.is_running('key'))
+
+    async def test_waiters_get_copies(self):
+        flight = SingleFlight()
+        function = CountingFunction(result={'items': [1, 2]})
+        tasks = [
+            asyncio.ensure_future(
+                flight.run('key', function, copy=copy.deepcopy)
+            )
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        function.release.set()
+        results = await asyncio.gather(*tasks)
+        self.assertEqual(function.calls, 1)
+        self.assertTrue(all(result == results[0] for result in results))
+        # Only the last caller gets the original object
+        self.assertEqual(
+            len({id(result) for result in results}),
+            len(results),
+        )
+        self.assertEqual(
+            sum(result is function.result for result in results),
+            1,
+        )
+
+    async def test_different_keys_run_separately(self):
+        flight = SingleFlight()
+        first = CountingFunction(result=1)
+        second = CountingFunction(result=2)
+        tasks = [
+            asyncio.ensure_future(flight.run('first', first)),
+            asyncio.ensure_future(flight.run('second', second)),
+        ]
+        await asyncio.sleep(0)
+        first.release.set()
+        second.release.set()
+        self.assertEqual(await asyncio.gather(*tasks), [1, 2])
+        self.assertEqual((first.calls, second.calls), (1, 1))
+
+    async def test_finished_call_is_not_reused(self):
+        flight = SingleFlight()
+        function = CountingFunction(result=1)
+        function.release.set()
+        await flight.run('key', function)
+        await flight.run('key', function)
+        self.assertEqual(function.calls, 2)
+
+    async def test_error_is_raised_for_every_caller(self):
+        flight = SingleFlight()
+        function = CountingFunction(error=RuntimeError('boom'))
+        tasks = [
+            asyncio.ensure_future(flight.run('key', function))
+            for _ in range(2)
+        ]
+        await asyncio.sleep(0)
+        function.release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        self.assertEqual(function.calls, 1)
+        self.assertTrue(
+            all(isinstance(result, RuntimeError) for result in results)
+        )
+        self.assertFalse(flight.is_running('key'))
+
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        flight = SingleFlight()
+        function = CountingFunction(result=1)
+        cancelled = asyncio.ensure_future(flight.run('key', function))
+        waiting = asyncio.ensure_future(flight.run('key', function))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await cancelled
+        function.release.set()
+        self.assertEqual(await waiting, 1)
+        self.assertEqual(function.calls, 1)
+
+    async def test_call_is_cancelled_without_callers(self):
+        flight = SingleFlight()
+        function = CountingFunction(result=1)
+        cancelled = asyncio.ensure_future(flight.run('key', function))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await cancelled
+        self.assertFalse(flight.is_running('key'))
+        # A new caller does not wait for the cancelled call
+        function.release.set()
+        self.assertEqual(await flight.run('key', function), 1)
+        self.assertEqual(function.calls, 2)
+
+    async def test_cancel_all(self):
+        flight = SingleFlight()
+        function = CountingFunction(result=1)
+        task = asyncio.ensure_future(flight.run('key', function))
+        await asyncio.sleep(0)
+        await flight.cancel_all()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertFalse(flight.is_running('key'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+import asyncio
+import unittest
+from typing import List, Optional
+
+from albs_github.graphql.models import (
+    ProjectFieldUpdate,
+    ProjectFieldUpdateResult,
+)
+from albs_github.graphql.write_queue import FieldUpdateQueue
+
+
+def make_update(item_id: str, value: str) -> ProjectFieldUpdate:
+    return ProjectFieldUpdate(
+        item_id=item_id,
+        field_name='Status',
+        value=value,
+    )
+
+
+class BatchRecorder:
+    def __init__(
+        self,
+        delay: float = 0.0,
+        error: Optional[Exception] = None,
+    ):
+        self.batches: List[List[ProjectFieldUpdate]] = []
+        self.delay = delay
+        self.error = error
+
+    async def __call__(
+        self,
+        updates: List[ProjectFieldUpdate],
+    ) -> List[ProjectFieldUpdateResult]:
+        self.batches.append(list(updates))
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return [
+            ProjectFieldUpdateResult(
+                item_id=update.item_id,
+                field_name=update.field_name,
+                value=update.value,
+                success=True,
+            )
+            for update in updates
+        ]
+
+
+class TestFieldUpdateQueue(unittest.IsolatedAsyncioTestCase):
+    async def test_last_write_wins(self):
+        recorder = BatchRecorder()
+        queue = FieldUpdateQueue(recorder, flush_interval=60)
+        futures = [
+            queue.put(make_update('item', value))
+            for value in ('Todo', 'In progress', 'Done')
+        ]
+        self.assertEqual(queue.pending_count, 1)
+        await queue.flush()
+        self.assertEqual(len(recorder.batches), 1)
+        self.assertEqual(
+            [update.value for update in recorder.batches[0]],
+            ['Done'],
+        )
+        for future in futures:
+            self.assertEqual((await future).value, 'Done')
+
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        recorder = BatchRecorder()
+        queue = FieldUpdateQueue(recorder, flush_interval=60)
+        first = queue.put(make_update('item', 'Todo'))
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(first, timeout=0.01)
+        self.assertTrue(first.cancelled())
+        second = queue.put(make_update('item', 'Done'))
+        self.assertFalse(second.done())
+        await queue.flush()
+        self.assertEqual((await second).value, 'Done')
+
+    async def test_flush_by_size(self):
+        recorder = BatchRecorder()
+        queue = FieldUpdateQueue(recorder, max_batch_size=2, flush_interval=60)
+        first = queue.put(make_update('first', 'Todo'))
+        second = queue.put(make_update('second', 'Todo'))
+        await asyncio.wait_for(asyncio.gather(first, second), timeout=1)
+        self.assertEqual(len(recorder.batches), 1)
+        self.assertEqual(queue.pending_count, 0)
+
+    async def test_flush_by_interval(self):
+        recorder = BatchRecorder()
+        queue = FieldUpdateQueue(recorder, flush_interval=0.01)
+        result = await asyncio.wait_for(
+            queue.put(make_update('item', 'Done')),
+            timeout=1,
+        )
+        self.assertTrue(result.success)
+        self.assertEqual(len(recorder.batches), 1)
+
+    async def test_batches_are_limited(self):
+        recorder = BatchRecorder()
+        queue = FieldUpdateQueue(recorder, max_batch_size=3, flush_interval=60)
+        for index in range(7):
+            queue.put(make_update(f'item_{index}', 'Done'))
+        await queue.flush()
+        self.assertTrue(all(len(batch) <= 3 for batch in recorder.batches))
+        self.assertEqual(sum(map(len, recorder.batches)), 7)
+
+    async def test_update_queued_during_flush_is_sent_later(self):
+        recorder = BatchRecorder(delay=0.02)
+        queue = FieldUpdateQueue(recorder, flush_interval=60)
+        first = queue.put(make_update('item', 'Todo'))
+        flush = asyncio.ensure_future(queue.flush())
+        await asyncio.sleep(0.01)
+        second = queue.put(make_update('item', 'Done'))
+        self.assertIsNot(first, second)
+        await flush
+        self.assertEqual(
+            [[update.value for update in batch] for batch in recorder.batches],
+            [['Todo'], ['Done']],
+        )
+        self.assertEqual((await second).value, 'Done')
+
+    async def test_close_drains_the_queue(self):
+        recorder = BatchRecorder()
+        queue = FieldUpdateQueue(recorder, flush_interval=60)
+        future = queue.put(make_update('item', 'Done'))
+        await queue.close()
+        self.assertTrue(future.done())
+        self.assertEqual(queue.pending_count, 0)
+        self.assertEqual(len(recorder.batches), 1)
+
+    async def test_batch_error_is_set_on_futures(self):
+        recorder = BatchRecorder(error=RuntimeError('boom'))
+        queue = FieldUpdateQueue(recorder, flush_interval=60)
+        futures = [
+            queue.put(make_update('first', 'Done')),
+            queue.put(make_update('second', 'Done')),
+        ]
+        with self.assertLogs('albs_github.graphql.write_queue', 'WARNING'):
+            await queue.flush()
+            for future in futures:
+                with self.assertRaises(RuntimeError):
+                    await future
+
+    async def test_cancelled_flush_cancels_batch(self):
+        recorder = BatchRecorder(delay=1)
+        queue = FieldUpdateQueue(recorder, flush_interval=60)
+        future = queue.put(make_update('item', 'Done'))
+        flush = asyncio.ensure_future(queue.flush())
+        await asyncio.sleep(0.01)
+        flush.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await flush
+        self.assertTrue(future.cancelled())
+
+    def test_incorrect_batch_size(self):
+        with self.assertRaises(ValueError):
+            FieldUpdateQueue(BatchRecorder(), max_batch_size=0)
+
+
+if __name__ == '__main__':
+    unittest.main()